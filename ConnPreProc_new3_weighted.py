@@ -1,154 +1,210 @@
+"""
+Weighted Connection Preprocessing
+Combines the per-connection rows of startup_connections_full.csv into one weighted
+edge per startup pair, with summary and detailed labels for Gephi
+"""
+
+import argparse
+
+import numpy as np
 import pandas as pd
-import itertools
-from collections import defaultdict
-import re
-
-# Read the full connections dataset
-edges_df = pd.read_csv('startup_connections_full.csv', encoding='utf-8')
-nodes_df = pd.read_csv('startup_nodes_full.csv', encoding='utf-8')
-
-# Create a dictionary to store combined edges
-combined_edges = defaultdict(lambda: {'weight': 0, 'types': set(), 'connections': set()})
-
-# Combine edges between the same nodes
-for _, row in edges_df.iterrows():
-    # Create a consistent key for each pair of nodes (alphabetically ordered)
-    node_pair = tuple(sorted([row['Source'], row['Target']]))
-    edge_info = combined_edges[node_pair]
-    edge_info['weight'] += 1
-    edge_info['types'].add(row['Type'])
-    edge_info['connections'].add(row['Connection_full'])
-
-# Convert combined edges to DataFrame
-weighted_edges = []
-for (source, target), info in combined_edges.items():
-    # Build a parsed mapping from connection strings like 'city: DE - Berlin'
+
+LABEL_MAX = 120
+PARSED_TYPES = ('city', 'country', 'competency', 'impact', 'target_market')
+FLAG_TYPES = ('competency', 'impact', 'city', 'country', 'target_market')
+
+
+def norm_location(s):
+    # Normalize 'DE - Berlin' -> 'DE-Berlin'
+    return s.replace(' - ', '-').replace(' – ', '-').strip()
+
+
+def dedupe_preserve_order(seq):
+    """Drop repeats (ignoring case and whitespace), keeping first occurrences"""
+    seen = set()
+    out = []
+    for s in seq:
+        key = ' '.join(s.split()).lower()
+        if key and key not in seen:
+            seen.add(key)
+            out.append(s)
+    return out
+
+
+def parse_connection(conn):
+    """Split 'city: DE - Berlin' into ('city', 'DE - Berlin'); unknown types are 'other'"""
+    # Expect format 'type: value' (this matches how Connection_full was created)
+    if isinstance(conn, str) and ': ' in conn:
+        t, v = conn.split(': ', 1)
+        t = t.strip().lower()
+        return (t if t in PARSED_TYPES else 'other'), v.strip()
+    return 'other', str(conn)
+
+
+def detailed_label(source, target, connections, parsed_connections):
+    """Build the detailed label: Source, Target, Competency(s), Impact(s), TargetMarket(s), City, Country
+
+    connections holds the pair's distinct Connection_full strings in the order
+    their rows appear. Single-valued fields take the first value met.
+    """
+
     parsed = {'city': [], 'country': [], 'competency': [], 'impact': [], 'target_market': [], 'other': []}
-    for conn in info['connections']:
-        # Expect format 'type: value' (this matches how Connection_full was created)
-        if isinstance(conn, str) and ': ' in conn:
-            t, v = conn.split(': ', 1)
-            t = t.strip().lower()
-            v = v.strip()
-            if t in parsed:
-                parsed[t].append(v)
-            else:
-                parsed['other'].append(v)
-        else:
-            parsed['other'].append(str(conn))
-
-    # Pick the 'connection name' as the first non-location value if available
-    connection_name = ''
-    for cand_type in ('competency', 'impact', 'target_market'):
-        if parsed[cand_type]:
-            connection_name = parsed[cand_type][0]
-            break
-    if not connection_name and parsed['other']:
-        connection_name = parsed['other'][0]
-
-    # Format city and country (normalize 'DE - Berlin' -> 'DE-Berlin' as example)
-    city = parsed['city'][0] if parsed['city'] else ''
-    country = parsed['country'][0] if parsed['country'] else ''
-    competency = parsed['competency'][0] if parsed['competency'] else ''
-
-    def norm_location(s):
-        return s.replace(' - ', '-').replace(' – ', '-').strip()
-
-    city = norm_location(city) if city else ''
-    country = norm_location(country) if country else ''
-
-    # Build the detailed label from explicit fields (no connection_name fallback):
-    # Order: Target, Competency(s), Impact(s), TargetMarket(s), City, Country
-    # Prepare lists for multi-valued fields (deduped, preserve order)
-    def dedupe_preserve_order(seq):
-        seen = set()
-        out = []
-        for s in seq:
-            key = ' '.join(s.split()).lower()
-            if key and key not in seen:
-                seen.add(key)
-                out.append(s)
-        return out
-
-    # Extract lists from parsed mapping
-    competencies = dedupe_preserve_order(parsed['competency'])
-    impacts = dedupe_preserve_order(parsed['impact'])
-    markets = dedupe_preserve_order(parsed['target_market'])
-
-    # Join multi-valued fields with semicolon
-    comp_str = ';'.join(competencies) if competencies else ''
-    imp_str = ';'.join(impacts) if impacts else ''
-    market_str = ';'.join(markets) if markets else ''
+    for conn in connections:
+        t, v = parsed_connections[conn]
+        parsed[t].append(v)
 
     # City and country are single-valued (first encountered)
-    city_str = city
-    country_str = country
+    city = norm_location(parsed['city'][0]) if parsed['city'] else ''
+    country = norm_location(parsed['country'][0]) if parsed['country'] else ''
+
+    # Multi-valued fields are deduped and joined with semicolons
+    comp_str = ';'.join(dedupe_preserve_order(parsed['competency']))
+    imp_str = ';'.join(dedupe_preserve_order(parsed['impact']))
+    market_str = ';'.join(dedupe_preserve_order(parsed['target_market']))
 
     # Put Source then Target first so both node names appear in the edge label
     raw_parts = []
-    # include source and target as the first tokens (source first)
     if source:
         raw_parts.append(source)
     if target and target != source:
         raw_parts.append(target)
-    # then include connection attributes: Competency(s), Impact(s), TargetMarket(s), City, Country
-    if comp_str:
-        raw_parts.append(comp_str)
-    if imp_str:
-        raw_parts.append(imp_str)
-    if market_str:
-        raw_parts.append(market_str)
-    if city_str:
-        raw_parts.append(city_str)
-    if country_str:
-        raw_parts.append(country_str)
-
-    # Deduplicate tokens while preserving order (case-insensitive). For semicolon-joined tokens we treat
-    # the whole chunk as a single token but we already deduped entries inside those chunks.
-    seen_tokens = set()
-    final_parts = []
-    for token in raw_parts:
-        key = ' '.join(token.split()).lower()
-        if key and key not in seen_tokens:
-            seen_tokens.add(key)
-            final_parts.append(token)
-
-    label_detailed = ', '.join(final_parts)
-
-    # Truncate label if too long
-    LABEL_MAX = 120
+    raw_parts.extend(part for part in (comp_str, imp_str, market_str, city, country) if part)
+
+    # Deduplicate tokens while preserving order (case-insensitive). Semicolon-joined
+    # chunks count as single tokens; their entries were deduped above.
+    label_detailed = ', '.join(dedupe_preserve_order(raw_parts))
+
     if len(label_detailed) > LABEL_MAX:
         label_detailed = label_detailed[:LABEL_MAX-1].rstrip(', ').rstrip() + '…'
-
-    weighted_edges.append({
-        'Source': source,
-        'Target': target,
-        'Weight': info['weight'],
-        'Types': ';'.join(sorted(info['types'])),
-        'Connections': ';'.join(sorted(info['connections'])),
-        'Label': f"{info['weight']} connections: " + ", ".join(sorted(info['types'])),  # summary label
-        'LabelDetailed': label_detailed,  # explicit detailed label for Gephi
-        'is_competency': 1 if 'competency' in info['types'] else 0,
-        'is_impact': 1 if 'impact' in info['types'] else 0,
-        'is_city': 1 if 'city' in info['types'] else 0,
-        'is_country': 1 if 'country' in info['types'] else 0,
-        'is_target_market': 1 if 'target_market' in info['types'] else 0
+    return label_detailed
+
+
+def _type_lists(pair_ids, types, n_pairs):
+    """Sorted distinct types of each pair as ';' and ', ' joined strings
+
+    Types are few, so each pair's type set is a bitmask over the sorted type
+    table and each distinct mask is only turned into strings once.
+    """
+
+    codes, table = pd.factorize(types, sort=True)
+    # Python ints keep the masks exact should there ever be more than 62 types
+    dtype = np.int64 if len(table) < 63 else object
+    masks = np.zeros(n_pairs, dtype=dtype)
+    np.bitwise_or.at(masks, pair_ids, np.left_shift(np.ones(len(codes), dtype=dtype), codes.astype(dtype)))
+
+    unique_masks, inverse = np.unique(masks, return_inverse=True)
+    names = [[table[bit] for bit in range(len(table)) if int(mask) >> bit & 1] for mask in unique_masks]
+    semicolon = np.array([';'.join(n) for n in names], dtype=object)[inverse]
+    comma = np.array([', '.join(n) for n in names], dtype=object)[inverse]
+    return semicolon, comma
+
+
+def weight_connections(edges_df):
+    """Combine connection rows into weighted edges, one per unordered startup pair
+
+    edges_df needs Source, Target, Type and Connection_full columns. Pairs come
+    out in order of first appearance with the names in sorted order, as in the
+    original row-by-row version. The output matches it byte for byte, except that
+    connections are taken in row order rather than the hash-seed dependent order
+    of a set, so labels no longer change from run to run. Grouping,
+    weights, type lists and flags are computed column-wise; only the connection
+    list and detailed label are built per pair.
+    """
+
+    columns = ['Source', 'Target', 'Weight', 'Types', 'Connections', 'Label', 'LabelDetailed',
+               'is_competency', 'is_impact', 'is_city', 'is_country', 'is_target_market']
+    if edges_df.empty:
+        return pd.DataFrame(columns=columns)
+
+    # Consistent key for each pair of nodes (alphabetically ordered)
+    source = edges_df['Source'].to_numpy(dtype=object)
+    target = edges_df['Target'].to_numpy(dtype=object)
+    swap = source > target
+    first = np.where(swap, target, source)
+    second = np.where(swap, source, target)
+
+    pairs = pd.DataFrame({'first': first, 'second': second})
+    pair_ids = pairs.groupby(['first', 'second'], sort=False).ngroup().to_numpy()
+    n_pairs = int(pair_ids.max()) + 1
+
+    # Row positions grouped by pair, in row order within each pair
+    order = np.argsort(pair_ids, kind='stable')
+    starts = np.searchsorted(pair_ids[order], np.arange(n_pairs))
+    pair_first_row = order[starts]
+
+    weights = np.bincount(pair_ids, minlength=n_pairs)
+    types = edges_df['Type'].to_numpy(dtype=object)
+    types_str, types_label = _type_lists(pair_ids, types, n_pairs)
+
+    # A pair's distinct connections in row order; this order picks the
+    # single-valued fields and orders the multi-valued ones in the label
+    connections = edges_df['Connection_full'].to_numpy(dtype=object)
+    parsed_connections = {conn: parse_connection(conn) for conn in pd.unique(connections)}
+    bounds = np.append(starts, len(order))[1:].tolist()
+    ordered_connections = connections[order].tolist()
+    sources = first[pair_first_row].tolist()
+    targets = second[pair_first_row].tolist()
+    connections_str = []
+    labels_detailed = []
+    start = 0
+    for pair, end in enumerate(bounds):
+        pair_connections = dict.fromkeys(ordered_connections[start:end])
+        connections_str.append(';'.join(sorted(pair_connections)))
+        labels_detailed.append(detailed_label(sources[pair], targets[pair], pair_connections, parsed_connections))
+        start = end
+
+    weighted = pd.DataFrame({
+        'Source': sources,
+        'Target': targets,
+        'Weight': weights.astype(np.int64),
+        'Types': types_str,
+        'Connections': connections_str,
+        'Label': [f"{weight} connections: {label}" for weight, label in zip(weights.tolist(), types_label)],
+        'LabelDetailed': labels_detailed,
     })
+    for flag_type in FLAG_TYPES:
+        flag = np.zeros(n_pairs, dtype=np.int64)
+        flag[pair_ids[types == flag_type]] = 1
+        weighted[f'is_{flag_type}'] = flag
+    return weighted[columns]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Combine startup connections into weighted edges")
+    parser.add_argument('--edges', default='startup_connections_full.csv',
+                        help="Per-connection CSV with Source, Target, Type and Connection_full columns")
+    parser.add_argument('--nodes', default='startup_nodes_full.csv',
+                        help="Node CSV, only used for the summary statistics")
+    parser.add_argument('--output', default='startup_connections_weighted.csv',
+                        help="Weighted edge CSV to write")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Read the full connections dataset
+    edges_df = pd.read_csv(args.edges, encoding='utf-8')
+    nodes_df = pd.read_csv(args.nodes, encoding='utf-8')
+
+    weighted_edges_df = weight_connections(edges_df)
+
+    # Export weighted dataset
+    weighted_edges_df.to_csv(args.output, index=False, encoding='utf-8')
 
-weighted_edges_df = pd.DataFrame(weighted_edges)
+    print("\nWeighted dataset statistics:")
+    print(f"Nodes: {len(nodes_df)}")
+    print(f"Original edges: {len(edges_df)}")
+    print(f"Weighted edges: {len(weighted_edges_df)}")
 
-# Export weighted dataset
-weighted_edges_df.to_csv('startup_connections_weighted.csv', index=False, encoding='utf-8')
+    print("\nWeight distribution:")
+    print(weighted_edges_df['Weight'].describe())
 
-print("\nWeighted dataset statistics:")
-print(f"Nodes: {len(nodes_df)}")
-print(f"Original edges: {len(edges_df)}")
-print(f"Weighted edges: {len(weighted_edges_df)}")
+    # Print sample of weighted edges
+    print("\nSample of weighted edges (showing high-weight connections):")
+    sample = weighted_edges_df.nlargest(10, 'Weight')[['Source', 'Target', 'Weight', 'Types', 'LabelDetailed']]
+    print(sample.to_string(index=False))
 
-print("\nWeight distribution:")
-print(weighted_edges_df['Weight'].describe())
 
-# Print sample of weighted edges
-print("\nSample of weighted edges (showing high-weight connections):")
-sample = weighted_edges_df.nlargest(10, 'Weight')[['Source', 'Target', 'Weight', 'Types', 'LabelDetailed']]
-print(sample.to_string(index=False))
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,27 @@ Fetches startup data from Airtable, processes connections, and outputs JSON for
 """
 
 import os
+import re
 import json
+import hashlib
+import sys
+import argparse
 import requests
 from dotenv import load_dotenv
-from collections import defaultdict
+from array import array
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
 from itertools import combinations
 
+from airtable_client import AirtableClient, record_id_partitions
+from edge_accumulator import VALUE_ID_TYPECODE, CompactEdges, EdgeRecord
+from graph_patches import PATCH_DIR, build_patch, load_manifest, next_version, record_version
+from logo_atlas import DOWNLOAD_WORKERS, THUMB_SIZE, record_logo
+from record_store import STORE_FILE, RecordStore
+from run_metrics import METRICS_FILE, PROFILE_FILE, RunMetrics, size_histogram
+from snapshot_store import SNAPSHOT_FILE, SnapshotStore
+from stream_writer import JSONStreamWriter, PrecompressedWriter
+
 # Load environment variables
 load_dotenv()
 
@@ -17,48 +32,185 @@ AIRTABLE_TOKEN = os.getenv('AIRTABLE_TOKEN')
 AIRTABLE_BASE_ID = os.getenv('AIRTABLE_BASE_ID')
 AIRTABLE_TABLE_ID = os.getenv('AIRTABLE_TABLE_NAME') or os.getenv('AIRTABLE_TABLE_ID')
 
+# Local copy of the last fetched records for incremental syncs
+CACHE_FILE = 'airtable_cache.json'
+# Re-fetch edits slightly older than the last sync to absorb clock skew
+SYNC_OVERLAP = timedelta(minutes=5)
+# Primary field requested when only record IDs are needed
+ID_PASS_FIELD = 'Startup'
+# Fields read by index_records; nothing else is downloaded
+ETL_FIELDS = [
+    'Startup', 'Description', 'Website', 'One liner', 'Location (HQ)', 'Logo',
+    'Core Competencies', 'Technical Competencies (Test)', 'Impact',
+    'Location (City)', 'Location (Country)', 'Region', 'Cohort',
+]
 
-def fetch_all_records():
-    """Fetch all records from Airtable with pagination"""
+
+def make_client():
+    """Airtable client for the configured base and table"""
+    return AirtableClient(AIRTABLE_TOKEN, AIRTABLE_BASE_ID, AIRTABLE_TABLE_ID)
+
+
+def fetch_records(client, params=None, fields=ETL_FIELDS, workers=1, quiet=False):
+    """Fetch every page of a list request, sorted by record id
     
-    url = f"https://api.airtable.com/v0/{AIRTABLE_BASE_ID}/{AIRTABLE_TABLE_ID}"
-    headers = {
-        "Authorization": f"Bearer {AIRTABLE_TOKEN}",
-        "Content-Type": "application/json"
-    }
+    With workers > 1 the table is split into record-ID partitions fetched in
+    parallel. Both paths return the same order (see sort_records), so node
+    order and the input hash do not depend on workers. Failures raise once the
+    client's retries are exhausted, so a partial result is never mistaken for
+    the whole table.
+    """
+    
+    if workers > 1:
+        partitions = record_id_partitions(workers * 2)
+        all_records = client.list_records_parallel(partitions, params, fields, workers=workers)
+        if not quiet:
+            print(f"   Fetched {len(all_records)} records from {len(partitions)} partitions")
+        return sort_records(all_records)
     
     all_records = []
-    offset = None
+    for records in client.iter_pages(params, fields):
+        all_records.extend(records)
+        if not quiet:
+            print(f"   Fetched {len(all_records)} records so far...")
+    
+    return sort_records(all_records)
+
+
+def sort_records(records):
+    """Records in canonical order: by record id, whatever order they were fetched in"""
+    return sorted(records, key=lambda record: record['id'])
+
+
+def fetch_all_records(client=None, workers=1, metrics=None):
+    """Fetch all records from Airtable with pagination"""
     
+    metrics = metrics or RunMetrics()
     print("📥 Fetching records from Airtable...")
     
-    while True:
-        params = {}
-        if offset:
-            params['offset'] = offset
-            
-        try:
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            records = data.get('records', [])
-            all_records.extend(records)
-            
-            print(f"   Fetched {len(all_records)} records so far...")
-            
-            offset = data.get('offset')
-            if not offset:
-                break
-                
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Error fetching records: {e}")
-            return []
+    client = client or make_client()
+    with metrics.stage('fetch'):
+        all_records = fetch_records(client, workers=workers)
+    metrics.record('fetch', mode='full', records=len(all_records))
+    metrics.record_http('fetch', client)
     
     print(f"✅ Total records fetched: {len(all_records)}\n")
     return all_records
 
 
+def load_record_cache(cache_file=CACHE_FILE):
+    """Load the last synced records, or None if there is no usable cache"""
+    
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    if cache.get('base_id') != AIRTABLE_BASE_ID or cache.get('table_id') != AIRTABLE_TABLE_ID:
+        return None
+    return cache
+
+
+def save_record_cache(records, synced_at, cache_file=CACHE_FILE):
+    """Persist records together with the time the sync started"""
+    
+    cache = {
+        'base_id': AIRTABLE_BASE_ID,
+        'table_id': AIRTABLE_TABLE_ID,
+        'synced_at': synced_at.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+        'records': records
+    }
+    tmp_file = cache_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp_file, cache_file)
+
+
+def fetch_records_incremental(client, cache_file=CACHE_FILE, full_refresh=False, workers=1, metrics=None):
+    """Bring the local record cache up to date and return its records
+    
+    With a cache, only records modified since the last sync are downloaded,
+    plus one primary-field-only pass over the table to find deletions. Without one (or with full_refresh) the whole table
+    is fetched, in parallel partitions when workers > 1. Records come back
+    sorted by id either way. The cache is only rewritten when every request
+    succeeded.
+    """
+    
+    metrics = metrics or RunMetrics()
+    cache = None if full_refresh else load_record_cache(cache_file)
+    
+    # Taken before any request so edits made during the sync are picked up next time
+    sync_started = datetime.now(timezone.utc)
+    
+    if cache is None:
+        reason = "full refresh requested" if full_refresh else "no usable cache"
+        print(f"📥 Fetching all records from Airtable ({reason})...")
+        records = fetch_records(client, workers=workers)
+        metrics.record('fetch', mode='full', reason=reason)
+        print(f"✅ Total records fetched: {len(records)}\n")
+    else:
+        since = datetime.strptime(cache['synced_at'], '%Y-%m-%dT%H:%M:%S.000Z') - SYNC_OVERLAP
+        print(f"📥 Fetching records modified since {since.strftime('%Y-%m-%d %H:%M:%S')} UTC...")
+        
+        id_pass = fetch_records(client, fields=[ID_PASS_FIELD], quiet=True)
+        formula = f"IS_AFTER(LAST_MODIFIED_TIME(), DATETIME_PARSE('{since.strftime('%Y-%m-%dT%H:%M:%S.000Z')}'))"
+        changed = fetch_records(client, {'filterByFormula': formula}, quiet=True)
+        
+        records_by_id = {record['id']: record for record in cache['records']}
+        records_by_id.update((record['id'], record) for record in changed)
+        
+        # Current records, plus anything created between the two passes
+        current_ids = {record['id'] for record in id_pass} | {record['id'] for record in changed}
+        deleted = len(set(records_by_id) - current_ids)
+        records = sort_records(record for record_id, record in records_by_id.items() if record_id in current_ids)
+        
+        metrics.record('fetch', mode='incremental', changed=len(changed), deleted=deleted)
+        print(f"   {len(changed)} new or modified, {deleted} deleted")
+        print(f"✅ Total records in cache: {len(records)}\n")
+    
+    save_record_cache(records, sync_started, cache_file)
+    metrics.record('fetch', records=len(records))
+    return records
+
+
+def stream_records(client, cache_file=CACHE_FILE):
+    """Yield every record of the table one page at a time, rewriting the cache as they pass
+    
+    Incremental syncs need the whole cache in memory, so streaming always
+    fetches the full table. The new cache only replaces the old one once the
+    last page has been read; a failed or abandoned fetch leaves it untouched.
+    """
+    
+    sync_started = datetime.now(timezone.utc)
+    print("📥 Streaming all records from Airtable...")
+    
+    tmp_file = cache_file + '.tmp'
+    fetched = 0
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        try:
+            writer = JSONStreamWriter(f)
+            writer.member('base_id', AIRTABLE_BASE_ID)
+            writer.member('table_id', AIRTABLE_TABLE_ID)
+            writer.member('synced_at', sync_started.strftime('%Y-%m-%dT%H:%M:%S.000Z'))
+            writer.begin_array('records')
+            for page in client.iter_pages(fields=ETL_FIELDS):
+                for record in page:
+                    writer.append(record)
+                fetched += len(page)
+                print(f"   Fetched {fetched} records so far...")
+                yield from page
+            writer.end_array()
+            writer.close()
+        except BaseException:
+            f.close()
+            os.remove(tmp_file)
+            raise
+    
+    os.replace(tmp_file, cache_file)
+    print(f"✅ Total records fetched: {fetched}\n")
+
+
 def clean_array_field(field_value):
     """Convert Airtable array fields to clean lists"""
     if not field_value:
@@ -75,223 +227,1822 @@ def normalize_location(location_str):
     return location_str.replace(' - ', '-').replace(' – ', '-').strip()
 
 
-def process_records(records):
-    """Process Airtable records into nodes and edges structure"""
+# Connection types in indexing order: (type, Airtable field, edge attribute)
+CONNECTION_FIELDS = [
+    ('competency', 'Core Competencies', 'competencies'),
+    ('technical_competency', 'Technical Competencies (Test)', 'technical_competencies'),
+    ('impact', 'Impact', 'impacts'),
+    ('country', 'Location (Country)', 'countries'),
+    ('city', 'Location (City)', 'cities'),
+    ('region', 'Region', 'regions'),
+    ('cohort', 'Cohort', 'cohorts'),
+]
+
+CONNECTION_TYPES = [conn_type for conn_type, _, _ in CONNECTION_FIELDS]
+TYPE_ATTRIBUTES = {conn_type: attr for conn_type, _, attr in CONNECTION_FIELDS}
+
+EDGE_ENGINES = ('python', 'sparse', 'parallel')
+
+OUTPUT_FORMATS = ('full', 'compact', 'sharded')
+COMPACT_FORMAT = 'chemstars-compact'
+COMPACT_VERSION = 1
+SHARDED_FORMAT = 'chemstars-sharded'
+SHARDED_VERSION = 2
+# Sharded output: core file with nodes and manifest, plus edges-<type>.json shards
+SHARD_DIR = 'network'
+SHARD_CORE_FILE = 'core.json'
+# Level-of-detail output: an overview of supernodes plus one drill-down file per supernode
+OVERVIEW_GROUPS = ('community', 'cohort', 'region')
+OVERVIEW_FORMAT = 'chemstars-overview'
+OVERVIEW_VERSION = 1
+OVERVIEW_DIR = 'overview'
+OVERVIEW_FILE = 'overview.json'
+# Nodes and edges serialized per list to estimate the full format's size for compact and sharded output
+FULL_SIZE_SAMPLE = 500
+# Digest of the normalized input written next to the output, e.g. network/core.json.input-hash
+INPUT_HASH_SUFFIX = '.input-hash'
+# Bump when a code change alters the output for the same input
+INPUT_HASH_VERSION = 2
+
+
+def index_records(records):
+    """Build node list and connection index from raw Airtable records
     
-    print("🔄 Processing records into nodes and edges...")
+    records may be any iterable, e.g. stream_records; each record is folded
+    into the index as it arrives.
+    """
     
     nodes = []
-    edges_raw = []
     
     # Track which startups share connections
     connection_index = defaultdict(list)  # {connection_value: [startup_ids]}
     
     for record in records:
-        record_id = record['id']
         fields = record['fields']
         
-        # Extract node data
-        startup_name = fields.get('Startup', '').strip()
-        if not startup_name:
+        node = startup_node(fields)
+        if node is None:
             continue
-        
-        # Create node
-        node = {
-            'id': startup_name,
-            'label': startup_name,
-            'description': fields.get('Description', ''),
-            'website': fields.get('Website', ''),
-            'one_liner': fields.get('One liner', ''),
-            'location_hq': clean_array_field(fields.get('Location (HQ)', [])),
-            'logo_url': fields.get('Logo', [{}])[0].get('url', '') if fields.get('Logo') else ''
-        }
         nodes.append(node)
         
-        # Extract connection fields
-        competencies = clean_array_field(fields.get('Core Competencies', []))
-        technical_competencies = clean_array_field(fields.get('Technical Competencies (Test)', []))
-        impacts = clean_array_field(fields.get('Impact', []))
-        countries = clean_array_field(fields.get('Location (Country)', []))
-        cities = clean_array_field(fields.get('Location (City)', []))
-        regions = clean_array_field(fields.get('Region', []))
-        cohorts = clean_array_field(fields.get('Cohort', []))
-        
-        # Index connections by type
-        for comp in competencies:
-            connection_index[('competency', comp)].append(startup_name)
-        for tech_comp in technical_competencies:
-            connection_index[('technical_competency', tech_comp)].append(startup_name)
-        for impact in impacts:
-            connection_index[('impact', impact)].append(startup_name)
-        for country in countries:
-            connection_index[('country', country)].append(startup_name)
-        for city in cities:
-            connection_index[('city', city)].append(startup_name)
-        for region in regions:
-            connection_index[('region', region)].append(startup_name)
-        for cohort in cohorts:
-            connection_index[('cohort', cohort)].append(startup_name)
+        # Extract connection fields and index them by type
+        for key in record_connections(fields):
+            connection_index[key].append(node['id'])
     
-    print(f"   Created {len(nodes)} nodes")
-    print(f"   Found {len(connection_index)} unique connection values\n")
+    return nodes, connection_index
+
+
+def startup_node(fields):
+    """Node for a record's fields, or None if it has no startup name"""
     
-    # Create edges between startups that share connections
-    print("🔗 Creating edges from shared connections...")
-    
-    combined_edges = defaultdict(lambda: {
-        'weight': 0,
-        'types': set(),
-        'connections': set(),
-        'competencies': set(),
-        'technical_competencies': set(),
-        'impacts': set(),
-        'cities': set(),
-        'countries': set(),
-        'regions': set(),
-        'cohorts': set()
-    })
+    startup_name = fields.get('Startup', '').strip()
+    if not startup_name:
+        return None
     
-    for (conn_type, conn_value), startup_list in connection_index.items():
+    return {
+        'id': startup_name,
+        'label': startup_name,
+        'description': fields.get('Description', ''),
+        'website': fields.get('Website', ''),
+        'one_liner': fields.get('One liner', ''),
+        'location_hq': clean_array_field(fields.get('Location (HQ)', [])),
+        'logo_url': fields.get('Logo', [{}])[0].get('url', '') if fields.get('Logo') else ''
+    }
+
+
+def record_connections(fields):
+    """(type, value) connections of a record's fields, in CONNECTION_FIELDS order"""
+    for conn_type, field_name, _ in CONNECTION_FIELDS:
+        for value in clean_array_field(fields.get(field_name, [])):
+            yield conn_type, value
+
+
+def record_entries(records):
+    """(record, startup name, connections) for RecordStore.sync
+    
+    Records without a startup name are stored without connections, as
+    index_records skips them.
+    """
+    
+    for record in records:
+        fields = record['fields']
+        startup_name = fields.get('Startup', '').strip()
+        connections = list(record_connections(fields)) if startup_name else []
+        yield record, startup_name, connections
+
+
+def sync_record_store(records, store_file, synced_at):
+    """Mirror the fetched records into the SQLite record store"""
+    
+    synced_at = synced_at.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    with RecordStore(store_file) as store:
+        added, changed, deleted = store.sync(record_entries(records), synced_at,
+                                             {'base_id': AIRTABLE_BASE_ID, 'table_id': AIRTABLE_TABLE_ID})
+    print(f"📦 Record store {store_file}: {added} added, {changed} changed, {deleted} deleted\n")
+
+
+def index_record_store(store):
+    """index_records for a RecordStore: nodes from its records, connection index from SQL"""
+    
+    nodes = [node for node in (startup_node(record['fields']) for record in store.records()) if node]
+    return nodes, store.connection_index()
+
+
+def combine_edges(connection_index):
+    """Expand every connection bucket into pairwise edge accumulators (see edge_accumulator.py)"""
+    
+    combined_edges = CompactEdges(connection_index, TYPE_ATTRIBUTES)
+    name_ids = combined_edges.name_ids
+    
+    for value_id, ((conn_type, _), startup_list) in enumerate(connection_index.items()):
         # Create edges between all pairs of startups sharing this connection
         if len(startup_list) < 2:
             continue
-            
-        for source, target in combinations(sorted(startup_list), 2):
-            # Create consistent edge key (alphabetically ordered)
-            edge_key = tuple(sorted([source, target]))
-            edge_info = combined_edges[edge_key]
-            
-            edge_info['weight'] += 1
-            edge_info['types'].add(conn_type)
-            edge_info['connections'].add(f"{conn_type}: {conn_value}")
-            
-            # Track by specific type for filtering
-            if conn_type == 'competency':
-                edge_info['competencies'].add(conn_value)
-            elif conn_type == 'technical_competency':
-                edge_info['technical_competencies'].add(conn_value)
-            elif conn_type == 'impact':
-                edge_info['impacts'].add(conn_value)
-            elif conn_type == 'city':
-                edge_info['cities'].add(conn_value)
-            elif conn_type == 'country':
-                edge_info['countries'].add(conn_value)
-            elif conn_type == 'region':
-                edge_info['regions'].add(conn_value)
-            elif conn_type == 'cohort':
-                edge_info['cohorts'].add(conn_value)
-    
-    # Build final edges list
-    edges = []
-    for (source, target), info in combined_edges.items():
-        # Create detailed label
-        label_parts = []
-        if info['competencies']:
-            label_parts.append('; '.join(sorted(info['competencies'])))
-        if info['technical_competencies']:
-            label_parts.append('; '.join(sorted(info['technical_competencies'])))
-        if info['impacts']:
-            label_parts.append('; '.join(sorted(info['impacts'])))
-        if info['cities']:
-            label_parts.append('; '.join([normalize_location(c) for c in sorted(info['cities'])]))
-        if info['countries']:
-            label_parts.append('; '.join([normalize_location(c) for c in sorted(info['countries'])]))
-        if info['regions']:
-            label_parts.append('; '.join(sorted(info['regions'])))
-        if info['cohorts']:
-            label_parts.append('; '.join(sorted(info['cohorts'])))
         
-        label_detailed = ', '.join(label_parts)
+        type_bit = combined_edges.type_bits[conn_type]
+        # Ids follow name order, so each pair comes out (source, target) alphabetically
+        for source, target in combinations(sorted(name_ids[name] for name in startup_list), 2):
+            combined_edges.record(source, target).add(type_bit, value_id)
+    
+    return combined_edges
+
+
+def combine_edges_parallel(connection_index, workers=None):
+    """Same accumulators as combine_edges, with buckets expanded on a process pool (see parallel_edges.py)"""
+    
+    from parallel_edges import combine_parallel
+    
+    return combine_parallel(connection_index, CompactEdges(connection_index, TYPE_ATTRIBUTES), workers)
+
+
+def combine_with_engine(connection_index, engine='python', edge_workers=None):
+    """Run one of EDGE_ENGINES over the connection index"""
+    
+    if engine == 'sparse':
+        return combine_edges_sparse(connection_index)
+    if engine == 'parallel':
+        return combine_edges_parallel(connection_index, edge_workers)
+    return combine_edges(connection_index)
+
+
+def combine_edges_sparse(connection_index):
+    """Same accumulators as combine_edges, from a sparse incidence-matrix product"""
+    
+    from sparse_edges import shared_pairs
+    
+    combined_edges = CompactEdges(connection_index, TYPE_ATTRIBUTES)
+    value_ids = {key: value_id for value_id, key in enumerate(combined_edges.value_keys)}
+    
+    # Many pairs share exactly the same values, so each distinct shared-value
+    # list is encoded once and its value array shared by every such pair
+    encoded_by_keys = {}
+    
+    for source, target, weight, shared_keys in shared_pairs(connection_index):
+        encoded = encoded_by_keys.get(id(shared_keys))
+        if encoded is None:
+            type_mask = 0
+            for conn_type, _ in shared_keys:
+                type_mask |= combined_edges.type_bits[conn_type]
+            ids = array(VALUE_ID_TYPECODE, sorted(value_ids[key] for key in shared_keys))
+            encoded = encoded_by_keys[id(shared_keys)] = (shared_keys, type_mask, ids)
+        
+        combined_edges[(source, target)] = EdgeRecord(weight, encoded[1], encoded[2])
+    
+    return combined_edges
+
+
+def edge_from_info(source, target, info):
+    """Turn one materialized edge accumulator (see CompactEdges.edge_info) into the exported edge dict
+    
+    Types follow CONNECTION_TYPES and values are sorted, so the output does
+    not depend on set iteration order (which changes with the hash seed).
+    """
+    
+    # Create detailed label
+    label_parts = []
+    if info['competencies']:
+        label_parts.append('; '.join(sorted(info['competencies'])))
+    if info['technical_competencies']:
+        label_parts.append('; '.join(sorted(info['technical_competencies'])))
+    if info['impacts']:
+        label_parts.append('; '.join(sorted(info['impacts'])))
+    if info['cities']:
+        label_parts.append('; '.join([normalize_location(c) for c in sorted(info['cities'])]))
+    if info['countries']:
+        label_parts.append('; '.join([normalize_location(c) for c in sorted(info['countries'])]))
+    if info['regions']:
+        label_parts.append('; '.join(sorted(info['regions'])))
+    if info['cohorts']:
+        label_parts.append('; '.join(sorted(info['cohorts'])))
+    
+    label_detailed = ', '.join(label_parts)
+    
+    # Truncate if too long
+    MAX_LABEL = 120
+    if len(label_detailed) > MAX_LABEL:
+        label_detailed = label_detailed[:MAX_LABEL-1].rstrip(', ') + '…'
+    
+    edge = {
+        'source': source,
+        'target': target,
+        'weight': info['weight'],
+        'label': f"{info['weight']} connections",
+        'label_detailed': label_detailed,
+        'types': [conn_type for conn_type in CONNECTION_TYPES if conn_type in info['types']],
+        'is_competency': 'competency' in info['types'],
+        'is_technical_competency': 'technical_competency' in info['types'],
+        'is_impact': 'impact' in info['types'],
+        'is_city': 'city' in info['types'],
+        'is_country': 'country' in info['types'],
+        'is_region': 'region' in info['types'],
+        'is_cohort': 'cohort' in info['types'],
+        'competencies': sorted(info['competencies']),
+        'technical_competencies': sorted(info['technical_competencies']),
+        'impacts': sorted(info['impacts']),
+        'cities': sorted(info['cities']),
+        'countries': sorted(info['countries']),
+        'regions': sorted(info['regions']),
+        'cohorts': sorted(info['cohorts'])
+    }
+    return edge
+
+
+def build_edges(combined_edges):
+    """Turn edge accumulators into the exported edge dicts, materializing one at a time"""
+    return [edge_from_info(source, target, combined_edges.edge_info(record))
+            for (source, target), record in combined_edges.items()]
+
+
+def iter_edges(connection_index, min_weight=0):
+    """Yield the same edges as combine_edges + build_edges, one source startup at a time
+    
+    Only the current startup's neighbour accumulators are held, so memory stays
+    at the size of the connection index however many edges there are. Edges
+    come out ordered by source then target name. Edges lighter than min_weight
+    are skipped.
+    """
+    
+    # Interning only; the accumulators of one source live in neighbours
+    table = CompactEdges(connection_index, TYPE_ATTRIBUTES)
+    
+    # Member counts per bucket, and the buckets of each startup
+    bucket_counts = {}
+    memberships = defaultdict(list)
+    for value_id, (key, startup_list) in enumerate(connection_index.items()):
+        if len(startup_list) < 2:
+            continue
+        counts = bucket_counts[value_id] = Counter(startup_list)
+        for startup_name, count in counts.items():
+            memberships[startup_name].append((value_id, table.type_bits[key[0]], count))
+    
+    for source in sorted(memberships):
+        neighbours = {}
+        for value_id, type_bit, source_count in memberships[source]:
+            for target, target_count in bucket_counts[value_id].items():
+                if target < source:
+                    continue
+                # combinations() pairs k copies of one name with each other k(k-1)/2 times
+                if target == source:
+                    weight = source_count * (source_count - 1) // 2
+                else:
+                    weight = source_count * target_count
+                if not weight:
+                    continue
+                record = neighbours.get(target)
+                if record is None:
+                    record = neighbours[target] = EdgeRecord()
+                record.add(type_bit, value_id, weight)
+        
+        for target in sorted(neighbours):
+            record = neighbours[target]
+            if record.weight >= min_weight:
+                yield edge_from_info(source, target, table.edge_info(record))
+
+
+def split_hub_buckets(connection_index, nodes, max_bucket_size):
+    """Move oversized buckets out of the connection index and onto their nodes
+    
+    max_bucket_size maps a connection type to the largest bucket that still
+    produces edges; the key '*' applies to every type without its own limit.
+    Values of larger buckets are stored on each member node under the type's
+    edge attribute name (e.g. node['regions']) instead of linking every pair.
+    Returns the number of buckets moved and the pair links they would have made.
+    """
+    
+    nodes_by_id = defaultdict(list)
+    for node in nodes:
+        nodes_by_id[node['id']].append(node)
+    
+    hub_buckets = 0
+    skipped_pairs = 0
+    for key in list(connection_index):
+        conn_type, conn_value = key
+        limit = max_bucket_size.get(conn_type, max_bucket_size.get('*'))
+        startup_list = connection_index[key]
+        if limit is None or len(startup_list) <= limit:
+            continue
         
-        # Truncate if too long
-        MAX_LABEL = 120
-        if len(label_detailed) > MAX_LABEL:
-            label_detailed = label_detailed[:MAX_LABEL-1].rstrip(', ') + '…'
+        del connection_index[key]
+        hub_buckets += 1
+        skipped_pairs += len(startup_list) * (len(startup_list) - 1) // 2
         
-        edge = {
-            'source': source,
-            'target': target,
-            'weight': info['weight'],
-            'label': f"{info['weight']} connections",
-            'label_detailed': label_detailed,
-            'types': list(info['types']),
-            'is_competency': 'competency' in info['types'],
-            'is_technical_competency': 'technical_competency' in info['types'],
-            'is_impact': 'impact' in info['types'],
-            'is_city': 'city' in info['types'],
-            'is_country': 'country' in info['types'],
-            'is_region': 'region' in info['types'],
-            'is_cohort': 'cohort' in info['types'],
-            'competencies': list(info['competencies']),
-            'technical_competencies': list(info['technical_competencies']),
-            'impacts': list(info['impacts']),
-            'cities': list(info['cities']),
-            'countries': list(info['countries']),
-            'regions': list(info['regions']),
-            'cohorts': list(info['cohorts'])
-        }
-        edges.append(edge)
+        attr = TYPE_ATTRIBUTES[conn_type]
+        for startup_name in dict.fromkeys(startup_list):
+            for node in nodes_by_id[startup_name]:
+                node.setdefault(attr, []).append(conn_value)
+    
+    return hub_buckets, skipped_pairs
+
+
+def prune_by_weight(combined_edges, min_weight):
+    """Drop edges lighter than min_weight, returning how many were removed"""
+    
+    weak = [edge_key for edge_key, record in combined_edges.items() if record.weight < min_weight]
+    for edge_key in weak:
+        del combined_edges[edge_key]
+    return len(weak)
+
+
+def prune_to_top_k(combined_edges, top_k):
+    """Keep only each node's top_k strongest edges, returning how many were removed
+    
+    An edge survives if it is among the top_k of either endpoint. Ties are
+    broken by neighbour name so the result does not depend on dict order.
+    """
+    
+    neighbours = defaultdict(list)
+    for (source, target), record in combined_edges.items():
+        neighbours[source].append((record.weight, target, (source, target)))
+        neighbours[target].append((record.weight, source, (source, target)))
+    
+    keep = set()
+    for node_edges in neighbours.values():
+        node_edges.sort(key=lambda item: (-item[0], item[1]))
+        keep.update(edge_key for _, _, edge_key in node_edges[:top_k])
+    
+    dropped = [edge_key for edge_key in combined_edges if edge_key not in keep]
+    for edge_key in dropped:
+        del combined_edges[edge_key]
+    return len(dropped)
+
+
+def process_records(records, engine='python', pruning=None, metrics=None, edge_workers=None):
+    """Process Airtable records into nodes and edges structure
+    
+    engine selects how shared connections are expanded into edges:
+    'python' walks every pair in each bucket, 'sparse' uses a sparse
+    incidence-matrix product (see sparse_edges.py) and 'parallel' walks the
+    buckets on edge_workers processes (default: all cores, see
+    parallel_edges.py). All give the same edges.
+    
+    pruning optionally bounds the graph size, applied in this order:
+      max_bucket_size: {type or '*': n} - larger buckets become node attributes
+      min_weight: drop edges with fewer shared connections
+      top_k: keep each node's k strongest edges
+    """
+    
+    metrics = metrics or RunMetrics()
+    
+    if engine not in EDGE_ENGINES:
+        raise ValueError(f"Unknown edge engine {engine!r}, expected one of {EDGE_ENGINES}")
+    
+    print("🔄 Processing records into nodes and edges...")
+    
+    with metrics.stage('index'):
+        nodes, connection_index = index_records(records)
+    return process_index(nodes, connection_index, engine, pruning, metrics, edge_workers)
+
+
+def process_index(nodes, connection_index, engine='python', pruning=None, metrics=None, edge_workers=None):
+    """The edge half of process_records, for an already built connection index"""
+    
+    pruning = pruning or {}
+    metrics = metrics or RunMetrics()
+    
+    if engine not in EDGE_ENGINES:
+        raise ValueError(f"Unknown edge engine {engine!r}, expected one of {EDGE_ENGINES}")
+    
+    print(f"   Created {len(nodes)} nodes")
+    print(f"   Found {len(connection_index)} unique connection values\n")
+    metrics.record('index', nodes=len(nodes), connection_values=len(connection_index),
+                   buckets=bucket_statistics(connection_index))
+    
+    with metrics.stage('edges'):
+        if pruning.get('max_bucket_size'):
+            hub_buckets, skipped_pairs = split_hub_buckets(connection_index, nodes, pruning['max_bucket_size'])
+            metrics.record('edges', hub_buckets=hub_buckets, hub_pairs_skipped=skipped_pairs)
+            print(f"✂️  Max bucket size: moved {hub_buckets} oversized buckets to node attributes "
+                  f"({skipped_pairs} pair links not generated)\n")
+        
+        # Create edges between startups that share connections
+        print(f"🔗 Creating edges from shared connections ({engine} engine)...")
+        
+        combined_edges = combine_with_engine(connection_index, engine, edge_workers)
+        metrics.record('edges', engine=engine, pairs_generated=pair_count(connection_index),
+                       unique_pairs=len(combined_edges))
+        
+        if pruning.get('min_weight'):
+            removed = prune_by_weight(combined_edges, pruning['min_weight'])
+            metrics.record('edges', removed_by_min_weight=removed)
+            print(f"✂️  Min weight {pruning['min_weight']}: removed {removed} edges")
+        if pruning.get('top_k'):
+            removed = prune_to_top_k(combined_edges, pruning['top_k'])
+            metrics.record('edges', removed_by_top_k=removed)
+            print(f"✂️  Top {pruning['top_k']} neighbours: removed {removed} edges")
+        
+        # Build final edges list
+        edges = build_edges(combined_edges)
+    metrics.record('edges', edges=len(edges))
     
     print(f"   Created {len(edges)} edges\n")
     
     return nodes, edges
 
 
-def export_json(nodes, edges, output_file='network_data.json'):
-    """Export nodes and edges to JSON format for sigma.js/graphology"""
+def bucket_statistics(connection_index):
+    """Per connection type: bucket count, largest bucket and a histogram of bucket sizes"""
+    
+    sizes = defaultdict(list)
+    for (conn_type, _), startup_list in connection_index.items():
+        sizes[conn_type].append(len(startup_list))
+    return {
+        conn_type: {'buckets': len(sizes[conn_type]), 'max_size': max(sizes[conn_type]),
+                    'histogram': size_histogram(sizes[conn_type])}
+        for conn_type in CONNECTION_TYPES if sizes[conn_type]
+    }
+
+
+def pair_count(connection_index):
+    """Startup pairs the buckets expand to before shared pairs are merged into edges"""
+    return sum(len(startup_list) * (len(startup_list) - 1) // 2 for startup_list in connection_index.values())
+
+
+def load_previous_nodes(output_file='network_data.json', output_format='full'):
+    """Nodes of the last export by id and its metadata, ({}, {}) if there is none
+    
+    Their positions warm-start the layout (see node_positions) and their
+    communities keep community labels stable (see analyze_nodes).
+    """
+    
+    if output_format == 'sharded':
+        output_file = os.path.join(SHARD_DIR, SHARD_CORE_FILE)
+    try:
+        with open(output_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}, {}
+    
+    nodes = {}
+    for node in data.get('nodes', []):
+        nodes.setdefault(node['id'], node)
+    return nodes, data.get('metadata') or {}
+
+
+def node_positions(nodes_by_id):
+    """{id: (x, y)} of the nodes ({id: node}) that have a position"""
+    return {
+        node_id: (node['x'], node['y'])
+        for node_id, node in nodes_by_id.items()
+        if isinstance(node.get('x'), (int, float)) and isinstance(node.get('y'), (int, float))
+    }
+
+
+def node_communities(nodes_by_id):
+    """{id: community} of the nodes ({id: node}) that have one"""
+    return {node_id: node['community'] for node_id, node in nodes_by_id.items()
+            if isinstance(node.get('community'), int)}
+
+
+def layout_fingerprint(node_index, sources, targets, weights):
+    """Digest of everything the layout depends on: node ids and weighted edges, in any order"""
+    
+    names = list(node_index)
+    edges = sorted(zip((names[s] for s in sources), (names[t] for t in targets), weights))
+    digest = hashlib.sha256(json.dumps([sorted(names), edges], ensure_ascii=False).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def layout_nodes(nodes, edges, previous_positions=None, iterations=None, previous_digest=None):
+    """Compute ForceAtlas2 positions offline and store them as x/y on each node
+    
+    Nodes found in previous_positions start where they were last time at a low
+    speed, so small data changes only nudge the graph; if the graph is the one
+    previous_digest was computed for, the previous positions are kept as they
+    are. Returns the layout digest for the export metadata.
+    """
+    
+    node_index = {}
+    for node in nodes:
+        node_index.setdefault(node['id'], len(node_index))
+    
+    sources = [node_index[edge['source']] for edge in edges]
+    targets = [node_index[edge['target']] for edge in edges]
+    weights = [edge['weight'] for edge in edges]
+    return layout_from_arrays(nodes, node_index, sources, targets, weights, previous_positions, iterations,
+                              previous_digest)
+
+
+def layout_from_arrays(nodes, node_index, sources, targets, weights, previous_positions=None, iterations=None,
+                       previous_digest=None):
+    """layout_nodes for edges given as node-index arrays, as collected while streaming"""
+    
+    import numpy as np
+    from layout import COLD_ITERATIONS, WARM_ITERATIONS, forceatlas2
+    
+    previous_positions = previous_positions or {}
+    digest = layout_fingerprint(node_index, sources, targets, weights)
+    if digest == previous_digest and all(node_id in previous_positions for node_id in node_index):
+        print("📐 Graph unchanged since the last layout, keeping its positions\n")
+        for node in nodes:
+            node['x'], node['y'] = previous_positions[node['id']]
+        return digest
+    
+    warm = any(node_id in previous_positions for node_id in node_index)
+    if iterations is None:
+        iterations = WARM_ITERATIONS if warm else COLD_ITERATIONS
+    
+    print(f"📐 Computing layout (up to {iterations} iterations, {'warm' if warm else 'cold'} start)...")
+    
+    positions = None
+    if warm:
+        positions = np.full((len(node_index), 2), np.nan)
+        for node_id, index in node_index.items():
+            if node_id in previous_positions:
+                positions[index] = previous_positions[node_id]
+    
+    positions, iterations = forceatlas2(len(node_index), sources, targets, weights, positions=positions,
+                                        iterations=iterations)
+    
+    for node in nodes:
+        x, y = positions[node_index[node['id']]]
+        node['x'] = round(float(x), 2)
+        node['y'] = round(float(y), 2)
+    
+    print(f"   Positioned {len(node_index)} nodes in {iterations} iterations\n")
+    return digest
+
+
+def analyze_nodes(nodes, edges, betweenness_samples=None, metrics=None, previous_communities=None):
+    """Store degree, weighted degree, component, community and betweenness on each node
+    
+    Components are numbered from 0 by size, largest first. Communities keep
+    the labels of the groups they share most nodes with in
+    previous_communities ({id: community}); the rest are numbered by size.
+    Betweenness sources are picked by node id. See graph_analytics.py for how
+    each metric is computed.
+    """
+    
+    node_index = {}
+    for node in nodes:
+        node_index.setdefault(node['id'], len(node_index))
+    
+    sources = [node_index[edge['source']] for edge in edges]
+    targets = [node_index[edge['target']] for edge in edges]
+    weights = [edge['weight'] for edge in edges]
+    analytics_from_arrays(nodes, node_index, sources, targets, weights, betweenness_samples, metrics,
+                          previous_communities)
+
+
+def analytics_from_arrays(nodes, node_index, sources, targets, weights, betweenness_samples=None, metrics=None,
+                          previous_communities=None):
+    """analyze_nodes for edges given as node-index arrays, as collected while streaming"""
+    
+    from graph_analytics import analyze
+    
+    metrics = metrics or RunMetrics()
+    print("📈 Computing graph analytics...")
+    with metrics.stage('analytics'):
+        previous = None
+        if previous_communities:
+            previous = [previous_communities.get(node_id, -1) for node_id in node_index]
+        results, summary = analyze(len(node_index), sources, targets, weights, betweenness_samples,
+                                   keys=list(node_index), previous_communities=previous)
+        columns = {attr: values.tolist() for attr, values in results.items()}
+        for node in nodes:
+            index = node_index[node['id']]
+            node['degree'] = columns['degree'][index]
+            node['weighted_degree'] = int(columns['weighted_degree'][index])
+            node['component'] = columns['component'][index]
+            node['community'] = columns['community'][index]
+            if 'betweenness' in columns:
+                node['betweenness'] = round(columns['betweenness'][index], 6)
+    metrics.record('analytics', **summary)
+    
+    print(f"   {summary['components']} components (largest {summary['largest_component']} nodes), "
+          f"{summary['communities']} communities (modularity {summary['modularity']})\n")
+
+
+def collect_logos(records, logos):
+    """Pass records through unchanged while collecting {startup name: (attachment id, url)} of their logos"""
+    
+    for record in records:
+        fields = record['fields']
+        startup_name = fields.get('Startup', '').strip()
+        logo = record_logo(fields)
+        if startup_name and logo:
+            logos.setdefault(startup_name, logo)
+        yield record
+
+
+def attach_logos(nodes, logos, workers=DOWNLOAD_WORKERS, metrics=None):
+    """Pack the logos into sprite atlases and store each node's [atlas, x, y] as logo_sprite
+    
+    Only logos missing from the thumbnail cache are downloaded (see
+    logo_atlas.py). Returns the atlas metadata for the export.
+    """
+    
+    from logo_atlas import build_logo_atlas
+    
+    metrics = metrics or RunMetrics()
+    print(f"🖼️  Building logo atlas for {len(logos)} logos...")
+    with metrics.stage('logos'):
+        atlas, sprites, stats = build_logo_atlas(dict(logos.values()), workers=workers)
+        for node in nodes:
+            logo = logos.get(node['id'])
+            if logo and logo[0] in sprites:
+                node['logo_sprite'] = sprites[logo[0]]
+    metrics.record('logos', **stats)
+    
+    print(f"   {stats['cached']} cached, {stats['downloaded']} downloaded, {stats['failed']} failed; "
+          f"{stats['atlases']} atlases ({stats['atlas_bytes'] / 1024:.0f} KB)\n")
+    return atlas
+
+
+def compact_nodes(nodes):
+    """Nodes without empty attributes or a label equal to the id, plus {id: index}"""
+    
+    node_index = {}
+    encoded = []
+    for node in nodes:
+        node_index.setdefault(node['id'], len(encoded))
+        encoded.append(compact_node(node))
+    return encoded, node_index
+
+
+def compact_node(node):
+    """One node without empty attributes or a label equal to its id"""
+    return {
+        key: value for key, value in node.items()
+        if value not in ('', [], None) and not (key == 'label' and value == node['id'])
+    }
+
+
+def display_order(conn_type, values):
+    """Values in the order the viewer's filter panel lists them
+    
+    Cohorts sort by their first number ('Cohort 2' before 'Cohort 10'),
+    everything else alphabetically.
+    """
+    
+    values = sorted(values)
+    if conn_type == 'cohort':
+        def cohort_number(value):
+            match = re.search(r'\d+', value)
+            return int(match.group()) if match else 0
+        values.sort(key=cohort_number)
+    return values
+
+
+def value_tables(edges):
+    """String table per connection type in display order, plus {type: {value: id}}"""
     
-    print(f"💾 Exporting to {output_file}...")
+    values = {}
+    value_ids = {}
+    for conn_type in CONNECTION_TYPES:
+        attr = TYPE_ATTRIBUTES[conn_type]
+        table = display_order(conn_type, {value for edge in edges for value in edge[attr]})
+        values[conn_type] = table
+        value_ids[conn_type] = {value: i for i, value in enumerate(table)}
+    return values, value_ids
+
+
+def index_value_tables(connection_index):
+    """value_tables for the edges a connection index will produce, without building them
+    
+    Covers every bucket that can make an edge, so with a min_weight some
+    values may end up on no edge (their facet counts are 0).
+    """
+    
+    found = {conn_type: set() for conn_type in CONNECTION_TYPES}
+    for (conn_type, conn_value), startup_list in connection_index.items():
+        if len(startup_list) >= 2:
+            found[conn_type].add(conn_value)
+    
+    values = {conn_type: display_order(conn_type, found[conn_type]) for conn_type in CONNECTION_TYPES}
+    value_ids = {conn_type: {value: i for i, value in enumerate(table)} for conn_type, table in values.items()}
+    return values, value_ids
+
+
+def build_facets(edges, node_index, value_ids):
+    """Inverted index from each connection value to the edges and nodes carrying it
+    
+    Returns {type: {'counts': [...], 'edges': [[edge ids]], 'nodes': [[node ids]]}}
+    with lists aligned to that type's value table. Edge ids are positions in
+    edges, node ids indices into the exported node list, both ascending.
+    """
+    
+    facets = new_facets(value_ids)
+    for edge_id, edge in enumerate(edges):
+        add_to_facets(facets, edge_id, edge, node_index, value_ids)
+    return finish_facets(facets)
+
+
+def new_facets(value_ids):
+    """Empty facet accumulators, filled by add_to_facets"""
+    
+    facets = {}
+    for conn_type in CONNECTION_TYPES:
+        size = len(value_ids[conn_type])
+        facets[conn_type] = {'edges': [[] for _ in range(size)], 'nodes': [set() for _ in range(size)]}
+    return facets
+
+
+def add_to_facets(facets, edge_id, edge, node_index, value_ids):
+    """Record one edge in the facet accumulators"""
+    
+    endpoints = (node_index[edge['source']], node_index[edge['target']])
+    for conn_type in edge['types']:
+        ids = value_ids[conn_type]
+        facet = facets[conn_type]
+        for value in edge[TYPE_ATTRIBUTES[conn_type]]:
+            value_id = ids[value]
+            facet['edges'][value_id].append(edge_id)
+            facet['nodes'][value_id].update(endpoints)
+
+
+def finish_facets(facets):
+    """Add counts and sort node ids, giving the build_facets layout"""
+    
+    for facet in facets.values():
+        facet['counts'] = [len(edge_ids) for edge_ids in facet['edges']]
+        facet['nodes'] = [sorted(node_ids) for node_ids in facet['nodes']]
+    return facets
+
+
+def type_mask(edge):
+    """Bitmask of the edge's connection types, bit i for CONNECTION_TYPES[i]"""
     
-    data = {
-        'nodes': nodes,
-        'edges': edges,
-        'metadata': {
+    mask = 0
+    for bit, conn_type in enumerate(CONNECTION_TYPES):
+        if edge[f'is_{conn_type}']:
+            mask |= 1 << bit
+    return mask
+
+
+def compact_edge_row(edge, node_index, value_ids):
+    """One edge as a compact row (see encode_compact)"""
+    
+    row = [node_index[edge['source']], node_index[edge['target']], edge['weight'], type_mask(edge)]
+    for conn_type in CONNECTION_TYPES:
+        if edge[f'is_{conn_type}']:
+            ids = value_ids[conn_type]
+            row.append(sorted(ids[value] for value in edge[TYPE_ATTRIBUTES[conn_type]]))
+    return row
+
+
+def shard_edge_row(edge_id, edge, conn_type, node_index, value_ids):
+    """One edge as a row of conn_type's shard (see export_sharded)"""
+    
+    ids = value_ids[conn_type]
+    return [edge_id, node_index[edge['source']], node_index[edge['target']], edge['weight'], type_mask(edge),
+            sorted(ids[value] for value in edge[TYPE_ATTRIBUTES[conn_type]])]
+
+
+def encode_compact(nodes, edges, metadata):
+    """Dictionary-encode nodes and edges into the compact network format
+    
+    Nodes keep their attributes but drop empty values and a label equal to the
+    id. Each edge becomes [source, target, weight, type_mask, [value ids], ...]
+    where source/target index into nodes, bit i of type_mask marks types[i],
+    and one list of value ids follows for each set bit, in bit order. Value ids
+    index the per-type string tables in values, which are in display order.
+    facets holds the inverted index from build_facets, aligned with those
+    tables. Edge labels are rebuilt by the viewer.
+    """
+    
+    encoded_nodes, node_index = compact_nodes(nodes)
+    values, value_ids = value_tables(edges)
+    facets = build_facets(edges, node_index, value_ids)
+    
+    compact_edges = [compact_edge_row(edge, node_index, value_ids) for edge in edges]
+    
+    return {
+        'format': COMPACT_FORMAT,
+        'version': COMPACT_VERSION,
+        'types': CONNECTION_TYPES,
+        'values': values,
+        'facets': facets,
+        'nodes': encoded_nodes,
+        'edges': compact_edges,
+        'metadata': metadata
+    }
+
+
+def write_precompressed(path, payload):
+    """Write payload (bytes) to path plus .gz and, when brotli is installed, .br copies"""
+    
+    with PrecompressedWriter(path) as out:
+        out.write(payload)
+    return out.sizes
+
+
+def export_sharded(nodes, edges, output_dir, metadata):
+    """Write a core file (nodes + shard manifest) and one edge shard per connection type
+    
+    Every edge gets a global id so the viewer can merge the shards it loads into
+    one graph edge. Shard rows are [edge_id, source, target, weight, type_mask,
+    [value ids]] with the value ids indexing the type's string table, which the
+    shard repeats so it is usable on its own. The core file carries the value
+    tables with their facet counts and node ids, so the filter panel can be
+    built before any shard loads; each shard carries its facet edge ids. Each
+    file is also written gzip/brotli compressed. Returns the total uncompressed
+    bytes written.
+    """
+    
+    os.makedirs(output_dir, exist_ok=True)
+    encoded_nodes, node_index = compact_nodes(nodes)
+    values, value_ids = value_tables(edges)
+    facets = build_facets(edges, node_index, value_ids)
+    
+    shard_rows = {conn_type: [] for conn_type in CONNECTION_TYPES}
+    for edge_id, edge in enumerate(edges):
+        for conn_type in edge['types']:
+            shard_rows[conn_type].append(shard_edge_row(edge_id, edge, conn_type, node_index, value_ids))
+    
+    manifest = {}
+    total_bytes = 0
+    for conn_type in CONNECTION_TYPES:
+        shard = {
+            'type': conn_type,
+            'values': values[conn_type],
+            'facet_edges': facets[conn_type].pop('edges'),
+            'edges': shard_rows[conn_type]
+        }
+        file_name = shard_file_name(conn_type)
+        payload = json.dumps(shard, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        sizes = write_precompressed(os.path.join(output_dir, file_name), payload)
+        total_bytes += sizes['json']
+        manifest[conn_type] = shard_manifest_entry(file_name, len(shard_rows[conn_type]), len(values[conn_type]), sizes)
+    
+    return total_bytes + write_shard_core(output_dir, encoded_nodes, values, facets, manifest, metadata)
+
+
+def shard_file_name(conn_type):
+    return f"edges-{conn_type}.json"
+
+
+def shard_manifest_entry(file_name, edge_count, value_count, sizes):
+    """Core manifest entry for one written shard"""
+    
+    print(f"   {file_name}: {edge_count} edges, "
+          + ", ".join(f"{size:,} B {encoding}" for encoding, size in sizes.items()))
+    return {
+        'file': file_name,
+        'edges': edge_count,
+        'values': value_count,
+        'bytes': sizes
+    }
+
+
+def write_shard_core(output_dir, encoded_nodes, values, facets, manifest, metadata):
+    """Write the sharded core file, returning its uncompressed size"""
+    
+    core = {
+        'format': SHARDED_FORMAT,
+        'version': SHARDED_VERSION,
+        'types': CONNECTION_TYPES,
+        'values': values,
+        'facets': facets,
+        'nodes': encoded_nodes,
+        'shards': manifest,
+        'metadata': metadata
+    }
+    payload = json.dumps(core, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    sizes = write_precompressed(os.path.join(output_dir, SHARD_CORE_FILE), payload)
+    print(f"   {SHARD_CORE_FILE}: {len(encoded_nodes)} nodes, "
+          + ", ".join(f"{size:,} B {encoding}" for encoding, size in sizes.items()))
+    return sizes['json']
+
+
+def value_groups(connection_index, conn_type):
+    """{startup: its first conn_type value in table order} for grouping the overview
+    
+    Call before split_hub_buckets, which removes large buckets from the index.
+    """
+    
+    groups = {}
+    for (key_type, value), startup_list in connection_index.items():
+        if key_type == conn_type:
+            for startup_name in startup_list:
+                groups.setdefault(startup_name, value)
+    return groups
+
+
+def community_groups(nodes):
+    """{startup: community label} from the community attribute of analyze_nodes"""
+    return {node['id']: f"Community {node['community'] + 1}" for node in nodes if 'community' in node}
+
+
+def build_overview(nodes, edges, groups, ungrouped):
+    """Aggregate startups into one supernode per group label, summing edge weights between groups
+    
+    Startups missing from groups share the supernode labelled ungrouped.
+    Supernodes come largest first (ties by label) with their members' node
+    positions in the list, member count, internal edge count and weight, and
+    mean member position when the layout ran. Superedges join supernode
+    indices, source < target, with summed weight and edge count.
+    Returns (supernodes, superedges, member node positions per supernode,
+    internal edges per supernode).
+    """
+    
+    label_members = defaultdict(list)
+    for position, node in enumerate(nodes):
+        label_members[groups.get(node['id'], ungrouped)].append(position)
+    labels = sorted(label_members, key=lambda label: (-len(label_members[label]), label))
+    supernode_of = {}
+    for index, label in enumerate(labels):
+        for position in label_members[label]:
+            supernode_of.setdefault(nodes[position]['id'], index)
+    
+    internal = [[] for _ in labels]
+    superedges = defaultdict(lambda: [0, 0])
+    for edge in edges:
+        source, target = supernode_of[edge['source']], supernode_of[edge['target']]
+        if source == target:
+            internal[source].append(edge)
+            continue
+        link = superedges[(min(source, target), max(source, target))]
+        link[0] += edge['weight']
+        link[1] += 1
+    
+    supernodes = []
+    for index, label in enumerate(labels):
+        members = [nodes[position] for position in label_members[label]]
+        supernode = {
+            'id': f"group-{index}",
+            'label': label,
+            'members': len(members),
+            'internal_edges': len(internal[index]),
+            'internal_weight': sum(edge['weight'] for edge in internal[index]),
+        }
+        placed = [member for member in members if 'x' in member and 'y' in member]
+        if placed:
+            supernode['x'] = round(sum(member['x'] for member in placed) / len(placed), 2)
+            supernode['y'] = round(sum(member['y'] for member in placed) / len(placed), 2)
+        supernodes.append(supernode)
+    
+    links = [{'source': f"group-{source}", 'target': f"group-{target}", 'weight': weight, 'edges': count}
+             for (source, target), (weight, count) in sorted(superedges.items())]
+    return supernodes, links, [label_members[label] for label in labels], internal
+
+
+def export_overview(nodes, edges, groups, group_by, output_dir=OVERVIEW_DIR, metadata=None):
+    """Write the level-of-detail files: the overview graph and a drill-down file per supernode
+    
+    groups maps startups to supernode labels (see value_groups and
+    community_groups). Each drill-down file holds a supernode's members and
+    the edges among them in the compact format (see encode_compact); the
+    overview lists each file with its sizes. Edges between groups only appear
+    summed in the overview. Files are written gzip/brotli compressed too, and
+    drill-down files of an earlier, larger run are removed. Returns the total
+    uncompressed bytes written.
+    """
+    
+    os.makedirs(output_dir, exist_ok=True)
+    supernodes, superedges, members, internal = build_overview(nodes, edges, groups, f"No {group_by}")
+    
+    total_bytes = 0
+    files = set()
+    for supernode, positions, group_edges in zip(supernodes, members, internal):
+        group_metadata = {'group_by': group_by, 'group': supernode['label'], 'total_nodes': len(positions),
+                          'total_edges': len(group_edges), 'generated_at': None}
+        encoded = encode_compact([nodes[position] for position in positions], group_edges, group_metadata)
+        supernode['file'] = f"{supernode['id']}.json"
+        payload = json.dumps(encoded, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        supernode['bytes'] = write_precompressed(os.path.join(output_dir, supernode['file']), payload)
+        total_bytes += supernode['bytes']['json']
+        files.add(supernode['file'])
+    
+    for name in os.listdir(output_dir):
+        if name.startswith('group-') and name.split('.json')[0] + '.json' not in files:
+            os.remove(os.path.join(output_dir, name))
+    
+    overview = {
+        'format': OVERVIEW_FORMAT,
+        'version': OVERVIEW_VERSION,
+        'group_by': group_by,
+        'nodes': supernodes,
+        'edges': superedges,
+        'metadata': {**(metadata or {}), 'total_groups': len(supernodes), 'total_group_edges': len(superedges)}
+    }
+    payload = json.dumps(overview, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    sizes = write_precompressed(os.path.join(output_dir, OVERVIEW_FILE), payload)
+    print(f"   {output_dir}/{OVERVIEW_FILE}: {len(supernodes)} groups by {group_by}, {len(superedges)} group links, "
+          + ", ".join(f"{size:,} B {encoding}" for encoding, size in sizes.items()))
+    return total_bytes + sizes['json']
+
+
+class _ByteCounter:
+    """File-like sink that only counts the UTF-8 bytes written to it"""
+    
+    def __init__(self):
+        self.size = 0
+    
+    def write(self, text):
+        self.size += len(text.encode('utf-8'))
+
+
+def indented_size(data):
+    """Bytes of data as the full format writes it (indent 2)"""
+    
+    counter = _ByteCounter()
+    json.dump(data, counter, indent=2, ensure_ascii=False)
+    return counter.size
+
+
+def estimate_full_size(nodes, edges, metadata, sample=FULL_SIZE_SAMPLE):
+    """Approximate size of the full format (without facets) from evenly spaced node and edge samples
+    
+    Each list's share of the indented output is measured on at most sample
+    items and scaled to its length, so this costs the same at any graph size
+    and is exact when the lists are no longer than sample.
+    """
+    
+    empty = {'nodes': [], 'edges': [], 'metadata': metadata}
+    base = indented_size(empty)
+    total = base
+    for key, items in (('nodes', nodes), ('edges', edges)):
+        if not items:
+            continue
+        picked = items[::max(1, len(items) // sample)][:sample]
+        share = indented_size({**empty, key: picked}) - base
+        total += round(share * len(items) / len(picked))
+    return total
+
+
+def export_json(nodes, edges, output_file='network_data.json', output_format='full', metrics=None,
+                logo_atlas=None, overview_by=None, overview_groups=None, patch_version=None, layout_digest=None):
+    """Export nodes and edges to JSON format for sigma.js/graphology
+    
+    output_format 'full' writes the original indented node/edge lists plus
+    the facet index (see build_facets) with each type's values; 'compact'
+    writes the dictionary-encoded format (see encode_compact); 'sharded' writes a core file and per-type edge shards into SHARD_DIR
+    (see export_sharded). Compact and sharded output report their size against
+    an estimate of the full format (see estimate_full_size). logo_atlas (see attach_logos), patch_version (see
+    export_patch) and layout_digest (see layout_nodes) go into the metadata, which is returned.
+    
+    With overview_groups ({startup: group label}, grouped by overview_by) the
+    level-of-detail files are written to OVERVIEW_DIR as well (see
+    export_overview).
+    """
+    
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {output_format!r}, expected one of {OUTPUT_FORMATS}")
+    
+    metrics = metrics or RunMetrics()
+    with metrics.stage('export'):
+        if output_format == 'sharded':
+            output_file = os.path.join(SHARD_DIR, SHARD_CORE_FILE)
+        
+        print(f"💾 Exporting to {output_file} ({output_format} format)...")
+        
+        metadata = {
             'total_nodes': len(nodes),
             'total_edges': len(edges),
             'generated_at': None  # Will be set by JavaScript Date
         }
+        if logo_atlas:
+            metadata['logo_atlas'] = logo_atlas
+        if patch_version is not None:
+            metadata['patch_version'] = patch_version
+        if layout_digest:
+            metadata['layout_digest'] = layout_digest
+        data = {
+            'nodes': nodes,
+            'edges': edges,
+            'metadata': metadata
+        }
+        
+        full_size = 0
+        if output_format == 'full':
+            # The compact formats build their own facets over their value tables
+            values, value_ids = value_tables(edges)
+            facets = build_facets(edges, compact_nodes(nodes)[1], value_ids)
+            for conn_type, facet in facets.items():
+                facet['values'] = values[conn_type]
+            data['facets'] = facets
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            output_size = os.path.getsize(output_file)
+        else:
+            full_size = estimate_full_size(nodes, edges, metadata)
+            if output_format == 'sharded':
+                output_size = export_sharded(nodes, edges, SHARD_DIR, metadata)
+            else:
+                with open(output_file, 'w', encoding='utf-8') as f:
+                    json.dump(encode_compact(nodes, edges, metadata), f, ensure_ascii=False, separators=(',', ':'))
+                output_size = os.path.getsize(output_file)
+        
+        if overview_groups is not None:
+            overview_size = export_overview(nodes, edges, overview_groups, overview_by, metadata=metadata)
+            metrics.record('export', overview_by=overview_by, overview_bytes=overview_size)
+    
+    metrics.record('export', format=output_format, nodes=len(nodes), edges=len(edges), output_bytes=output_size,
+                   full_bytes=full_size or output_size, full_bytes_estimated=bool(full_size))
+    
+    print_export_summary(len(nodes), len(edges), output_file, output_size, full_size)
+    return metadata
+
+
+def output_path(output_file='network_data.json', output_format='full'):
+    """The file export_json writes for a format (the core file when sharded)"""
+    if output_format == 'sharded':
+        return os.path.join(SHARD_DIR, SHARD_CORE_FILE)
+    return output_file
+
+
+def edge_values(edge):
+    """{type: values} of an exported edge dict, for graph_state"""
+    return {conn_type: edge[TYPE_ATTRIBUTES[conn_type]] for conn_type in CONNECTION_TYPES
+            if edge[TYPE_ATTRIBUTES[conn_type]]}
+
+
+def graph_state(nodes, edges, metadata):
+    """An export reduced to what graph_patches.build_patch compares
+
+    edges are (source, target, weight, {type: values}) tuples. Nodes are keyed
+    by id (the first node wins, as in the viewer) in their compact form and
+    round-tripped through JSON, so they compare equal to a state read back
+    from a file. Edge values are sorted, whatever order the format stored.
+    """
+
+    node_states = {}
+    for node in nodes:
+        node_states.setdefault(node['id'], compact_node(node))
+    edge_states = {}
+    for source, target, weight, type_values in edges:
+        edge_states[(source, target)] = [weight, {conn_type: sorted(type_values[conn_type])
+                                                  for conn_type in CONNECTION_TYPES if conn_type in type_values}]
+    return {
+        'nodes': json.loads(json.dumps(node_states, ensure_ascii=False)),
+        'edges': edge_states,
+        'node_order': [node['id'] for node in nodes],
+        'metadata': metadata,
     }
+
+
+def load_previous_export(output_file='network_data.json', output_format='full'):
+    """The last export of output_format as a graph_state, or None if it cannot be read"""
+
+    path = output_path(output_file, output_format)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        nodes = data['nodes']
+
+        if data.get('format') == SHARDED_FORMAT:
+            # Each shard holds one type's values; merge them by edge id
+            merged = {}
+            for conn_type, entry in data['shards'].items():
+                with open(os.path.join(os.path.dirname(path), entry['file']), 'r', encoding='utf-8') as f:
+                    shard = json.load(f)
+                for edge_id, source, target, weight, _, value_ids in shard['edges']:
+                    edge = merged.setdefault(edge_id, (nodes[source]['id'], nodes[target]['id'], weight, {}))
+                    edge[3][conn_type] = [shard['values'][value_id] for value_id in value_ids]
+            edges = [merged[edge_id] for edge_id in sorted(merged)]
+
+        elif data.get('format') == COMPACT_FORMAT:
+            edges = []
+            for row in data['edges']:
+                type_values = {}
+                value_lists = iter(row[4:])
+                for bit, conn_type in enumerate(data['types']):
+                    if row[3] & (1 << bit):
+                        type_values[conn_type] = [data['values'][conn_type][value_id]
+                                                  for value_id in next(value_lists)]
+                edges.append((nodes[row[0]]['id'], nodes[row[1]]['id'], row[2], type_values))
+
+        else:
+            edges = [(edge['source'], edge['target'], edge['weight'], edge_values(edge)) for edge in data['edges']]
+    except (OSError, ValueError, KeyError, IndexError, TypeError, StopIteration):
+        return None
+
+    return graph_state(nodes, edges, data.get('metadata') or {})
+
+
+def export_patch(nodes, edges, metadata, previous, manifest, metrics=None, patch_dir=PATCH_DIR):
+    """Diff this export against the previous one and add it to the patch manifest
+
+    previous is the last export's graph_state (see load_previous_export),
+    read before this export replaced it, and metadata carries this export's
+    patch_version. The patch is only written when previous is the manifest's
+    current version; otherwise this version starts a new chain and viewers
+    holding an older one reload the full graph (see graph_patches.py).
+    """
+
+    metrics = metrics or RunMetrics()
+    version = metadata['patch_version']
+    with metrics.stage('patch'):
+        from_version = previous['metadata'].get('patch_version') if previous else None
+        if previous is None:
+            reason = "no previous export"
+        elif manifest is None or from_version != manifest['current']:
+            reason = "previous export is not the manifest's current version"
+        else:
+            reason = None
+
+        patch = None
+        if reason is None:
+            current = graph_state(nodes, ((edge['source'], edge['target'], edge['weight'], edge_values(edge))
+                                          for edge in edges), metadata)
+            patch = build_patch(from_version, version, previous, current)
+        entry = record_version(manifest, version, patch, patch_dir)
+
+    if patch is None:
+        metrics.record('patch', version=version, base=True, reason=reason)
+        print(f"🩹 Version {version} starts a new patch chain in {patch_dir}/ ({reason})")
+        return
+
+    metrics.record('patch', version=version, base=False, nodes=entry['nodes'], edges=entry['edges'],
+                   patch_bytes=entry['bytes'])
+    changes = ", ".join(f"{part} +{counts['added']} -{counts['removed']} ~{counts['changed']}"
+                        for part, counts in (('nodes', entry['nodes']), ('edges', entry['edges'])))
+    print(f"🩹 {patch_dir}/{entry['patch']}: version {from_version} → {version}, {changes}, "
+          + ", ".join(f"{size:,} B {encoding}" for encoding, size in entry['bytes'].items()))
+
+
+def append_snapshot(nodes, edges, store_file, input_hash=None, metrics=None):
+    """Add this export to the snapshot history (see snapshot_store.py)"""
+    
+    metrics = metrics or RunMetrics()
+    taken_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    with metrics.stage('snapshot'):
+        state = graph_state(nodes, ((edge['source'], edge['target'], edge['weight'], edge_values(edge))
+                                    for edge in edges), {})
+        with SnapshotStore(store_file) as store:
+            version, counts = store.append(taken_at, state['nodes'], state['edges'], input_hash)
+            stored = store.row_counts()
+    metrics.record('snapshot', version=version, **counts, stored_states=stored)
+    
+    changes = ", ".join(f"{part} +{part_counts['added']} -{part_counts['removed']} ~{part_counts['changed']}"
+                        for part, part_counts in counts.items())
+    print(f"🕰️  Snapshot {version} in {store_file}: {changes}\n")
+
+
+def hashed_records(records, digest):
+    """Pass records through unchanged while feeding their normalized content to digest
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    Only what reaches the output is hashed: each named record's node fields and
+    connections, in the order given (sorted by id on the fetch paths, see
+    sort_records; table order when streaming). Logos count by attachment id, because
+    Airtable signs attachment URLs afresh on every request.
+    """
+    
+    for record in records:
+        fields = record['fields']
+        node = startup_node(fields)
+        if node is not None:
+            logo = fields.get('Logo') or [{}]
+            node['logo_url'] = logo[0].get('id') or node['logo_url']
+            entry = [node, list(record_connections(fields))]
+            digest.update(json.dumps(entry, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+            digest.update(b'\n')
+        yield record
+
+
+def new_input_digest(args):
+    """sha256 primed with every option that changes the output for the same records"""
     
-    print(f"✅ Export complete!\n")
+    options = {
+        'version': INPUT_HASH_VERSION,
+        'format': args.output_format,
+        'format_version': {'compact': COMPACT_VERSION, 'sharded': SHARDED_VERSION}.get(args.output_format),
+        'max_bucket_size': parse_bucket_limits(args.max_bucket_size),
+        'min_weight': args.min_weight,
+        'top_k': args.top_k,
+        'layout': None if args.no_layout else args.layout_iterations or 'default',
+        'analytics': None if args.no_analytics else {'betweenness_samples': args.betweenness_samples},
+        'logos': THUMB_SIZE if args.logos else None,
+        'overview': args.overview,
+        # Patched exports carry their patch version in the metadata
+        'patches': args.patches,
+        # Streaming writes the same data with members in a different order
+        'stream': args.stream,
+    }
+    digest = hashlib.sha256()
+    digest.update(json.dumps(options, sort_keys=True).encode('utf-8') + b'\n')
+    return digest
+
+
+def input_hash(records, args):
+    """Hex digest of the normalized records and output options (see hashed_records)"""
+    
+    digest = new_input_digest(args)
+    for _ in hashed_records(records, digest):
+        pass
+    return digest.hexdigest()
+
+
+def output_is_current(output_file, current_hash, metrics, force=False):
+    """Whether the export can be skipped: output_file was built from input with this hash
+    
+    force rebuilds anyway. The check is recorded in metrics either way.
+    """
+    
+    unchanged = load_input_hash(output_file) == current_hash
+    metrics.record('input', hash=current_hash, unchanged=unchanged)
+    if not unchanged:
+        return False
+    if force:
+        print(f"🔁 Airtable data unchanged (input hash {current_hash[:12]}), rebuilding anyway (--force)\n")
+        return False
+    print(f"⏭️  Airtable data unchanged since the last export (input hash {current_hash[:12]}), "
+          f"skipping processing and export")
+    return True
+
+
+def clear_input_hash(output_file):
+    """Forget the stored hash before exporting, so an interrupted export is never taken as current"""
+    try:
+        os.remove(output_file + INPUT_HASH_SUFFIX)
+    except FileNotFoundError:
+        pass
+
+
+def load_input_hash(output_file):
+    """The input hash stored with an existing output, or None"""
+    
+    if not os.path.exists(output_file):
+        return None
+    try:
+        with open(output_file + INPUT_HASH_SUFFIX, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def save_input_hash(output_file, input_hash):
+    with open(output_file + INPUT_HASH_SUFFIX, 'w', encoding='utf-8') as f:
+        f.write(input_hash + '\n')
+
+
+def print_export_summary(node_count, edge_count, output_file, output_size, full_size=0):
+    print("✅ Export complete!\n")
     print("=" * 60)
     print("SUMMARY")
     print("=" * 60)
-    print(f"Nodes: {len(nodes)}")
-    print(f"Edges: {len(edges)}")
+    print(f"Nodes: {node_count}")
+    print(f"Edges: {edge_count}")
     print(f"Output file: {output_file}")
+    print(f"Output size: {output_size:,} bytes")
+    if full_size:
+        reduction = 100 * (1 - output_size / full_size)
+        print(f"Full format size: ~{full_size:,} bytes, estimated ({reduction:.1f}% smaller)")
     print("=" * 60)
 
 
-def main():
-    """Main ETL process"""
+def export_streaming(nodes, connection_index, output_file='network_data.json', output_format='full',
+                     min_weight=0, layout=True, previous_positions=None, layout_iterations=None, metrics=None,
+                     analytics=True, betweenness_samples=None, logo_atlas=None, previous_layout_digest=None,
+                     previous_communities=None):
+    """Generate edges with iter_edges and write them straight into the output
+    
+    Same formats as export_json, but no edge list is ever built: each edge is
+    serialized as soon as it is generated. Only the facet index and three
+    integer arrays for the layout and analytics grow with the edge count. Node
+    positions and analytics are only known once every edge has been seen, so
+    nodes are written after the edges, and value tables come from the
+    connection index (see index_value_tables).
+    """
+    
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {output_format!r}, expected one of {OUTPUT_FORMATS}")
+    
+    metrics = metrics or RunMetrics()
+    metrics.record('edges', engine='stream', pairs_generated=pair_count(connection_index))
+    with metrics.stage('export'):
+        if output_format == 'sharded':
+            output_file = os.path.join(SHARD_DIR, SHARD_CORE_FILE)
+        
+        print(f"💾 Streaming edges to {output_file} ({output_format} format)...")
+        
+        # Positions in the node list for the output; one slot per distinct id for the layout
+        node_index = {}
+        layout_index = {}
+        for position, node in enumerate(nodes):
+            node_index.setdefault(node['id'], position)
+            layout_index.setdefault(node['id'], len(layout_index))
+        values, value_ids = index_value_tables(connection_index)
+        facets = new_facets(value_ids)
+        sources, targets, weights = array('q'), array('q'), array('q')
+        
+        def tracked_edges():
+            for edge_id, edge in enumerate(iter_edges(connection_index, min_weight)):
+                add_to_facets(facets, edge_id, edge, node_index, value_ids)
+                sources.append(layout_index[edge['source']])
+                targets.append(layout_index[edge['target']])
+                weights.append(edge['weight'])
+                yield edge_id, edge
+        
+        def finish_nodes(edge_count):
+            print(f"   Wrote {edge_count} edges")
+            layout_digest = None
+            if layout:
+                with metrics.stage('layout'):
+                    layout_digest = layout_from_arrays(nodes, layout_index, sources, targets, weights,
+                                                       previous_positions, layout_iterations, previous_layout_digest)
+            if analytics:
+                analytics_from_arrays(nodes, layout_index, sources, targets, weights, betweenness_samples, metrics,
+                                      previous_communities)
+            finish_facets(facets)
+            metadata = {'total_nodes': len(nodes), 'total_edges': edge_count, 'generated_at': None}
+            if logo_atlas:
+                metadata['logo_atlas'] = logo_atlas
+            if layout_digest:
+                metadata['layout_digest'] = layout_digest
+            return metadata
+        
+        if output_format == 'sharded':
+            os.makedirs(SHARD_DIR, exist_ok=True)
+            shard_files = {}
+            writers = {}
+            for conn_type in CONNECTION_TYPES:
+                shard_files[conn_type] = PrecompressedWriter(os.path.join(SHARD_DIR, shard_file_name(conn_type)))
+                writers[conn_type] = JSONStreamWriter(shard_files[conn_type])
+                writers[conn_type].member('type', conn_type)
+                writers[conn_type].member('values', values[conn_type])
+                writers[conn_type].begin_array('edges')
+        
+            edge_count = 0
+            for edge_id, edge in tracked_edges():
+                for conn_type in edge['types']:
+                    writers[conn_type].append(shard_edge_row(edge_id, edge, conn_type, node_index, value_ids))
+                edge_count += 1
+            metadata = finish_nodes(edge_count)
+        
+            manifest = {}
+            output_size = 0
+            for conn_type in CONNECTION_TYPES:
+                shard_edges = writers[conn_type].end_array()
+                writers[conn_type].member('facet_edges', facets[conn_type].pop('edges'))
+                writers[conn_type].close()
+                sizes = shard_files[conn_type].close()
+                output_size += sizes['json']
+                manifest[conn_type] = shard_manifest_entry(shard_file_name(conn_type), shard_edges,
+                                                           len(values[conn_type]), sizes)
+            encoded_nodes = [compact_node(node) for node in nodes]
+            output_size += write_shard_core(SHARD_DIR, encoded_nodes, values, facets, manifest, metadata)
+        
+        elif output_format == 'compact':
+            with open(output_file, 'w', encoding='utf-8') as f:
+                writer = JSONStreamWriter(f)
+                writer.member('format', COMPACT_FORMAT)
+                writer.member('version', COMPACT_VERSION)
+                writer.member('types', CONNECTION_TYPES)
+                edge_count = writer.array('edges', (compact_edge_row(edge, node_index, value_ids)
+                                                    for _, edge in tracked_edges()))
+                metadata = finish_nodes(edge_count)
+                writer.member('values', values)
+                writer.member('facets', facets)
+                writer.array('nodes', (compact_node(node) for node in nodes))
+                writer.member('metadata', metadata)
+                writer.close()
+            output_size = os.path.getsize(output_file)
+        
+        else:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                writer = JSONStreamWriter(f, indent=2)
+                edge_count = writer.array('edges', (edge for _, edge in tracked_edges()))
+                metadata = finish_nodes(edge_count)
+                writer.array('nodes', nodes)
+                writer.member('metadata', metadata)
+                for conn_type, facet in facets.items():
+                    facet['values'] = values[conn_type]
+                writer.member('facets', facets)
+                writer.close()
+            output_size = os.path.getsize(output_file)
+        
+    metrics.record('edges', edges=edge_count)
+    metrics.record('export', format=output_format, nodes=len(nodes), edges=edge_count, output_bytes=output_size)
+    
+    print_export_summary(len(nodes), edge_count, output_file, output_size)
+
+
+def stream_network(client, args, pruning, metrics=None):
+    """Streaming ETL: fold fetched pages into the index, then stream edges to the output"""
+    
+    metrics = metrics or RunMetrics()
+    print("🔄 Indexing records as pages arrive...")
+    # Fetching and indexing interleave, so both count as the fetch stage
+    digest = new_input_digest(args)
+    logos = {}
+    records = stream_records(client, args.cache_file)
+    if args.logos:
+        records = collect_logos(records, logos)
+    with metrics.stage('fetch'):
+        nodes, connection_index = index_records(hashed_records(records, digest))
+    metrics.record('fetch', mode='stream')
+    metrics.record_http('fetch', client)
+    if not nodes:
+        print("❌ No records fetched. Exiting.")
+        return
+    
+    print(f"   Created {len(nodes)} nodes")
+    print(f"   Found {len(connection_index)} unique connection values\n")
+    metrics.record('index', nodes=len(nodes), connection_values=len(connection_index),
+                   buckets=bucket_statistics(connection_index))
+    
+    output_file = output_path(output_format=args.output_format)
+    if output_is_current(output_file, digest.hexdigest(), metrics, args.force):
+        metrics.status = 'unchanged'
+        return
+    
+    if pruning.get('max_bucket_size'):
+        hub_buckets, skipped_pairs = split_hub_buckets(connection_index, nodes, pruning['max_bucket_size'])
+        metrics.record('edges', hub_buckets=hub_buckets, hub_pairs_skipped=skipped_pairs)
+        print(f"✂️  Max bucket size: moved {hub_buckets} oversized buckets to node attributes "
+              f"({skipped_pairs} pair links not generated)\n")
+    
+    logo_atlas = attach_logos(nodes, logos, args.logo_workers, metrics) if args.logos else None
+    previous_nodes, previous_metadata = load_previous_nodes(output_format=args.output_format)
+    clear_input_hash(output_file)
+    export_streaming(nodes, connection_index, output_format=args.output_format,
+                     min_weight=pruning.get('min_weight') or 0, layout=not args.no_layout,
+                     previous_positions=node_positions(previous_nodes), layout_iterations=args.layout_iterations,
+                     metrics=metrics, analytics=not args.no_analytics,
+                     betweenness_samples=args.betweenness_samples, logo_atlas=logo_atlas,
+                     previous_layout_digest=previous_metadata.get('layout_digest'),
+                     previous_communities=node_communities(previous_nodes))
+    save_input_hash(output_file, digest.hexdigest())
+
+
+def compare_engines(records, edge_workers=None):
+    """Run every edge engine on the same records and report whether they agree"""
+    
+    print("🔬 Comparing edge engines...")
+    
+    _, connection_index = index_records(records)
+    results = {}
+    for engine in EDGE_ENGINES:
+        results[engine] = build_edges(combine_with_engine(connection_index, engine, edge_workers))
+        print(f"   {engine}: {len(results[engine])} edges")
+    
+    reference = results[EDGE_ENGINES[0]]
+    matches = all(results[engine] == reference for engine in EDGE_ENGINES[1:])
+    if matches:
+        print("✅ Edge engines produce identical edges\n")
+    else:
+        print("❌ Edge engines disagree\n")
+    return matches
+
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    
+    parser = argparse.ArgumentParser(description="Build network_data.json from Airtable")
+    parser.add_argument('--full-refresh', action='store_true',
+                        help="ignore the local record cache and fetch the whole table")
+    parser.add_argument('--cache-file', default=CACHE_FILE,
+                        help=f"local record cache for incremental syncs (default: {CACHE_FILE})")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="fetch full refreshes as parallel record-ID partitions with this many workers")
+    parser.add_argument('--engine', choices=EDGE_ENGINES, default='python',
+                        help="edge construction engine (default: python)")
+    parser.add_argument('--edge-workers', type=int, default=None,
+                        help="processes for --engine parallel (default: all cores)")
+    parser.add_argument('--compare-engines', action='store_true',
+                        help="run every edge engine and check they produce identical edges")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='full', dest='output_format',
+                        help="network_data.json layout (default: full)")
+    parser.add_argument('--no-layout', action='store_true',
+                        help="skip the offline ForceAtlas2 layout (viewer places nodes randomly)")
+    parser.add_argument('--layout-iterations', type=int, default=None,
+                        help="cap on ForceAtlas2 iterations; the layout stops earlier once settled "
+                             "(default: 300 cold, 100 when warm-starting)")
+    parser.add_argument('--no-analytics', action='store_true',
+                        help="skip degree, component, community and betweenness node attributes")
+    parser.add_argument('--betweenness-samples', type=int, default=None, metavar='N',
+                        help="source nodes sampled for approximate betweenness (default: 100; 0 skips it)")
+    parser.add_argument('--logos', action='store_true',
+                        help="download logos into a thumbnail cache and pack them into sprite atlases (needs Pillow)")
+    parser.add_argument('--logo-workers', type=int, default=DOWNLOAD_WORKERS,
+                        help=f"concurrent logo downloads (default: {DOWNLOAD_WORKERS})")
+    parser.add_argument('--overview', choices=OVERVIEW_GROUPS, default=None,
+                        help=f"also write a level-of-detail overview of startups grouped by community, cohort or "
+                             f"region, with a drill-down file per group, into {OVERVIEW_DIR}/")
+    parser.add_argument('--patches', action='store_true',
+                        help=f"also diff the export against the previous one and write a versioned patch plus "
+                             f"manifest into {PATCH_DIR}/ for viewers that already hold the graph")
+    parser.add_argument('--snapshots', nargs='?', const=SNAPSHOT_FILE, default=None, metavar='FILE',
+                        help=f"append the export to a SQLite snapshot history (default file: {SNAPSHOT_FILE}), "
+                             "queried with snapshot_store.py")
+    parser.add_argument('--max-bucket-size', action='append', default=[], metavar='[TYPE=]N',
+                        help="turn buckets larger than N into node attributes instead of edges; "
+                             "repeat with TYPE=N for per-type limits")
+    parser.add_argument('--min-weight', type=int, default=0,
+                        help="drop edges with fewer shared connections than this")
+    parser.add_argument('--top-k', type=int, default=0,
+                        help="keep only each node's K strongest edges")
+    parser.add_argument('--stream', action='store_true',
+                        help="bounded-memory mode: index pages as they arrive and write edges as they are "
+                             "generated (always fetches the whole table)")
+    parser.add_argument('--store', nargs='?', const=STORE_FILE, default=None, metavar='FILE',
+                        help=f"mirror fetched records into a SQLite record store (default file: {STORE_FILE}) "
+                             "and build the connection index from it")
+    parser.add_argument('--offline', action='store_true',
+                        help="rebuild from the record store without contacting Airtable (implies --store)")
+    parser.add_argument('--force', action='store_true',
+                        help="rebuild even when the input hash matches the last export")
+    parser.add_argument('--metrics', default=METRICS_FILE, metavar='FILE',
+                        help=f"write per-stage timings, HTTP, bucket and size metrics as JSON here "
+                             f"(default: {METRICS_FILE}; pass '' to skip)")
+    parser.add_argument('--profile', nargs='?', const=PROFILE_FILE, default=None, metavar='FILE',
+                        help=f"run under cProfile and save the stats (default file: {PROFILE_FILE})")
+    args = parser.parse_args(argv)
+    
+    if args.stream and (args.engine != 'python' or args.compare_engines or args.top_k or args.overview
+                        or args.patches or args.snapshots):
+        parser.error("--stream generates edges per startup and cannot be combined with "
+                     "--engine sparse or parallel, --compare-engines, --top-k, --overview, --patches or "
+                     "--snapshots, which need every edge at once")
+    if args.overview == 'community' and args.no_analytics:
+        parser.error("--overview community groups by the communities --no-analytics skips")
+    if args.offline:
+        args.store = args.store or STORE_FILE
+    if args.stream and args.store:
+        parser.error("--stream does not keep records and cannot be combined with --store or --offline")
+    return args
+
+
+def parse_bucket_limits(specs):
+    """Turn ['500', 'region=50'] into {'*': 500, 'region': 50}"""
+    
+    limits = {}
+    for spec in specs:
+        conn_type, _, size = spec.rpartition('=')
+        conn_type = conn_type or '*'
+        if conn_type != '*' and conn_type not in TYPE_ATTRIBUTES:
+            raise ValueError(f"Unknown connection type {conn_type!r} in --max-bucket-size")
+        limits[conn_type] = int(size)
+    return limits
+
+
+def main(argv=None):
+    """Main ETL process, writing a metrics report and optionally a cProfile dump"""
+    
+    args = parse_args(argv)
+    metrics = RunMetrics(options=vars(args))
+    
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    
+    try:
+        run_etl(args, metrics)
+    except BaseException:
+        metrics.status = 'failed'
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            metrics.profile_file = args.profile
+            print(f"🔬 Profile saved to {args.profile} (inspect with: python -m pstats {args.profile})")
+        if args.metrics:
+            metrics.write(args.metrics)
+            print(f"📊 Run metrics saved to {args.metrics}")
+
+
+def run_etl(args, metrics):
+    """Fetch, process, lay out and export, recording each stage in metrics"""
     
     print("=" * 60)
     print("AIRTABLE ETL - NETWORK DATA PROCESSOR")
     print("=" * 60 + "\n")
     
     # Validate environment variables
-    if not all([AIRTABLE_TOKEN, AIRTABLE_BASE_ID, AIRTABLE_TABLE_ID]):
+    if not args.offline and not all([AIRTABLE_TOKEN, AIRTABLE_BASE_ID, AIRTABLE_TABLE_ID]):
         print("❌ Missing environment variables!")
         print("Please ensure .env file contains:")
         print("  - AIRTABLE_TOKEN")
         print("  - AIRTABLE_BASE_ID")
         print("  - AIRTABLE_TABLE_ID (or AIRTABLE_TABLE_NAME)")
+        metrics.status = 'skipped'
         return
     
-    # Fetch records
-    records = fetch_all_records()
+    pruning = {
+        'max_bucket_size': parse_bucket_limits(args.max_bucket_size),
+        'min_weight': args.min_weight,
+        'top_k': args.top_k,
+    }
+    
+    if args.stream:
+        try:
+            with make_client() as client:
+                stream_network(client, args, pruning, metrics)
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Error fetching records: {e}")
+            sys.exit(1)
+        print("\n✨ ETL process complete!")
+        return
+    
+    if args.offline:
+        with metrics.stage('fetch'), RecordStore(args.store) as store:
+            records = list(store.records())
+            synced_at = store.meta().get('synced_at', 'never')
+        metrics.record('fetch', mode='offline', records=len(records))
+        print(f"📦 Loaded {len(records)} records from {args.store} (synced {synced_at})\n")
+    else:
+        # Fetch records (incrementally when a local cache exists)
+        sync_started = datetime.now(timezone.utc)
+        client = make_client()
+        try:
+            with client, metrics.stage('fetch'):
+                records = fetch_records_incremental(client, args.cache_file, full_refresh=args.full_refresh,
+                                                    workers=args.workers, metrics=metrics)
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Error fetching records: {e}")
+            sys.exit(1)
+        finally:
+            metrics.record_http('fetch', client)
+        if records and args.store:
+            with metrics.stage('store'):
+                sync_record_store(records, args.store, sync_started)
+    
     if not records:
         print("❌ No records fetched. Exiting.")
         return
     
+    if args.compare_engines:
+        compare_engines(records, args.edge_workers)
+    
+    # Nothing to do when the data and options match the last export
+    output_file = output_path(output_format=args.output_format)
+    current_hash = input_hash(records, args)
+    if output_is_current(output_file, current_hash, metrics, args.force):
+        metrics.status = 'unchanged'
+        print("\n✨ ETL process complete!")
+        return
+    
     # Process into nodes and edges
-    nodes, edges = process_records(records)
+    if args.store:
+        print(f"🔄 Indexing connections in {args.store}...")
+        with metrics.stage('index'), RecordStore(args.store) as store:
+            nodes, connection_index = index_record_store(store)
+    else:
+        print("🔄 Processing records into nodes and edges...")
+        with metrics.stage('index'):
+            nodes, connection_index = index_records(records)
+    # Group before hub pruning takes large buckets out of the index
+    overview_groups = None
+    if args.overview in TYPE_ATTRIBUTES:
+        overview_groups = value_groups(connection_index, args.overview)
+    nodes, edges = process_index(nodes, connection_index, engine=args.engine, pruning=pruning, metrics=metrics,
+                                 edge_workers=args.edge_workers)
+    
+    # Precompute node metrics for sizing and colouring in the viewer, keeping
+    # community labels and positions from the previous export where they fit
+    previous_nodes, previous_metadata = load_previous_nodes(output_format=args.output_format)
+    if not args.no_analytics:
+        analyze_nodes(nodes, edges, args.betweenness_samples, metrics, node_communities(previous_nodes))
+    if args.overview == 'community':
+        overview_groups = community_groups(nodes)
+    
+    # Precompute positions, warm-starting from the previous export
+    layout_digest = None
+    if not args.no_layout:
+        with metrics.stage('layout'):
+            layout_digest = layout_nodes(nodes, edges, node_positions(previous_nodes),
+                                         iterations=args.layout_iterations,
+                                         previous_digest=previous_metadata.get('layout_digest'))
+    
+    logo_atlas = None
+    if args.logos:
+        logos = {}
+        for _ in collect_logos(records, logos):
+            pass
+        logo_atlas = attach_logos(nodes, logos, args.logo_workers, metrics)
+    
+    # Read the previous export before it is overwritten
+    previous_export = patch_manifest = patch_version = None
+    if args.patches:
+        previous_export = load_previous_export(output_format=args.output_format)
+        patch_manifest = load_manifest()
+        patch_version = next_version(patch_manifest)
     
     # Export JSON
-    export_json(nodes, edges)
+    clear_input_hash(output_file)
+    metadata = export_json(nodes, edges, output_format=args.output_format, metrics=metrics, logo_atlas=logo_atlas,
+                           overview_by=args.overview, overview_groups=overview_groups, patch_version=patch_version,
+                           layout_digest=layout_digest)
+    if args.patches:
+        export_patch(nodes, edges, metadata, previous_export, patch_manifest, metrics)
+    save_input_hash(output_file, current_hash)
+    
+    if args.snapshots:
+        append_snapshot(nodes, edges, args.snapshots, current_hash, metrics)
     
     print("\n✨ ETL process complete!")
 
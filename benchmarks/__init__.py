@@ -0,0 +1,4 @@
+"""
+Benchmarks
+Synthetic data, a mock Airtable API and the benchmark runner (run_benchmarks.py)
+"""
@@ -0,0 +1,198 @@
+"""
+Mock Airtable API
+Local stand-in for the list-records endpoint, so fetching can be benchmarked and
+tested without network access or a token
+
+Run `python -m benchmarks.mock_airtable --records 1000` and point the ETL at the
+printed URL with AIRTABLE_API_URL. With --serve-logos the records' logo URLs
+point back at the mock, which answers them with small generated PNGs, so logo
+downloads (airtable_etl.py --logos) can be tested offline too.
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import struct
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.synthetic import generate_records, parse_skew
+
+MAX_PAGE_SIZE = 100
+LOGO_PIXELS = 128
+
+# The filterByFormula clauses the ETL sends (see airtable_client and airtable_etl)
+PARTITION_CLAUSE = re.compile(r"FIND\(MID\(RECORD_ID\(\), 4, 1\), '([^']*)'\) > 0")
+MODIFIED_CLAUSE = re.compile(r"IS_AFTER\(LAST_MODIFIED_TIME\(\), DATETIME_PARSE\('([^']*)'\)\)")
+
+
+def parse_formula(formula):
+    """The partition and modified-since clauses of formula, or None if it has neither"""
+
+    partitions = PARTITION_CLAUSE.findall(formula)
+    modified_after = MODIFIED_CLAUSE.findall(formula)
+    if not partitions and not modified_after:
+        return None
+    return partitions, modified_after
+
+
+def logo_png(name, size=LOGO_PIXELS):
+    """A size × size PNG in a colour derived from name, encoded without any imaging library"""
+
+    red, green, blue = hashlib.sha256(name.encode('utf-8')).digest()[:3]
+    # Filter byte 0, then one RGB pixel after another, for each row
+    raw = (b'\x00' + bytes((red, green, blue)) * size) * size
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', size, size, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw)) + chunk(b'IEND', b''))
+
+
+def matches_formula(record, clauses):
+    """Whether a record passes every parsed clause; records count as modified when created"""
+
+    partitions, modified_after = clauses
+    return (all(record['id'][3] in chars for chars in partitions)
+            and all(record['createdTime'] > since for since in modified_after))
+
+
+class MockAirtable(ThreadingHTTPServer):
+    """HTTP server answering GET /v0/<base>/<table> from an in-memory record list
+
+    Supports pageSize, offset, fields[] and the ETL's filterByFormula clauses.
+    A fraction error_rate of requests gets a 429 with Retry-After, to exercise
+    the client's retries. With serve_logos, logo URLs are rewritten to
+    /logos/<record id>.png on this server.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, records, host='127.0.0.1', port=0, error_rate=0.0, seed=0, serve_logos=False):
+        super().__init__((host, port), MockHandler)
+        if serve_logos:
+            host, port = self.server_address[:2]
+            records = [{**record, 'fields': {**record['fields'], 'Logo': [
+                {**record['fields']['Logo'][0], 'url': f"http://{host}:{port}/logos/{record['id']}.png"}]}}
+                if record['fields'].get('Logo') else record for record in records]
+        self.records = records
+        self.logo_ids = {record['id'] for record in records if record['fields'].get('Logo')}
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.request_count = 0
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v0"
+
+    def start(self):
+        """Serve from a background thread, returning self"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class MockHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_logo(self, path):
+        record_id = path[len('/logos/'):].removesuffix('.png')
+        if record_id not in self.server.logo_ids:
+            self.send_json(404, {'error': 'NOT_FOUND'})
+            return
+        payload = logo_png(record_id)
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        server = self.server
+        if self.path.startswith('/logos/'):
+            self.send_logo(urlparse(self.path).path)
+            return
+        with server.lock:
+            server.request_count += 1
+            rate_limited = server.rng.random() < server.error_rate
+        if rate_limited:
+            self.send_json(429, {'errors': [{'error': 'RATE_LIMIT_REACHED'}]}, {'Retry-After': '0.05'})
+            return
+
+        url = urlparse(self.path)
+        if len([part for part in url.path.split('/') if part]) != 3:
+            self.send_json(404, {'error': 'NOT_FOUND'})
+            return
+        query = parse_qs(url.query)
+
+        records = server.records
+        formula = query.get('filterByFormula', [''])[0]
+        if formula:
+            clauses = parse_formula(formula)
+            if clauses is None:
+                self.send_json(422, {'error': {'type': 'INVALID_FILTER_BY_FORMULA', 'message': formula}})
+                return
+            records = [record for record in records if matches_formula(record, clauses)]
+
+        try:
+            page_size = min(MAX_PAGE_SIZE, int(query.get('pageSize', [MAX_PAGE_SIZE])[0]))
+            start = int(query.get('offset', ['itr0'])[0][3:])
+        except ValueError:
+            self.send_json(422, {'error': {'type': 'LIST_RECORDS_ITERATOR_NOT_AVAILABLE'}})
+            return
+        page = records[start:start + page_size]
+
+        fields = query.get('fields[]')
+        if fields:
+            page = [{**record, 'fields': {name: value for name, value in record['fields'].items() if name in fields}}
+                    for record in page]
+
+        body = {'records': page}
+        if start + page_size < len(records):
+            body['offset'] = f"itr{start + page_size}"
+        self.send_json(200, body)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve synthetic records on a mock Airtable list endpoint")
+    parser.add_argument('--records', type=int, default=1000, help="number of synthetic startups")
+    parser.add_argument('--values-per-field', type=int, default=None,
+                        help="distinct values per connection field (default: scales with --records)")
+    parser.add_argument('--skew', action='append', default=[], metavar='TYPE=FRACTION',
+                        help="give this fraction of records the type's first value (repeatable)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--port', type=int, default=0, help="port to listen on (default: any free port)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument('--serve-logos', action='store_true', help="serve generated logo images at the logo URLs")
+    args = parser.parse_args(argv)
+
+    records = generate_records(args.records, args.values_per_field, parse_skew(args.skew), args.seed)
+    server = MockAirtable(records, port=args.port, error_rate=args.error_rate, seed=args.seed,
+                          serve_logos=args.serve_logos)
+    print(server.url, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""
+Benchmark Runner
+Times each ETL stage on synthetic data across scales, with peak memory and output
+size, and fails on regressions against a stored baseline
+
+Run from the repository root:
+    python -m benchmarks.run_benchmarks                      # compare with the baseline
+    python -m benchmarks.run_benchmarks --update-baseline    # record a new baseline
+    python -m benchmarks.run_benchmarks --scales 100000 --stages process,stream \\
+        --max-bucket-size 500
+
+Every stage and scale runs in its own subprocess, so one measurement's memory
+never leaks into the next. Setup (generating records, building the graph an
+export needs) is not timed. Timings depend on the machine: record the baseline
+on the machine that checks against it.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from airtable_etl import EDGE_ENGINES, OUTPUT_FORMATS
+from benchmarks.synthetic import generate_connection_rows, generate_records, parse_skew
+
+STAGES = ('fetch', 'process', 'export', 'stream', 'preprocess')
+DEFAULT_SCALES = (100, 1000, 10000)
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# A measurement regresses when it exceeds baseline * (1 + tolerance) + slack;
+# the slack keeps millisecond-scale timings and tiny heaps from flapping
+TIME_SLACK = 0.05
+MEMORY_SLACK = 1024 * 1024
+# Rows of startup_connections_full.csv per startup for the preprocess stage
+ROWS_PER_STARTUP = 10
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+
+@contextlib.contextmanager
+def mock_api(args):
+    """Start benchmarks.mock_airtable in a subprocess for args.scale records, yielding its URL"""
+
+    command = [sys.executable, '-m', 'benchmarks.mock_airtable', '--records', str(args.scale),
+               '--seed', str(args.seed)]
+    if args.values_per_field:
+        command += ['--values-per-field', str(args.values_per_field)]
+    for spec in args.skew:
+        command += ['--skew', spec]
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    try:
+        yield server.stdout.readline().strip()
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def prepare(stage, args, pruning):
+    """Untimed setup: a no-argument callable running the stage, returning (output bytes, item count)"""
+
+    import airtable_etl as etl
+
+    if stage == 'preprocess':
+        import pandas as pd
+        from ConnPreProc_new3_weighted import weight_connections
+
+        edges_df = pd.DataFrame(generate_connection_rows(args.scale * ROWS_PER_STARTUP, startups=args.scale,
+                                                         values_per_field=args.values_per_field, seed=args.seed))
+
+        def run():
+            weighted = weight_connections(edges_df)
+            weighted.to_csv('startup_connections_weighted.csv', index=False, encoding='utf-8')
+            return os.path.getsize('startup_connections_weighted.csv'), len(weighted)
+        return run
+
+    records = generate_records(args.scale, args.values_per_field, parse_skew(args.skew), args.seed)
+
+    if stage == 'fetch':
+        from airtable_client import AirtableClient
+
+        def run():
+            client = AirtableClient('benchmark', 'appBenchmark', 'tblBenchmark', api_url=args.api_url,
+                                    rate=args.rate)
+            with client:
+                fetched = etl.fetch_all_records(client, workers=args.workers)
+            return len(json.dumps(fetched, ensure_ascii=False).encode('utf-8')), len(fetched)
+        return run
+
+    if stage == 'process':
+        def run():
+            nodes, edges = etl.process_records(records, args.engine, pruning, edge_workers=args.edge_workers)
+            return 0, len(edges)
+        return run
+
+    if stage == 'export':
+        nodes, edges = etl.process_records(records, args.engine, pruning, edge_workers=args.edge_workers)
+
+        def run():
+            etl.export_json(nodes, edges, output_format=args.output_format)
+            return directory_size('.'), len(edges)
+        return run
+
+    if stage == 'stream':
+        def run():
+            nodes, connection_index = etl.index_records(records)
+            if pruning.get('max_bucket_size'):
+                etl.split_hub_buckets(connection_index, nodes, pruning['max_bucket_size'])
+            etl.export_streaming(nodes, connection_index, output_format=args.output_format,
+                                 min_weight=pruning.get('min_weight') or 0, layout=False, analytics=False)
+            return directory_size('.'), len(nodes)
+        return run
+
+    raise ValueError(f"Unknown stage {stage!r}, expected one of {STAGES}")
+
+
+def measure(run, repeat):
+    """Best wall time of repeat runs, then one traced run for peak Python heap"""
+
+    seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output_bytes, items = run()
+        seconds = min(seconds, time.perf_counter() - start)
+
+    tracemalloc.start()
+    run()
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'seconds': round(seconds, 4), 'peak_bytes': peak_bytes, 'output_bytes': output_bytes, 'items': items}
+
+
+def run_worker(args):
+    """Measure one stage at one scale and print the result as a JSON line"""
+
+    from airtable_etl import parse_bucket_limits
+
+    pruning = {
+        'max_bucket_size': parse_bucket_limits(args.max_bucket_size),
+        'min_weight': args.min_weight,
+    }
+    repo_root = os.getcwd()
+    sys.path.insert(0, repo_root)
+
+    with contextlib.ExitStack() as stack:
+        if args.worker == 'fetch':
+            args.api_url = stack.enter_context(mock_api(args))
+        workdir = stack.enter_context(tempfile.TemporaryDirectory(prefix='chemstars-bench-'))
+        os.chdir(workdir)
+        try:
+            # The ETL reports progress on stdout; keep it out of the result line
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = measure(prepare(args.worker, args, pruning), args.repeat)
+        finally:
+            os.chdir(repo_root)
+    print(json.dumps(result))
+
+
+def benchmark(stage, scale, args):
+    """Run one measurement in a fresh interpreter"""
+
+    command = [sys.executable, '-m', 'benchmarks.run_benchmarks', '--worker', stage, '--scale', str(scale),
+               '--repeat', str(args.repeat), '--seed', str(args.seed), '--engine', args.engine,
+               '--format', args.output_format, '--min-weight', str(args.min_weight),
+               '--rate', str(args.rate), '--workers', str(args.workers)]
+    if args.values_per_field:
+        command += ['--values-per-field', str(args.values_per_field)]
+    for spec in args.skew:
+        command += ['--skew', spec]
+    for spec in args.max_bucket_size:
+        command += ['--max-bucket-size', spec]
+    if args.edge_workers:
+        command += ['--edge-workers', str(args.edge_workers)]
+
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{stage} at {scale} records failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def benchmark_config(args):
+    """Settings that must match for results to be comparable with a baseline"""
+    config = {
+        'values_per_field': args.values_per_field,
+        'skew': sorted(args.skew),
+        'seed': args.seed,
+        'engine': args.engine,
+        'format': args.output_format,
+        'max_bucket_size': sorted(args.max_bucket_size),
+        'min_weight': args.min_weight,
+        'workers': args.workers,
+    }
+    if args.edge_workers:
+        config['edge_workers'] = args.edge_workers
+    return config
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def find_regressions(result, base, args):
+    """Names of the measurements in result that are worse than base allows"""
+
+    checks = [
+        ('time', 'seconds', args.time_tolerance, TIME_SLACK),
+        ('memory', 'peak_bytes', args.memory_tolerance, MEMORY_SLACK),
+        ('size', 'output_bytes', args.size_tolerance, 0),
+    ]
+    return [name for name, key, tolerance, slack in checks
+            if result[key] > base[key] * (1 + tolerance) + slack]
+
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def format_change(value, base_value):
+    if not base_value:
+        return ''
+    return f" ({(value - base_value) / base_value:+.0%})"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ETL stages on synthetic records")
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help=f"comma-separated stages to run (default: all of {', '.join(STAGES)})")
+    parser.add_argument('--scales', default=','.join(map(str, DEFAULT_SCALES)),
+                        help="comma-separated record counts (default: %(default)s; up to 100000 is supported, "
+                             "use --max-bucket-size or the stream stage at that size)")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per measurement, best one counts")
+    parser.add_argument('--values-per-field', type=int, default=None,
+                        help="distinct values per connection field (default: scales with the record count)")
+    parser.add_argument('--skew', action='append', default=[], metavar='TYPE=FRACTION',
+                        help="give this fraction of records the type's first value, e.g. country=0.5 (repeatable)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--engine', choices=EDGE_ENGINES, default='python')
+    parser.add_argument('--edge-workers', type=int, default=None, help="processes for --engine parallel")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='compact', dest='output_format')
+    parser.add_argument('--max-bucket-size', action='append', default=[], metavar='[TYPE=]N',
+                        help="passed to the ETL's hub-bucket pruning (repeatable)")
+    parser.add_argument('--min-weight', type=int, default=0)
+    parser.add_argument('--rate', type=float, default=1000,
+                        help="client requests per second against the mock API (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=1, help="parallel fetch workers")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="baseline JSON file (default: %(default)s)")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="write this run's results as the new baseline instead of comparing")
+    parser.add_argument('--time-tolerance', type=float, default=0.5,
+                        help="allowed slowdown as a fraction of the baseline (default: %(default)s)")
+    parser.add_argument('--memory-tolerance', type=float, default=0.25,
+                        help="allowed peak memory growth as a fraction (default: %(default)s)")
+    parser.add_argument('--size-tolerance', type=float, default=0.05,
+                        help="allowed output size growth as a fraction (default: %(default)s)")
+    parser.add_argument('--worker', choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument('--scale', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    args.stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = set(args.stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    try:
+        args.scales = [int(scale) for scale in args.scales.split(',') if scale.strip()]
+        parse_skew(args.skew)
+    except ValueError as e:
+        parser.error(str(e))
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.worker:
+        run_worker(args)
+        return 0
+
+    config = benchmark_config(args)
+    baseline = None if args.update_baseline else load_baseline(args.baseline)
+    if baseline and baseline.get('config') != config:
+        print(f"⚠️  {args.baseline} was recorded with different settings; not comparing")
+        print(f"   baseline: {json.dumps(baseline.get('config'))}")
+        print(f"   this run: {json.dumps(config)}\n")
+        baseline = None
+    base_results = (baseline or {}).get('results', {})
+
+    print(f"⏱️  Benchmarking {', '.join(args.stages)} at {', '.join(map(str, args.scales))} records...\n")
+    print(f"   {'stage':<11}{'records':>8}{'time':>18}{'peak memory':>22}{'output':>22}")
+
+    results = {}
+    regressions = []
+    for scale in args.scales:
+        for stage in args.stages:
+            key = f"{stage}/{scale}"
+            result = results[key] = benchmark(stage, scale, args)
+            base = base_results.get(key)
+            failed = find_regressions(result, base, args) if base else []
+            if failed:
+                regressions.append((key, failed))
+            base = base or {}
+            print(f"{'❌' if failed else '  '} {stage:<11}{scale:>8}"
+                  f"{result['seconds']:>10.3f}s{format_change(result['seconds'], base.get('seconds')):>8}"
+                  f"{format_bytes(result['peak_bytes']):>14}{format_change(result['peak_bytes'], base.get('peak_bytes')):>8}"
+                  f"{format_bytes(result['output_bytes']):>14}{format_change(result['output_bytes'], base.get('output_bytes')):>8}")
+
+    if args.update_baseline:
+        merged = load_baseline(args.baseline) or {}
+        if merged.get('config') != config:
+            merged = {}
+        merged_results = {**merged.get('results', {}), **results}
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'config': config, 'results': dict(sorted(merged_results.items()))}, f, indent=2)
+            f.write('\n')
+        print(f"\n💾 Baseline written to {args.baseline}")
+        return 0
+
+    if not base_results:
+        print("\n⚠️  No comparable baseline; run with --update-baseline to record one")
+        return 0
+    missing = [key for key in results if key not in base_results]
+    if missing:
+        print(f"\n⚠️  Not in the baseline: {', '.join(missing)}")
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) against {args.baseline}:")
+        for key, failed in regressions:
+            print(f"   {key}: {', '.join(failed)}")
+        return 1
+    print("\n✅ No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Synthetic Data
+Airtable-shaped startup records and weighted-CSV connection rows for benchmarks,
+with control over scale, value cardinality and skew
+"""
+
+import random
+from datetime import datetime, timedelta, timezone
+
+from airtable_client import RECORD_ID_CHARS
+from airtable_etl import CONNECTION_FIELDS, CONNECTION_TYPES
+
+# Each record gets 0 to 3 values per connection field, 1.5 on average
+VALUES_PER_RECORD = (0, 3)
+# Average startups per connection value when values_per_field is not given
+DEFAULT_BUCKET_SIZE = 8
+
+COUNTRIES = ['DE', 'FR', 'NL', 'BE', 'AT', 'CH', 'IT', 'ES', 'PL', 'SE', 'DK', 'FI', 'UK', 'US', 'IL']
+# Connection types and value prefixes of startup_connections_full.csv rows
+CSV_TYPES = ('competency', 'impact', 'city', 'country', 'target_market')
+
+
+def default_values_per_field(count, bucket_size=DEFAULT_BUCKET_SIZE):
+    """Distinct values per field so buckets average bucket_size startups"""
+    mean_values = sum(VALUES_PER_RECORD) / 2
+    return max(5, round(count * mean_values / bucket_size))
+
+
+def field_value(conn_type, index):
+    """The index-th value of a connection type, formatted like the real base"""
+    if conn_type == 'city':
+        return f"{COUNTRIES[index % len(COUNTRIES)]} - City {index}"
+    if conn_type == 'country':
+        return f"{COUNTRIES[index % len(COUNTRIES)]} Country {index}"
+    if conn_type == 'cohort':
+        return f"Cohort {index}"
+    return f"{conn_type.replace('_', ' ').title()} {index}"
+
+
+def record_id(rng):
+    return 'rec' + ''.join(rng.choice(RECORD_ID_CHARS) for _ in range(14))
+
+
+def generate_records(count, values_per_field=None, skew=None, seed=0):
+    """count startup records shaped like Airtable list-records results
+
+    values_per_field sets the distinct values of every connection field
+    (default: enough for buckets of DEFAULT_BUCKET_SIZE startups). skew maps a
+    connection type to the fraction of records that also get that type's
+    first value, e.g. {'country': 0.5} for one giant country bucket. The same
+    arguments always give the same records.
+    """
+
+    rng = random.Random(seed)
+    values_per_field = values_per_field or default_values_per_field(count)
+    skew = skew or {}
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    records = []
+    used_ids = set()
+    for i in range(count):
+        rid = record_id(rng)
+        while rid in used_ids:
+            rid = record_id(rng)
+        used_ids.add(rid)
+
+        name = f"Startup {i:06d}"
+        fields = {
+            'Startup': name,
+            'Description': f"{name} builds chemistry products for market {rng.randrange(100)}.",
+            'Website': f"https://startup{i}.example.com",
+            'One liner': f"Sustainable chemistry #{i}",
+            'Location (HQ)': [field_value('city', rng.randrange(values_per_field))],
+        }
+        if rng.random() < 0.7:
+            fields['Logo'] = [{'id': f"att{rid[3:]}", 'url': f"https://dl.example.com/{rid}.png",
+                               'filename': f"{name}.png", 'type': 'image/png'}]
+
+        for conn_type, field_name, _ in CONNECTION_FIELDS:
+            values = {field_value(conn_type, rng.randrange(values_per_field))
+                      for _ in range(rng.randint(*VALUES_PER_RECORD))}
+            if rng.random() < skew.get(conn_type, 0):
+                values.add(field_value(conn_type, 0))
+            if values:
+                fields[field_name] = sorted(values)
+
+        records.append({
+            'id': rid,
+            'createdTime': (created + timedelta(seconds=i)).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            'fields': fields
+        })
+    return records
+
+
+def generate_connection_rows(count, startups=None, values_per_field=None, seed=0):
+    """count rows of startup_connections_full.csv: Source, Target, Type, Connection, Connection_full
+
+    Rows are drawn between startups (default: count // 10 of them) so that
+    pairs repeat and the weighted preprocessor has edges to merge.
+    """
+
+    rng = random.Random(seed)
+    startups = startups or max(10, count // 10)
+    values_per_field = values_per_field or max(5, count // 200)
+    names = [f"Startup {i:06d}" for i in range(startups)]
+
+    rows = []
+    for _ in range(count):
+        source, target = rng.sample(names, 2)
+        conn_type = rng.choice(CSV_TYPES)
+        value = field_value(conn_type, rng.randrange(values_per_field))
+        rows.append({
+            'Source': source,
+            'Target': target,
+            'Type': conn_type,
+            'Connection': value,
+            'Connection_full': f"{conn_type}: {value}",
+        })
+    return rows
+
+
+def parse_skew(specs):
+    """Turn ['country=0.5'] into {'country': 0.5}"""
+
+    skew = {}
+    for spec in specs:
+        conn_type, _, fraction = spec.partition('=')
+        if conn_type not in CONNECTION_TYPES:
+            raise ValueError(f"Unknown connection type {conn_type!r} in --skew")
+        skew[conn_type] = float(fraction)
+    return skew
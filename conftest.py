@@ -0,0 +1,2 @@
+# test_airtable_connection.py is a manual check against the live base, not a test
+collect_ignore = ['test_airtable_connection.py']
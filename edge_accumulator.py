@@ -0,0 +1,103 @@
+"""
+Edge Accumulator
+Compact per-pair accumulators for the ETL's edge engines: startup names and
+connection values are interned to integer ids, connection types are a bitmask
+and each pair's shared values are one small integer array, so dense buckets no
+longer cost a handful of Python sets per pair. Strings are only materialized
+when an edge is exported
+"""
+
+from array import array
+from collections.abc import MutableMapping
+
+# Value ids are positions in the connection index, far below 2**31
+VALUE_ID_TYPECODE = 'i'
+
+
+class EdgeRecord:
+    """Accumulator for one startup pair: weight, type bitmask and shared value ids"""
+
+    __slots__ = ('weight', 'type_mask', 'value_ids')
+
+    def __init__(self, weight=0, type_mask=0, value_ids=None):
+        self.weight = weight
+        self.type_mask = type_mask
+        self.value_ids = array(VALUE_ID_TYPECODE) if value_ids is None else value_ids
+
+    def add(self, type_bit, value_id, weight=1):
+        """Count weight more shared connections through one bucket
+
+        Buckets are walked one after another, so a bucket met again for the
+        same pair (duplicate startup names) is always the last value added.
+        """
+
+        self.weight += weight
+        self.type_mask |= type_bit
+        value_ids = self.value_ids
+        if not value_ids or value_ids[-1] != value_id:
+            value_ids.append(value_id)
+
+
+class CompactEdges(MutableMapping):
+    """{(source, target): EdgeRecord} for startup pairs, stored by integer pair code
+
+    Names are interned in sorted order, so pair codes (source id × name count +
+    target id) sort like (source, target). Each (type, value) bucket's value id
+    is its position in the connection index. Bit i of a type mask stands for
+    the i-th type of type_attributes, which maps each type to its edge
+    attribute. Records keep the order pairs were first met.
+    """
+
+    def __init__(self, connection_index, type_attributes):
+        self.value_keys = list(connection_index)
+        self.names = sorted({name for members in connection_index.values() for name in members})
+        self.name_ids = {name: i for i, name in enumerate(self.names)}
+        self.type_attributes = type_attributes
+        self.type_bits = {conn_type: 1 << bit for bit, conn_type in enumerate(type_attributes)}
+        self.records = {}
+
+    def code(self, source, target):
+        return self.name_ids[source] * len(self.names) + self.name_ids[target]
+
+    def pair(self, code):
+        source_id, target_id = divmod(code, len(self.names))
+        return self.names[source_id], self.names[target_id]
+
+    def record(self, source_id, target_id):
+        """The accumulator of a pair of name ids, created empty on first use"""
+
+        code = source_id * len(self.names) + target_id
+        record = self.records.get(code)
+        if record is None:
+            record = self.records[code] = EdgeRecord()
+        return record
+
+    def __getitem__(self, key):
+        return self.records[self.code(*key)]
+
+    def __setitem__(self, key, record):
+        self.records[self.code(*key)] = record
+
+    def __delitem__(self, key):
+        del self.records[self.code(*key)]
+
+    def __iter__(self):
+        return map(self.pair, self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def items(self):
+        """((source, target), EdgeRecord) in first-met order, without re-encoding each key"""
+        return ((self.pair(code), record) for code, record in self.records.items())
+
+    def edge_info(self, record):
+        """Materialize a record as {'weight', 'types', <attribute>: set of values, ...}"""
+
+        info = {'weight': record.weight,
+                'types': {conn_type for conn_type, bit in self.type_bits.items() if record.type_mask & bit}}
+        info.update((attr, set()) for attr in self.type_attributes.values())
+        for value_id in record.value_ids:
+            conn_type, conn_value = self.value_keys[value_id]
+            info[self.type_attributes[conn_type]].add(conn_value)
+        return info
@@ -0,0 +1,324 @@
+"""
+Graph Analytics
+Degree, weighted degree, connected components, Louvain communities and sampled
+betweenness on a sparse adjacency matrix, so the viewer can size and colour
+nodes by them without computing anything in the browser
+"""
+
+import hashlib
+from collections import deque
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+
+# Source nodes sampled for approximate betweenness; graphs this small or smaller are exact
+BETWEENNESS_SAMPLES = 100
+# Fixed seeds keep exports identical for the same input; with node ids the
+# sample is picked by a seeded hash of each id, so edits elsewhere keep it
+BETWEENNESS_SEED = 0
+LOUVAIN_RESOLUTION = 1.0
+# Smallest modularity gain that counts as an improvement
+MIN_GAIN = 1e-12
+# Warm-started Louvain reruns from its own result until the partition settles
+WARM_ROUNDS = 10
+
+
+def adjacency_matrix(n, sources, targets, weights):
+    """Symmetric n × n CSR matrix of edge weights, without self-loops
+
+    Self-pairs only come from duplicate startup names and say nothing about
+    the network's structure, so they are dropped.
+    """
+
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.float64)
+    keep = sources != targets
+    sources, targets, weights = sources[keep], targets[keep], weights[keep]
+    A = sparse.csr_matrix((np.concatenate([weights, weights]),
+                           (np.concatenate([sources, targets]), np.concatenate([targets, sources]))),
+                          shape=(n, n))
+    A.sum_duplicates()
+    A.sort_indices()
+    return A
+
+
+def rank_labels(labels):
+    """Relabel groups 0, 1, ... by size, largest first, ties by their lowest member"""
+
+    if not len(labels):
+        return labels
+    _, first, inverse, counts = np.unique(labels, return_index=True, return_inverse=True, return_counts=True)
+    order = np.lexsort((first, -counts))
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    return rank[inverse]
+
+
+def match_labels(labels, previous):
+    """Relabel groups so they keep the labels of the previous run's groups
+
+    previous holds each node's label from the last run, -1 for nodes that are
+    new. Pairs of groups are matched one to one by shared members, most shared
+    first; groups left unmatched take the lowest labels no previous group
+    used, in rank_labels order.
+    """
+
+    if not len(labels):
+        return labels
+    known = previous >= 0
+    pairs, shared = np.unique(np.column_stack([labels[known], previous[known]]), axis=0, return_counts=True)
+    mapping = {}
+    taken = set()
+    for index in np.lexsort((pairs[:, 1], pairs[:, 0], -shared)).tolist():
+        group, label = pairs[index].tolist()
+        if group not in mapping and label not in taken:
+            mapping[group] = label
+            taken.add(label)
+
+    reserved = taken | set(previous[known].tolist())
+    free = (label for label in range(len(labels) + len(reserved)) if label not in reserved)
+    ranks = rank_labels(labels)
+    unmatched = sorted({(rank, group) for rank, group in zip(ranks.tolist(), labels.tolist()) if group not in mapping})
+    for _, group in unmatched:
+        mapping[group] = next(free)
+    return np.array([mapping[group] for group in labels.tolist()], dtype=np.int64)
+
+
+def pivot_order(keys, seed=BETWEENNESS_SEED):
+    """Node indices sorted by a seeded hash of each node's key"""
+
+    hashes = [hashlib.blake2b(f"{seed}:{key}".encode('utf-8'), digest_size=8).digest() for key in keys]
+    return sorted(range(len(keys)), key=hashes.__getitem__)
+
+
+def degrees(A):
+    """Neighbour count and summed edge weight per node"""
+    return np.diff(A.indptr), np.asarray(A.sum(axis=1)).ravel()
+
+
+def connected_components(A):
+    """Component label per node, 0 being the largest component"""
+
+    if A.shape[0] == 0:
+        return np.empty(0, dtype=np.int64)
+    _, labels = csgraph.connected_components(A, directed=False)
+    return rank_labels(labels)
+
+
+def modularity(A, labels, resolution=LOUVAIN_RESOLUTION):
+    """Newman modularity of a partition of A"""
+
+    total = A.sum()
+    if total == 0:
+        return 0.0
+    A = A.tocoo()
+    internal = np.bincount(labels[A.row], weights=A.data * (labels[A.row] == labels[A.col]),
+                           minlength=labels.max() + 1)
+    degree_sums = np.bincount(labels, weights=np.asarray(A.tocsr().sum(axis=1)).ravel())
+    return float(internal.sum() / total - resolution * np.sum((degree_sums / total) ** 2))
+
+
+def _move_nodes(A, resolution, initial=None):
+    """Louvain phase one: move single nodes to the neighbouring community with the best gain
+
+    Every node starts in its own community, or in its initial label (0..n-1).
+
+    Nodes wait in a queue, first in index order; when a node moves, only its
+    neighbours outside its new community are queued again, instead of
+    sweeping every node until nothing moves (the fast local move of Traag et
+    al., 2019). Ties go to the lowest community, so the result is
+    deterministic. Returns community labels numbered 0..c-1.
+    """
+
+    n = A.shape[0]
+    indptr, indices, data = A.indptr, A.indices, A.data
+    # Row sums count a self-loop (internal weight of an aggregated community) once per direction
+    k = np.asarray(A.sum(axis=1)).ravel()
+    total = k.sum()
+    community = np.arange(n) if initial is None else initial.copy()
+    community_degree = np.bincount(community, weights=k, minlength=n)
+
+    queue = deque(range(n))
+    queued = np.ones(n, dtype=bool)
+    while queue:
+        i = queue.popleft()
+        queued[i] = False
+        row = slice(indptr[i], indptr[i + 1])
+        neighbours = indices[row]
+        not_self = neighbours != i
+        if not not_self.any():
+            continue
+        neighbours = neighbours[not_self]
+        current = community[i]
+        community_degree[current] -= k[i]
+
+        # Link weight to each neighbouring community; np.unique costs more in call overhead
+        neighbour_communities = community[neighbours]
+        order = neighbour_communities.argsort()
+        ordered = neighbour_communities[order]
+        starts = np.flatnonzero(np.concatenate(([True], ordered[1:] != ordered[:-1])))
+        candidates = ordered[starts]
+        links = np.add.reduceat(data[row][not_self][order], starts)
+        gains = links - resolution * community_degree[candidates] * k[i] / total
+        position = np.searchsorted(candidates, current)
+        if position < len(candidates) and candidates[position] == current:
+            stay = gains[position]
+        else:
+            stay = -resolution * community_degree[current] * k[i] / total
+        top = int(np.argmax(gains))
+        best = candidates[top] if gains[top] > stay + MIN_GAIN else current
+
+        community_degree[best] += k[i]
+        if best != current:
+            community[i] = best
+            stale = neighbours[(community[neighbours] != best) & ~queued[neighbours]]
+            queued[stale] = True
+            queue.extend(stale.tolist())
+
+    return np.unique(community, return_inverse=True)[1]
+
+
+def louvain(A, resolution=LOUVAIN_RESOLUTION, initial=None):
+    """Louvain community label per node (0 being the largest) and the partition's modularity
+
+    Alternates moving nodes between communities and collapsing each community
+    into one node (Blondel et al., 2008) until no move improves modularity.
+    initial (a label per node, -1 for none) warm-starts the first level from
+    an earlier partition, so a small change to the graph only moves the
+    nodes it affects. Either way the run is repeated from its own result, at
+    most WARM_ROUNDS times, until the partition no longer changes, so the
+    same graph warm-started from a result gives that result again.
+    """
+
+    n = A.shape[0]
+    if n == 0 or A.nnz == 0:
+        return np.arange(n), 0.0
+
+    membership = _louvain_levels(A, resolution)[0] if initial is None else np.asarray(initial, dtype=np.int64)
+    for _ in range(WARM_ROUNDS):
+        # Nodes without a label start alone, after the earlier communities
+        start = np.where(membership >= 0, membership, membership.max() + 1 + np.arange(n))
+        previous = rank_labels(np.unique(start, return_inverse=True)[1])
+        membership, quality = _louvain_levels(A, resolution, previous)
+        if np.array_equal(membership, previous):
+            break
+    return membership, quality
+
+
+def _louvain_levels(A, resolution, start=None):
+    """One Louvain run from singletons or the start labels (0..n-1)"""
+
+    membership = np.arange(A.shape[0])
+    level = A
+    while True:
+        labels = _move_nodes(level, resolution, start)
+        start = None
+        communities = labels.max() + 1
+        if communities == level.shape[0]:
+            break
+        membership = labels[membership]
+        collapse = sparse.csr_matrix((np.ones(len(labels)), (np.arange(len(labels)), labels)),
+                                     shape=(len(labels), communities))
+        level = (collapse.T @ level @ collapse).tocsr()
+        level.sort_indices()
+
+    membership = rank_labels(membership)
+    return membership, modularity(A, membership, resolution)
+
+
+def approximate_betweenness(A, samples=BETWEENNESS_SAMPLES, seed=BETWEENNESS_SEED, keys=None):
+    """Normalized betweenness centrality per node over unweighted shortest paths
+
+    Brandes' accumulation from `samples` random source nodes, scaled up to
+    all sources (exact when samples >= n). With keys (one per node, e.g. its
+    id) the sources are the nodes first in pivot_order, so adding or removing
+    a node only changes the sample if that node is in it. Edge weights count
+    shared values, i.e. closeness rather than distance, so paths are counted
+    in hops. Each BFS level is one sparse product over the frontier's rows.
+    """
+
+    n = A.shape[0]
+    centrality = np.zeros(n)
+    if n <= 2:
+        return centrality
+
+    if samples >= n:
+        pivots = np.arange(n)
+    elif keys is not None:
+        pivots = np.sort(np.array(pivot_order(keys, seed)[:samples]))
+    else:
+        pivots = np.sort(np.random.default_rng(seed).choice(n, samples, replace=False))
+
+    S = A.copy()
+    S.data = np.ones_like(S.data)
+
+    for source in pivots.tolist():
+        sigma = np.zeros(n)
+        sigma[source] = 1.0
+        visited = np.zeros(n, dtype=bool)
+        visited[source] = True
+        levels = [np.array([source])]
+        while True:
+            frontier = levels[-1]
+            paths = S[frontier].T @ sigma[frontier]
+            reached = np.flatnonzero((paths > 0) & ~visited)
+            if not len(reached):
+                break
+            visited[reached] = True
+            sigma[reached] = paths[reached]
+            levels.append(reached)
+
+        delta = np.zeros(n)
+        for depth in range(len(levels) - 1, 0, -1):
+            children, parents = levels[depth], levels[depth - 1]
+            share = np.zeros(n)
+            share[children] = (1.0 + delta[children]) / sigma[children]
+            delta[parents] += sigma[parents] * (S[parents] @ share)
+        delta[source] = 0.0
+        centrality += delta
+
+    # Each undirected pair is counted from both ends when every node is a source
+    return centrality * (n / len(pivots)) / ((n - 1) * (n - 2))
+
+
+def analyze(n, sources, targets, weights, betweenness_samples=None, keys=None, previous_communities=None):
+    """Every metric for an edge list given as node-index arrays
+
+    Returns ({attribute: per-node array}, summary). betweenness_samples=0
+    skips betweenness; None uses BETWEENNESS_SAMPLES. keys (node ids by index)
+    pick the betweenness sources and previous_communities (each node's last
+    community, -1 if unknown) warm-starts Louvain and carries community labels
+    over (see match_labels), so both stay put when the graph changes elsewhere.
+    """
+
+    if betweenness_samples is None:
+        betweenness_samples = BETWEENNESS_SAMPLES
+    A = adjacency_matrix(n, sources, targets, weights)
+
+    degree, weighted_degree = degrees(A)
+    components = connected_components(A)
+    if previous_communities is None:
+        communities, community_modularity = louvain(A)
+    else:
+        previous_communities = np.asarray(previous_communities, dtype=np.int64)
+        communities, community_modularity = louvain(A, initial=previous_communities)
+        communities = match_labels(communities, previous_communities)
+    results = {
+        'degree': degree,
+        'weighted_degree': weighted_degree,
+        'component': components,
+        'community': communities,
+    }
+    if betweenness_samples:
+        results['betweenness'] = approximate_betweenness(A, betweenness_samples, keys=keys)
+
+    summary = {
+        'components': int(components.max()) + 1 if n else 0,
+        'largest_component': int(np.count_nonzero(components == 0)) if n else 0,
+        'communities': len(np.unique(communities)),
+        'modularity': round(community_modularity, 4),
+        'betweenness_sources': min(betweenness_samples, n),
+    }
+    return results, summary
@@ -0,0 +1,196 @@
+"""
+Graph Patches
+Versioned diffs between consecutive exports plus a manifest chaining them, so a
+viewer that already holds the graph can catch up by applying a few kilobytes
+instead of downloading the whole network again
+"""
+
+import json
+import os
+
+from stream_writer import PrecompressedWriter
+
+PATCH_DIR = 'patches'
+MANIFEST_FILE = 'manifest.json'
+PATCH_FORMAT = 'chemstars-patch'
+PATCH_VERSION = 1
+MANIFEST_FORMAT = 'chemstars-patch-manifest'
+MANIFEST_VERSION = 1
+# Versions listed in the manifest; viewers further behind reload the full graph
+MAX_PATCHES = 100
+# Warm-started layouts nudge every node a little; moves below this fraction of
+# the layout span are not patched unless the node's edges changed
+POSITION_TOLERANCE = 0.05
+# Airtable signs attachment URLs afresh on every fetch, so these only ride
+# along when something else about the node changed
+PASSIVE_ATTRIBUTES = ('logo_url',)
+# Recomputed from the whole graph, so a single edit shifts them on nearly every
+# node; only added and rewired nodes get them, the rest catch up on a full load
+ANALYTICS_ATTRIBUTES = ('degree', 'weighted_degree', 'component', 'community', 'betweenness')
+
+
+def patch_file_name(version):
+    return f"patch-{version}.json"
+
+
+def layout_span(nodes):
+    """Largest extent of the {id: attributes} node positions along x or y, 0 without positions"""
+
+    spans = []
+    for axis in ('x', 'y'):
+        values = [attributes[axis] for attributes in nodes.values()
+                  if isinstance(attributes.get(axis), (int, float))]
+        spans.append(max(values) - min(values) if values else 0)
+    return max(spans)
+
+
+def node_changes(previous, attributes, min_move=0, ignored=()):
+    """({attribute: new value}, [removed attributes]) between two states of one node
+
+    x/y are left out when the node moved less than min_move along both axes,
+    and attributes in ignored are not compared at all.
+    """
+
+    changed = {key: value for key, value in attributes.items()
+               if key not in ignored and previous.get(key) != value}
+    if 'x' in changed or 'y' in changed:
+        moves = [abs(attributes.get(axis, 0) - previous.get(axis, 0)) for axis in ('x', 'y')
+                 if isinstance(attributes.get(axis), (int, float)) and isinstance(previous.get(axis), (int, float))]
+        if len(moves) == 2 and max(moves) < min_move:
+            changed.pop('x', None)
+            changed.pop('y', None)
+    removed = [key for key in previous if key not in attributes and key not in ignored]
+    if not removed and all(key in PASSIVE_ATTRIBUTES for key in changed):
+        return {}, []
+    return changed, removed
+
+
+def diff_nodes(old_nodes, new_nodes, tolerance=POSITION_TOLERANCE, rewired=()):
+    """Added, removed and changed nodes between two {id: attributes} states
+
+    Added nodes carry all their attributes, removed ones only their id and
+    changed ones {'id', 'set', 'unset'} with just the attributes that differ
+    (see node_changes). Positions and ANALYTICS_ATTRIBUTES of the nodes in
+    rewired are always patched; other nodes only get positions that moved by
+    tolerance × the new layout span or more, and no analytics.
+    """
+
+    min_move = tolerance * layout_span(new_nodes)
+    changed = []
+    for node_id, attributes in new_nodes.items():
+        if node_id in old_nodes:
+            if node_id in rewired:
+                set_attributes, unset = node_changes(old_nodes[node_id], attributes)
+            else:
+                set_attributes, unset = node_changes(old_nodes[node_id], attributes, min_move, ANALYTICS_ATTRIBUTES)
+            if set_attributes or unset:
+                changed.append({'id': node_id, 'set': set_attributes, 'unset': unset})
+    return {
+        'added': [attributes for node_id, attributes in new_nodes.items() if node_id not in old_nodes],
+        'removed': [node_id for node_id in old_nodes if node_id not in new_nodes],
+        'changed': changed,
+    }
+
+
+def diff_edges(old_edges, new_edges):
+    """Added, removed and changed edges between two {(source, target): [state...]} states
+
+    Added and changed edges become rows [source, target, *state] that replace
+    the edge whole; removed edges are [source, target].
+    """
+
+    return {
+        'added': [[*key, *state] for key, state in new_edges.items() if key not in old_edges],
+        'removed': [list(key) for key in old_edges if key not in new_edges],
+        'changed': [[*key, *state] for key, state in new_edges.items()
+                    if key in old_edges and old_edges[key] != state],
+    }
+
+
+def build_patch(from_version, to_version, old_graph, new_graph, tolerance=POSITION_TOLERANCE):
+    """Patch turning old_graph into new_graph
+
+    Graphs are dicts with 'nodes' ({id: attributes}), 'edges' ({(source,
+    target): state}), 'node_order' (exported node ids in file order) and
+    'metadata'. Nodes with an added, removed or changed edge always get their
+    new position and analytics (see diff_nodes). The new node order is only included when it
+    differs, as sharded viewers need it to resolve the node indices of shards
+    loaded later.
+    """
+
+    edges = diff_edges(old_graph['edges'], new_graph['edges'])
+    rewired = {node_id for rows in edges.values() for row in rows for node_id in row[:2]}
+    patch = {
+        'format': PATCH_FORMAT,
+        'version': PATCH_VERSION,
+        'from': from_version,
+        'to': to_version,
+        'nodes': diff_nodes(old_graph['nodes'], new_graph['nodes'], tolerance, rewired),
+        'edges': edges,
+        'metadata': new_graph['metadata'],
+    }
+    if old_graph['node_order'] != new_graph['node_order']:
+        patch['node_order'] = new_graph['node_order']
+    return patch
+
+
+def patch_counts(patch):
+    """{'nodes': {'added': n, ...}, 'edges': {...}} for the manifest"""
+    return {part: {change: len(items) for change, items in patch[part].items()} for part in ('nodes', 'edges')}
+
+
+def load_manifest(patch_dir=PATCH_DIR):
+    """The patch manifest, or None if there is no usable one"""
+
+    try:
+        with open(os.path.join(patch_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('format') != MANIFEST_FORMAT or manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def next_version(manifest):
+    """Version number for the next export"""
+    return manifest['current'] + 1 if manifest else 1
+
+
+def record_version(manifest, version, patch=None, patch_dir=PATCH_DIR, max_patches=MAX_PATCHES):
+    """Write the patch for version (if any) and append version to the manifest
+
+    A version without a patch starts a new chain: viewers on an older version
+    must reload the full graph. Only the last max_patches versions are kept;
+    patch files of dropped versions are deleted. Returns the new manifest entry.
+    """
+
+    os.makedirs(patch_dir, exist_ok=True)
+    entry = {'version': version, 'patch': None}
+    if patch is not None:
+        entry['patch'] = patch_file_name(version)
+        with PrecompressedWriter(os.path.join(patch_dir, entry['patch'])) as out:
+            out.write(json.dumps(patch, ensure_ascii=False, separators=(',', ':')))
+        entry['from'] = patch['from']
+        entry['bytes'] = out.sizes
+        entry.update(patch_counts(patch))
+
+    versions = (manifest or {}).get('versions', []) + [entry]
+    kept = versions[-max_patches:]
+    kept_files = {item['patch'] for item in kept if item['patch']}
+    for name in os.listdir(patch_dir):
+        if name.startswith('patch-') and name.split('.json')[0] + '.json' not in kept_files:
+            os.remove(os.path.join(patch_dir, name))
+
+    manifest = {
+        'format': MANIFEST_FORMAT,
+        'version': MANIFEST_VERSION,
+        'current': version,
+        'versions': kept,
+    }
+    tmp_file = os.path.join(patch_dir, MANIFEST_FILE + '.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    os.replace(tmp_file, os.path.join(patch_dir, MANIFEST_FILE))
+    return entry
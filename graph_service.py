@@ -0,0 +1,463 @@
+"""
+Graph Query Service
+Local HTTP service over the ETL's in-memory graph (node list, connection index,
+combined edges), so the dashboard can ask for the neighbourhood it is showing
+instead of loading the whole network_data.json
+
+Run `python graph_service.py` next to the ETL's record cache (or with --store
+for the record store) and query:
+    GET  /neighbours?id=NAME[&limit=N][&min_weight=W]   strongest neighbours first
+    GET  /shares?type=TYPE&value=VALUE                  startups with a connection value
+    GET  /subgraph?id=NAME&id=...&value=TYPE:VALUE...   subgraph induced by the filter set
+    GET  /status                                        snapshot and cache statistics, last reload error
+    POST /reload                                        rebuild from the latest ETL snapshot
+The snapshot also reloads by itself when the cache file or record store changes;
+if that reload fails, the service keeps answering from the snapshot it has.
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import airtable_etl as etl
+from record_store import RecordStore
+
+DEFAULT_PORT = 8765
+CACHE_SIZE = 1024
+# Seconds between checks of the snapshot source for a newer ETL run
+RELOAD_CHECK_INTERVAL = 2.0
+
+
+class QueryError(ValueError):
+    """A request the service cannot answer, with the HTTP status to send"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class GraphSnapshot:
+    """Read-only indexes over one ETL run's nodes, connection index and combined edges
+
+    Adjacency lists are sorted once, strongest edge first with ties by name,
+    so neighbour queries are a slice. Exported edge dicts (see
+    airtable_etl.edge_from_info) are built only for the edges a query returns.
+    """
+
+    def __init__(self, nodes, connection_index, combined_edges, source=None, version=None):
+        self.source = source
+        self.version = version
+        self.loaded_at = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+
+        self.nodes = {}
+        for node in nodes:
+            self.nodes.setdefault(node['id'], node)
+        # Members in table order without the repeats of duplicate names
+        self.members = {key: list(dict.fromkeys(startup_list)) for key, startup_list in connection_index.items()}
+        self.edges = combined_edges
+
+        adjacency = defaultdict(list)
+        for (source_id, target_id), record in combined_edges.items():
+            adjacency[source_id].append((record.weight, target_id))
+            if target_id != source_id:
+                adjacency[target_id].append((record.weight, source_id))
+        for neighbours in adjacency.values():
+            neighbours.sort(key=lambda item: (-item[0], item[1]))
+        self.adjacency = dict(adjacency)
+
+    @classmethod
+    def from_records(cls, records, pruning=None, engine='python', edge_workers=None, source=None, version=None):
+        """Index records and expand their edges the way process_records does"""
+
+        nodes, connection_index = etl.index_records(records)
+        return cls.from_index(nodes, connection_index, pruning, engine, edge_workers, source, version)
+
+    @classmethod
+    def from_index(cls, nodes, connection_index, pruning=None, engine='python', edge_workers=None, source=None,
+                   version=None):
+        pruning = pruning or {}
+        if pruning.get('max_bucket_size'):
+            etl.split_hub_buckets(connection_index, nodes, pruning['max_bucket_size'])
+        combined_edges = etl.combine_with_engine(connection_index, engine, edge_workers)
+        if pruning.get('min_weight'):
+            etl.prune_by_weight(combined_edges, pruning['min_weight'])
+        if pruning.get('top_k'):
+            etl.prune_to_top_k(combined_edges, pruning['top_k'])
+        return cls(nodes, connection_index, combined_edges, source, version)
+
+    def edge(self, source_id, target_id):
+        """The exported edge dict between two startups, or None"""
+
+        key = (source_id, target_id) if source_id <= target_id else (target_id, source_id)
+        record = self.edges.get(key)
+        return etl.edge_from_info(*key, self.edges.edge_info(record)) if record is not None else None
+
+    def node(self, startup):
+        node = self.nodes.get(startup)
+        if node is None:
+            raise QueryError(f"Unknown startup {startup!r}", status=404)
+        return node
+
+    def neighbours(self, startup, limit=None, min_weight=0):
+        """Neighbours of a startup by descending weight, each with the edge joining them"""
+
+        node = self.node(startup)
+        result = []
+        for weight, neighbour in self.adjacency.get(startup, ()):
+            if weight < min_weight or (limit is not None and len(result) >= limit):
+                break
+            result.append({'node': self.nodes.get(neighbour, {'id': neighbour}),
+                           'edge': self.edge(startup, neighbour)})
+        return {'node': node, 'degree': len(self.adjacency.get(startup, ())), 'neighbours': result}
+
+    def shares(self, conn_type, value):
+        """Startups with a connection value, in table order"""
+
+        if conn_type not in etl.TYPE_ATTRIBUTES:
+            raise QueryError(f"Unknown connection type {conn_type!r}, expected one of {etl.CONNECTION_TYPES}")
+        return {'type': conn_type, 'value': value, 'startups': self.members.get((conn_type, value), [])}
+
+    def subgraph(self, startups=(), values=(), min_weight=0):
+        """Nodes matching the filter set and every edge between them
+
+        The filter set is the named startups plus every startup sharing one of
+        values ((type, value) pairs). Edges are found through the selected nodes'
+        adjacency lists, so the cost follows the selection, not the graph.
+        """
+
+        selected = {}
+        for startup in startups:
+            selected[startup] = self.node(startup)
+        for conn_type, value in values:
+            for startup in self.shares(conn_type, value)['startups']:
+                selected.setdefault(startup, self.nodes.get(startup, {'id': startup}))
+
+        edges = []
+        for source_id in sorted(selected):
+            for weight, target_id in self.adjacency.get(source_id, ()):
+                if weight < min_weight:
+                    break
+                if target_id >= source_id and target_id in selected:
+                    edges.append(self.edge(source_id, target_id))
+        edges.sort(key=lambda edge: (edge['source'], edge['target']))
+        return {'nodes': list(selected.values()), 'edges': edges,
+                'metadata': {'total_nodes': len(selected), 'total_edges': len(edges)}}
+
+    def status(self):
+        return {'source': self.source, 'version': self.version, 'loaded_at': self.loaded_at,
+                'nodes': len(self.nodes), 'edges': len(self.edges), 'connection_values': len(self.members)}
+
+
+class ResponseCache:
+    """Thread-safe LRU of encoded responses, keyed by path and normalized query"""
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            body = self.entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        if self.size <= 0:
+            return
+        with self.lock:
+            self.entries[key] = body
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {'size': self.size, 'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class SnapshotSource:
+    """Where snapshots come from: the ETL's record cache file or its record store
+
+    version() is cheap and changes whenever the ETL writes a new snapshot, so
+    the service can poll it between requests.
+    """
+
+    def __init__(self, cache_file=etl.CACHE_FILE, store_file=None, pruning=None, engine='python',
+                 edge_workers=None):
+        self.cache_file = cache_file
+        self.store_file = store_file
+        self.pruning = pruning or {}
+        self.engine = engine
+        self.edge_workers = edge_workers
+
+    @property
+    def path(self):
+        return self.store_file or self.cache_file
+
+    def version(self):
+        try:
+            if self.store_file:
+                with RecordStore(self.store_file) as store:
+                    return store.meta().get('synced_at')
+            stat = os.stat(self.cache_file)
+        except OSError:
+            return None
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    def load(self):
+        """Build a GraphSnapshot from the current ETL output"""
+
+        version = self.version()
+        if self.store_file:
+            with RecordStore(self.store_file) as store:
+                nodes, connection_index = etl.index_record_store(store)
+            return GraphSnapshot.from_index(nodes, connection_index, self.pruning, self.engine, self.edge_workers,
+                                            self.path, version)
+
+        cache = etl.load_record_cache(self.cache_file)
+        if cache is None:
+            raise QueryError(f"No usable record cache at {self.cache_file}; run airtable_etl.py first", status=503)
+        return GraphSnapshot.from_records(cache['records'], self.pruning, self.engine, self.edge_workers,
+                                          self.path, version)
+
+
+def query_list(query, name):
+    return [value for value in query.get(name, []) if value]
+
+
+def query_one(query, name, required=True):
+    values = query_list(query, name)
+    if not values:
+        if required:
+            raise QueryError(f"Missing query parameter {name!r}")
+        return None
+    return values[0]
+
+
+def query_int(query, name, default=None):
+    value = query_one(query, name, required=False)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise QueryError(f"Query parameter {name!r} must be an integer, got {value!r}") from None
+
+
+def parse_value_filter(spec):
+    """'region: Europe' or 'region:Europe' -> ('region', 'Europe')"""
+
+    conn_type, separator, value = spec.partition(':')
+    if not separator:
+        raise QueryError(f"Value filter {spec!r} must look like TYPE:VALUE")
+    return conn_type.strip(), value.strip()
+
+
+class GraphService(ThreadingHTTPServer):
+    """HTTP server answering graph queries from the current GraphSnapshot
+
+    Reloads swap in a whole new snapshot and clear the response cache, so a
+    request always sees one consistent snapshot. Requests keep being served
+    from the previous snapshot while a reload builds the next one, and after
+    it if the reload fails (see reload_error).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, source, host='127.0.0.1', port=DEFAULT_PORT, cache_size=CACHE_SIZE,
+                 reload_interval=RELOAD_CHECK_INTERVAL):
+        super().__init__((host, port), GraphRequestHandler)
+        self.source = source
+        self.cache = ResponseCache(cache_size)
+        self.reload_interval = reload_interval
+        self.reload_lock = threading.Lock()
+        self.last_check = time.monotonic()
+        self.snapshot = None
+        self.generation = 0
+        self.reload_error = None
+        self.reload()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reload(self):
+        """Build a snapshot from the source and swap it in, returning it
+
+        If the load fails, the current snapshot stays in place and the error
+        is kept in reload_error, with the source version it failed on, until
+        a reload succeeds.
+        """
+
+        with self.reload_lock:
+            started = time.perf_counter()
+            try:
+                snapshot = self.source.load()
+            except Exception as e:
+                self.reload_error = {'error': str(e) or type(e).__name__, 'version': self.source.version(),
+                                     'failed_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}
+                raise
+            self.snapshot = snapshot
+            self.generation += 1
+            self.reload_error = None
+            self.cache.clear()
+        print(f"🔄 Loaded {len(snapshot.nodes)} nodes and {len(snapshot.edges)} edges from {snapshot.source} "
+              f"in {time.perf_counter() - started:.1f}s", flush=True)
+        return snapshot
+
+    def reload_if_changed(self):
+        """Reload when the source has a newer snapshot, checking at most every reload_interval seconds
+
+        Never raises: a failed reload is logged and reported by /status, and
+        is not retried until the source version changes again.
+        """
+
+        if self.reload_interval is None or time.monotonic() - self.last_check < self.reload_interval:
+            return
+        self.last_check = time.monotonic()
+        if self.reload_lock.locked():
+            return
+        try:
+            version = self.source.version()
+            if version is None or version == self.snapshot.version:
+                return
+            if self.reload_error and self.reload_error['version'] == version:
+                return
+            self.reload()
+        except Exception as e:
+            print(f"⚠️  Reload failed, still serving {self.snapshot.version}: {e}", flush=True)
+
+    def answer(self, snapshot, path, query):
+        """JSON-ready response for a GET path and parsed query"""
+
+        if path == '/neighbours':
+            return snapshot.neighbours(query_one(query, 'id'), limit=query_int(query, 'limit'),
+                                       min_weight=query_int(query, 'min_weight', 0))
+        if path == '/shares':
+            return snapshot.shares(query_one(query, 'type'), query_one(query, 'value'))
+        if path == '/subgraph':
+            startups = query_list(query, 'id')
+            values = [parse_value_filter(spec) for spec in query_list(query, 'value')]
+            if not startups and not values:
+                raise QueryError("Give at least one id or value filter")
+            return snapshot.subgraph(startups, values, min_weight=query_int(query, 'min_weight', 0))
+        if path == '/status':
+            return {**snapshot.status(), 'cache': self.cache.stats(), 'reload_error': self.reload_error}
+        raise QueryError(f"Unknown path {path!r}", status=404)
+
+    def respond(self, path, query):
+        """(status, encoded body) for a GET request, served from the LRU cache when possible"""
+
+        self.reload_if_changed()
+        # A response built from a snapshot that was just replaced must not outlive it
+        snapshot, generation = self.snapshot, self.generation
+        key = (generation, path, tuple(sorted((name, tuple(values)) for name, values in query.items())))
+        cacheable = path != '/status'
+        body = self.cache.get(key) if cacheable else None
+        if body is not None:
+            return 200, body
+        try:
+            body = json.dumps(self.answer(snapshot, path, query), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        except QueryError as e:
+            return e.status, json.dumps({'error': str(e)}).encode('utf-8')
+        if cacheable:
+            self.cache.put(key, body)
+        return 200, body
+
+
+class GraphRequestHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        # The Airtable dashboard runs on another origin
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.send_body(*self.server.respond(url.path.rstrip('/') or '/', parse_qs(url.query)))
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip('/') != '/reload':
+            self.send_body(404, json.dumps({'error': f"Unknown path {self.path!r}"}).encode('utf-8'))
+            return
+        try:
+            snapshot = self.server.reload()
+        except Exception as e:
+            status = e.status if isinstance(e, QueryError) else 500
+            self.send_body(status, json.dumps(self.server.reload_error).encode('utf-8'))
+            return
+        self.send_body(200, json.dumps(snapshot.status(), ensure_ascii=False).encode('utf-8'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve graph queries over the latest ETL snapshot")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"(default: {DEFAULT_PORT})")
+    parser.add_argument('--cache-file', default=etl.CACHE_FILE,
+                        help=f"ETL record cache to serve (default: {etl.CACHE_FILE})")
+    parser.add_argument('--store', nargs='?', const=etl.STORE_FILE, default=None, metavar='FILE',
+                        help=f"serve the SQLite record store instead (default file: {etl.STORE_FILE})")
+    parser.add_argument('--engine', choices=etl.EDGE_ENGINES, default='python',
+                        help="edge construction engine (default: python)")
+    parser.add_argument('--edge-workers', type=int, default=None,
+                        help="processes for --engine parallel (default: all cores)")
+    parser.add_argument('--max-bucket-size', action='append', default=[], metavar='[TYPE=]N',
+                        help="as for airtable_etl.py: oversized buckets become node attributes")
+    parser.add_argument('--min-weight', type=int, default=0,
+                        help="drop edges with fewer shared connections than this")
+    parser.add_argument('--top-k', type=int, default=0,
+                        help="keep only each node's K strongest edges")
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE,
+                        help=f"responses kept in the LRU cache (default: {CACHE_SIZE})")
+    parser.add_argument('--no-auto-reload', action='store_true',
+                        help="only reload on POST /reload, not when the source changes")
+    args = parser.parse_args(argv)
+
+    pruning = {
+        'max_bucket_size': etl.parse_bucket_limits(args.max_bucket_size),
+        'min_weight': args.min_weight,
+        'top_k': args.top_k,
+    }
+    source = SnapshotSource(args.cache_file, args.store, pruning, args.engine, args.edge_workers)
+    try:
+        server = GraphService(source, args.host, args.port, args.cache_size,
+                              reload_interval=None if args.no_auto_reload else RELOAD_CHECK_INTERVAL)
+    except QueryError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+
+    print(f"🌐 Graph query service on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
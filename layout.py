@@ -0,0 +1,258 @@
+"""
+Offline Graph Layout
+Vectorized ForceAtlas2 with a Barnes-Hut style approximation, so the ETL can ship
+node positions instead of every viewer running the layout in the browser
+"""
+
+import numpy as np
+
+# Same defaults as the viewer's Layout Settings panel
+GRAVITY = 2.0
+SCALING_RATIO = 10.0
+STRONG_GRAVITY = True
+EDGE_WEIGHT_INFLUENCE = 1.0
+LIN_LOG = False
+
+# Iteration caps; the layout usually stops earlier once it has settled
+COLD_ITERATIONS = 300
+WARM_ITERATIONS = 100
+# Settled: the mean node displacement of an iteration is below this fraction of
+# the layout span, checked once the speed has had MIN_ITERATIONS to adapt
+CONVERGENCE_TOLERANCE = 1e-3
+MIN_ITERATIONS = 20
+# Warm starts are already near equilibrium, so their speed ramps up from here
+# instead of flinging every node on the first iteration
+WARM_START_SPEED = 0.01
+
+# Below this many nodes the exact O(n²) repulsion is cheap enough
+BARNES_HUT_MIN_NODES = 300
+MAX_GRID_LEVEL = 12
+
+# Node speed constants from the ForceAtlas2 paper (Jacomy et al., 2014)
+NODE_SPEED = 0.1
+MAX_NODE_DISPLACEMENT = 10.0
+JITTER_TOLERANCE = 1.0
+
+
+def _scatter(index, values, n):
+    """Sum 2-column values into n rows by index"""
+    return np.column_stack([
+        np.bincount(index, weights=values[:, 0], minlength=n),
+        np.bincount(index, weights=values[:, 1], minlength=n),
+    ])
+
+
+def _pair_repulsion(positions, mass, i, j, scaling_ratio):
+    """Repulsion on nodes i from nodes j (or cell centres of mass j given as arrays)"""
+    delta = positions[i] - j[0]
+    distance2 = np.einsum('ij,ij->i', delta, delta)
+    # Coincident points push apart along a fixed direction instead of dividing by zero
+    coincident = distance2 < 1e-12
+    if coincident.any():
+        delta[coincident] = (1e-3, 0.0)
+        distance2[coincident] = 1e-6
+    factor = scaling_ratio * mass[i] * j[1] / distance2
+    return delta * factor[:, None]
+
+
+def _repulsion_exact(positions, mass, scaling_ratio, chunk=512):
+    """Exact pairwise repulsion, in row chunks to bound memory"""
+    n = len(positions)
+    force = np.zeros_like(positions)
+    for start in range(0, n, chunk):
+        stop = min(n, start + chunk)
+        delta = positions[start:stop, None, :] - positions[None, :, :]
+        distance2 = np.einsum('ijk,ijk->ij', delta, delta)
+        distance2[np.arange(stop - start), np.arange(start, stop)] = np.inf
+        distance2[distance2 < 1e-12] = 1e-6
+        factor = scaling_ratio * mass[start:stop, None] * mass[None, :] / distance2
+        force[start:stop] = np.einsum('ijk,ij->ik', delta, factor)
+    return force
+
+
+def _repulsion_barnes_hut(positions, mass, scaling_ratio):
+    """Approximate repulsion on a quadtree laid out as a stack of regular grids
+
+    At every level each node interacts with the centres of mass of the cells
+    that are children of its parent's neighbours but not its own neighbours,
+    i.e. cells at least one cell width away. Whatever is still adjacent at the
+    finest level is computed exactly. Each level is a handful of array
+    operations over all nodes, so the cost is O(n log n) with no Python loop
+    over nodes.
+    """
+
+    n = len(positions)
+    levels = int(min(MAX_GRID_LEVEL, max(2, np.ceil(np.log(n) / np.log(4)))))
+    lower = positions.min(axis=0)
+    span = max(float(np.ptp(positions, axis=0).max()), 1e-9) * (1 + 1e-9)
+    unit = (positions - lower) / span
+
+    force = np.zeros_like(positions)
+    window = np.arange(6)
+
+    for level in range(2, levels + 1):
+        size = 2 ** level
+        cell = np.minimum((unit * size).astype(np.int64), size - 1)
+        flat = cell[:, 0] * size + cell[:, 1]
+
+        cell_mass = np.bincount(flat, weights=mass, minlength=size * size)
+        weighted = _scatter(flat, positions * mass[:, None], size * size)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            centre = weighted / cell_mass[:, None]
+
+        # The 6 x 6 children of the parent's 3 x 3 neighbourhood
+        xs = (cell[:, 0] // 2 * 2 - 2)[:, None] + window[None, :]
+        ys = (cell[:, 1] // 2 * 2 - 2)[:, None] + window[None, :]
+        cx = np.repeat(xs, 6, axis=1)
+        cy = np.tile(ys, (1, 6))
+        far = (np.abs(cx - cell[:, 0:1]) > 1) | (np.abs(cy - cell[:, 1:2]) > 1)
+        valid = far & (cx >= 0) & (cx < size) & (cy >= 0) & (cy < size)
+
+        node, slot = np.nonzero(valid)
+        target = cx[node, slot] * size + cy[node, slot]
+        occupied = cell_mass[target] > 0
+        node, target = node[occupied], target[occupied]
+        force += _scatter(node, _pair_repulsion(positions, mass, node, (centre[target], cell_mass[target]),
+                                                scaling_ratio), n)
+
+    # Near field: exact interactions with nodes in the 3 x 3 neighbourhood at the finest level
+    size = 2 ** levels
+    cell = np.minimum((unit * size).astype(np.int64), size - 1)
+    flat = cell[:, 0] * size + cell[:, 1]
+    order = np.argsort(flat, kind='stable')
+    counts = np.bincount(flat, minlength=size * size)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            nx, ny = cell[:, 0] + dx, cell[:, 1] + dy
+            inside = (nx >= 0) & (nx < size) & (ny >= 0) & (ny < size)
+            nodes = np.flatnonzero(inside)
+            neighbour_cell = nx[inside] * size + ny[inside]
+            per_node = counts[neighbour_cell]
+            if per_node.sum() == 0:
+                continue
+            i = np.repeat(nodes, per_node)
+            offset = np.arange(per_node.sum()) - np.repeat(np.cumsum(per_node) - per_node, per_node)
+            j = order[np.repeat(starts[neighbour_cell], per_node) + offset]
+            distinct = i != j
+            i, j = i[distinct], j[distinct]
+            force += _scatter(i, _pair_repulsion(positions, mass, i, (positions[j], mass[j]), scaling_ratio), n)
+
+    return force
+
+
+def forceatlas2(n, sources, targets, weights, positions=None, iterations=COLD_ITERATIONS,
+                gravity=GRAVITY, scaling_ratio=SCALING_RATIO, strong_gravity=STRONG_GRAVITY,
+                edge_weight_influence=EDGE_WEIGHT_INFLUENCE, lin_log=LIN_LOG, barnes_hut=None, seed=0,
+                tolerance=CONVERGENCE_TOLERANCE):
+    """Run ForceAtlas2 on n nodes and the given edge arrays
+
+    Returns ((n, 2) positions, iterations run). positions warm-starts the
+    layout (rows may be NaN for nodes without a previous position; they start
+    near their placed neighbours) at WARM_START_SPEED. iterations is a cap: the
+    layout stops once it has settled (see CONVERGENCE_TOLERANCE). barnes_hut
+    defaults to on for graphs of BARNES_HUT_MIN_NODES nodes or more. Speed is
+    adapted per node from swinging and traction as in the ForceAtlas2 paper,
+    and the random start is seeded so repeated runs give the same layout.
+    """
+
+    rng = np.random.default_rng(seed)
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.float64)
+    loops = sources == targets
+    sources, targets, weights = sources[~loops], targets[~loops], weights[~loops]
+
+    if n == 0:
+        return np.zeros((0, 2)), 0
+    warm = positions is not None and not np.isnan(np.asarray(positions, dtype=np.float64)).all()
+    positions = initial_positions(n, sources, targets, positions, rng)
+    if barnes_hut is None:
+        barnes_hut = n >= BARNES_HUT_MIN_NODES
+
+    degree = np.bincount(sources, minlength=n) + np.bincount(targets, minlength=n)
+    mass = degree + 1.0
+    edge_factor = weights ** edge_weight_influence
+
+    previous_force = np.zeros_like(positions)
+    speed = WARM_START_SPEED if warm else 1.0
+
+    for iteration in range(1, iterations + 1):
+        # Repulsion
+        if barnes_hut:
+            force = _repulsion_barnes_hut(positions, mass, scaling_ratio)
+        else:
+            force = _repulsion_exact(positions, mass, scaling_ratio)
+
+        # Gravity towards the origin
+        if strong_gravity:
+            force -= gravity * mass[:, None] * positions
+        else:
+            distance = np.linalg.norm(positions, axis=1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                pull = np.where(distance > 0, gravity * mass / distance, 0.0)
+            force -= pull[:, None] * positions
+
+        # Attraction along edges
+        if len(sources):
+            delta = positions[sources] - positions[targets]
+            if lin_log:
+                distance = np.linalg.norm(delta, axis=1)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    scale = np.where(distance > 0, np.log1p(distance) / distance, 0.0)
+                pull = delta * (edge_factor * scale)[:, None]
+            else:
+                pull = delta * edge_factor[:, None]
+            force -= _scatter(sources, pull, n)
+            force += _scatter(targets, pull, n)
+
+        # Adaptive speed
+        swinging = mass * np.linalg.norm(force - previous_force, axis=1)
+        traction = mass * np.linalg.norm(force + previous_force, axis=1) / 2
+        total_swinging = swinging.sum()
+        if total_swinging > 0:
+            target_speed = JITTER_TOLERANCE * traction.sum() / total_swinging
+            speed = min(target_speed, speed * 1.5)
+        node_speed = NODE_SPEED * speed / (1 + speed * np.sqrt(swinging))
+        magnitude = np.linalg.norm(force, axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            node_speed = np.minimum(node_speed, np.where(magnitude > 0, MAX_NODE_DISPLACEMENT / magnitude, np.inf))
+
+        step = force * node_speed[:, None]
+        positions = positions + step
+        previous_force = force
+
+        if iteration >= MIN_ITERATIONS:
+            span = max(float(np.ptp(positions, axis=0).max()), 1e-9)
+            if np.linalg.norm(step, axis=1).mean() < tolerance * span:
+                break
+
+    return positions, iteration
+
+
+def initial_positions(n, sources, targets, positions, rng):
+    """Start from previous positions where known, near placed neighbours otherwise"""
+
+    if positions is None:
+        return rng.uniform(0, 100, size=(n, 2))
+
+    positions = np.array(positions, dtype=np.float64)
+    missing = np.isnan(positions).any(axis=1)
+    if missing.all():
+        return rng.uniform(0, 100, size=(n, 2))
+
+    placed = positions[~missing]
+    spread = max(float(np.ptp(placed, axis=0).max()), 1.0) * 0.01
+
+    # Mean of placed neighbours, falling back to the centre of the layout
+    ends = np.concatenate([sources, targets])
+    others = np.concatenate([targets, sources])
+    usable = missing[ends] & ~missing[others]
+    counts = np.bincount(ends[usable], minlength=n)
+    sums = _scatter(ends[usable], positions[others[usable]], n)
+    fallback = placed.mean(axis=0)
+    for row in np.flatnonzero(missing):
+        anchor = sums[row] / counts[row] if counts[row] else fallback
+        positions[row] = anchor + rng.normal(0, spread, size=2)
+    return positions
@@ -0,0 +1,219 @@
+"""
+Logo Atlas
+Downloads startup logos concurrently into a thumbnail cache keyed by Airtable
+attachment ID and packs the thumbnails into a few sprite atlases, so the viewer
+loads every logo in a couple of requests and expired attachment URLs no longer
+break nodes
+
+Needs Pillow (pip install pillow) to decode and resize images.
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+LOGO_CACHE_DIR = 'logo_cache'
+LOGO_DIR = 'logos'
+THUMB_SIZE = 64
+# 32 × 32 cells of 64px keep each atlas at 2048px, within every browser's texture limit
+ATLAS_CELLS = 32
+DOWNLOAD_WORKERS = 8
+DOWNLOAD_TIMEOUT = 30
+# Atlas slot of every packed logo, kept next to the thumbnails it indexes
+SLOTS_FILE = 'slots.json'
+
+
+def record_logo(fields):
+    """(attachment id, download URL) of a record's first logo, or None
+
+    Airtable's large thumbnail is preferred over the original upload, which
+    can be many megabytes. Attachment ids never change for the same upload,
+    which makes them the cache key; URLs are signed afresh on every request.
+    """
+
+    attachments = fields.get('Logo') or []
+    if not attachments:
+        return None
+    logo = attachments[0]
+    url = ((logo.get('thumbnails') or {}).get('large') or {}).get('url') or logo.get('url')
+    if not url:
+        return None
+    key = logo.get('id') or 'url' + hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]
+    return key, url
+
+
+def thumbnail(data, size=THUMB_SIZE):
+    """Decode image bytes and fit them into a transparent size × size square"""
+
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert('RGBA')
+        image.thumbnail((size, size), Image.LANCZOS)
+    cell = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+    cell.paste(image, ((size - image.width) // 2, (size - image.height) // 2))
+    return cell
+
+
+class LogoCache:
+    """Thumbnails on disk, one PNG per attachment id and thumbnail size"""
+
+    def __init__(self, cache_dir=LOGO_CACHE_DIR, size=THUMB_SIZE):
+        self.size = size
+        self.dir = os.path.join(cache_dir, f'{size}px')
+        os.makedirs(self.dir, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.dir, f'{key}.png')
+
+    def __contains__(self, key):
+        return os.path.exists(self.path(key))
+
+    def load(self, key):
+        from PIL import Image
+
+        with Image.open(self.path(key)) as image:
+            return image.convert('RGBA')
+
+    def save(self, key, image):
+        """Write atomically, so an interrupted run never leaves a truncated thumbnail"""
+
+        tmp_file = f'{self.path(key)}.{threading.get_ident()}.tmp'
+        image.save(tmp_file, format='PNG')
+        os.replace(tmp_file, self.path(key))
+
+    def load_slots(self):
+        """{key: atlas slot} of the last packing, empty if there is none"""
+
+        try:
+            with open(os.path.join(self.dir, SLOTS_FILE), 'r', encoding='utf-8') as f:
+                slots = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return {key: slot for key, slot in slots.items() if isinstance(slot, int) and slot >= 0}
+
+    def save_slots(self, slots):
+        path = os.path.join(self.dir, SLOTS_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(slots, f, sort_keys=True)
+        os.replace(path + '.tmp', path)
+
+
+def assign_slots(keys, previous):
+    """{key: slot} keeping every key's slot from previous, {key: slot}
+
+    Slots of keys that are gone are freed; new keys take the lowest free slots
+    in sorted order. Slot s is cell s % cells² of atlas s // cells².
+    """
+
+    slots = {key: previous[key] for key in keys if key in previous}
+    taken = set(slots.values())
+    free = (slot for slot in range(len(keys) + len(taken)) if slot not in taken)
+    for key in sorted(set(keys) - set(slots)):
+        slots[key] = next(free)
+    return slots
+
+
+def download_logos(logos, cache, workers=DOWNLOAD_WORKERS, timeout=DOWNLOAD_TIMEOUT):
+    """Download and cache the thumbnails of {key: url} not cached yet
+
+    Runs on a thread pool sharing one keep-alive session. A logo that fails
+    to download or decode is left out and tried again on the next run.
+    Returns (downloaded, failed, downloaded bytes).
+    """
+
+    missing = sorted(key for key in logos if key not in cache)
+    if not missing:
+        return 0, 0, 0
+
+    session = requests.Session()
+    session.mount('http://', HTTPAdapter(pool_connections=workers, pool_maxsize=workers))
+    session.mount('https://', HTTPAdapter(pool_connections=workers, pool_maxsize=workers))
+
+    def fetch(key):
+        try:
+            response = session.get(logos[key], timeout=timeout)
+            response.raise_for_status()
+            cache.save(key, thumbnail(response.content, cache.size))
+        except (requests.exceptions.RequestException, OSError, ValueError) as e:
+            print(f"   ⚠️  Logo {key}: {e}")
+            return None
+        return len(response.content)
+
+    with session, ThreadPoolExecutor(max_workers=workers) as executor:
+        sizes = list(executor.map(fetch, missing))
+    downloaded = [size for size in sizes if size is not None]
+    return len(downloaded), len(missing) - len(downloaded), sum(downloaded)
+
+
+def pack_atlases(keys, cache, output_dir=LOGO_DIR, cells=ATLAS_CELLS):
+    """Paste cached thumbnails into atlas-N.png grids of cells × cells
+
+    Each logo keeps the slot it had in the last packing (see assign_slots and
+    LogoCache.load_slots), so adding or removing a logo leaves every other
+    sprite, and the atlases without a changed slot, as they were. Atlases
+    left over from a larger earlier run are removed.
+    Returns (atlas file paths, {key: [atlas, x, y]}).
+    """
+
+    from PIL import Image
+
+    size = cache.size
+    per_atlas = cells * cells
+    slots = assign_slots(keys, cache.load_slots())
+    os.makedirs(output_dir, exist_ok=True)
+
+    by_atlas = [[] for _ in range(max(slots.values()) // per_atlas + 1)] if slots else []
+    for key, slot in slots.items():
+        by_atlas[slot // per_atlas].append((slot % per_atlas, key))
+
+    files = []
+    sprites = {}
+    for atlas, cells_used in enumerate(by_atlas):
+        last = max((cell for cell, _ in cells_used), default=0)
+        columns = cells if last >= cells else last + 1
+        sheet = Image.new('RGBA', (columns * size, (last // cells + 1) * size), (0, 0, 0, 0))
+        for cell, key in sorted(cells_used):
+            x, y = (cell % cells) * size, (cell // cells) * size
+            sheet.paste(cache.load(key), (x, y))
+            sprites[key] = [atlas, x, y]
+        path = os.path.join(output_dir, f'atlas-{atlas}.png')
+        tmp_file = path + '.tmp'
+        sheet.save(tmp_file, format='PNG', optimize=True)
+        os.replace(tmp_file, path)
+        files.append(path)
+
+    for name in os.listdir(output_dir):
+        if name.startswith('atlas-') and name.endswith('.png') and os.path.join(output_dir, name) not in files:
+            os.remove(os.path.join(output_dir, name))
+    cache.save_slots(slots)
+    return files, sprites
+
+
+def build_logo_atlas(logos, output_dir=LOGO_DIR, cache_dir=LOGO_CACHE_DIR, size=THUMB_SIZE,
+                     workers=DOWNLOAD_WORKERS):
+    """Download missing logos of {key: url} and pack every cached one into atlases
+
+    Returns (atlas metadata for the export, {key: [atlas, x, y]}, stats).
+    """
+
+    cache = LogoCache(cache_dir, size)
+    downloaded, failed, downloaded_bytes = download_logos(logos, cache, workers)
+    files, sprites = pack_atlases([key for key in logos if key in cache], cache, output_dir)
+    atlas = {'size': size, 'files': [path.replace(os.sep, '/') for path in files]}
+    stats = {
+        'logos': len(logos),
+        'cached': len(logos) - downloaded - failed,
+        'downloaded': downloaded,
+        'failed': failed,
+        'downloaded_bytes': downloaded_bytes,
+        'atlases': len(files),
+        'atlas_bytes': sum(os.path.getsize(path) for path in files),
+    }
+    return atlas, sprites, stats
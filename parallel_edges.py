@@ -0,0 +1,142 @@
+"""
+Parallel Edge Engine
+Expands connection buckets into startup pairs on a process pool: buckets are
+balanced across workers by pair count, each worker returns a compact partial
+accumulator (pair codes with the buckets that produced them) and a reduce step
+merges the partials in the order the serial expansion produces
+"""
+
+import gc
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from edge_accumulator import VALUE_ID_TYPECODE, EdgeRecord
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def bucket_pairs(size):
+    return size * (size - 1) // 2
+
+
+def balance_buckets(sizes, workers):
+    """Split bucket positions into at most `workers` lists of similar total pair count
+
+    Largest buckets are placed first, each on the currently lightest worker
+    (longest-processing-time first), so one giant bucket does not leave the
+    other workers idle behind a share of equal bucket counts. Each list is
+    returned in bucket order.
+    """
+
+    loads = [0] * workers
+    shares = [[] for _ in range(workers)]
+    for position in sorted(range(len(sizes)), key=lambda i: -bucket_pairs(sizes[i])):
+        lightest = min(range(workers), key=loads.__getitem__)
+        shares[lightest].append(position)
+        loads[lightest] += bucket_pairs(sizes[position])
+    return [sorted(share) for share in shares if share]
+
+
+def expand_buckets(buckets, n):
+    """Worker: every pair of each (position, sorted member ids) bucket
+
+    Returns the partial accumulator as two arrays sorted by pair: pair codes
+    (source * n + target, source <= target) and the bucket position that
+    produced each occurrence, so a pair's weight is its number of occurrences.
+    """
+
+    codes = []
+    positions = []
+    for position, members in buckets:
+        sources, targets = np.triu_indices(len(members), 1)
+        codes.append(members[sources] * n + members[targets])
+        positions.append(np.full(len(sources), position, dtype=np.int64))
+    if not codes:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    codes = np.concatenate(codes)
+    positions = np.concatenate(positions)
+    # Buckets arrive in position order, so a stable sort keeps each pair's positions ascending
+    order = np.argsort(codes, kind='stable')
+    return codes[order], positions[order]
+
+
+def merge_partials(partials):
+    """Reduce step: (pair codes, weights, bucket positions per pair) in serial expansion order
+
+    The serial engine meets pairs bucket by bucket, and within a bucket in name
+    order, so pairs are ordered by their first bucket, then by code.
+    """
+
+    codes = np.concatenate([codes for codes, _ in partials])
+    positions = np.concatenate([positions for _, positions in partials])
+    order = np.lexsort((positions, codes))
+    codes, positions = codes[order], positions[order]
+
+    unique_codes, starts = np.unique(codes, return_index=True)
+    ends = np.append(starts[1:], len(codes))
+    weights = ends - starts
+    first = positions[starts]
+
+    pair_order = np.lexsort((unique_codes, first))
+    return unique_codes[pair_order], weights[pair_order], starts[pair_order], ends[pair_order], positions
+
+
+def combine_parallel(connection_index, combined_edges, workers=None):
+    """Parallel equivalent of the ETL's combine_edges
+
+    Fills combined_edges, an empty edge_accumulator.CompactEdges over
+    connection_index, with the same records in the same order as the serial
+    expansion and returns it.
+    """
+
+    workers = workers or default_workers()
+
+    # The accumulator interns names in sorted order, so code order is (source, target) name order
+    ids = combined_edges.name_ids
+    n = len(combined_edges.names)
+
+    buckets = [(position, np.array(sorted(ids[name] for name in members), dtype=np.int64))
+               for position, members in enumerate(connection_index.values()) if len(members) >= 2]
+    shares = balance_buckets([len(members) for _, members in buckets], workers)
+
+    if len(shares) <= 1:
+        partials = [expand_buckets(buckets, n)]
+    else:
+        with ProcessPoolExecutor(max_workers=len(shares)) as executor:
+            futures = [executor.submit(expand_buckets, [buckets[i] for i in share], n) for share in shares]
+            partials = [future.result() for future in futures]
+
+    codes, weights, starts, ends, positions = merge_partials(partials)
+    positions = positions.tolist()
+
+    # Bucket positions are the accumulator's value ids. Many pairs share exactly
+    # the same buckets, so each distinct bucket list is encoded once and its
+    # value array shared by every such pair
+    type_bits = [combined_edges.type_bits[conn_type] for conn_type, _ in combined_edges.value_keys]
+    templates = {}
+    records = combined_edges.records
+    # Records hold only ints and arrays, so they cannot form cycles, yet
+    # collector passes over millions of new objects would dominate the build
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for code, weight, start, end in zip(codes.tolist(), weights.tolist(), starts.tolist(), ends.tolist()):
+            shared = tuple(dict.fromkeys(positions[start:end]))
+            template = templates.get(shared)
+            if template is None:
+                type_mask = 0
+                for position in shared:
+                    type_mask |= type_bits[position]
+                template = templates[shared] = (type_mask, array(VALUE_ID_TYPECODE, shared))
+
+            records[code] = EdgeRecord(weight, *template)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return combined_edges
@@ -0,0 +1,273 @@
+"""
+Record Store
+Local SQLite copy of the Airtable table: one row per record plus a normalized
+(record, type, value) connection table, so the ETL can rebuild its connection
+index offline and ad-hoc questions like "who shares X" are a single query
+
+Run `python record_store.py --help` for the query commands.
+"""
+
+import argparse
+import json
+import sqlite3
+from collections import defaultdict
+
+STORE_FILE = 'record_store.db'
+SCHEMA_VERSION = 1
+# Connection ordinals within one record stay below this, so position * ORDINAL_SPAN
+# + ordinal orders every connection row by record order, then field order
+ORDINAL_SPAN = 1 << 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS records (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    startup TEXT NOT NULL,
+    created_time TEXT,
+    modified_time TEXT NOT NULL,
+    fields TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_by_position ON records (position);
+CREATE INDEX IF NOT EXISTS records_by_startup ON records (startup);
+CREATE TABLE IF NOT EXISTS connections (
+    record_id TEXT NOT NULL REFERENCES records (id) ON DELETE CASCADE,
+    ordinal INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (record_id, ordinal)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS connections_by_value ON connections (type, value);
+"""
+
+
+def stable_fields(fields):
+    """fields with attachments reduced to their ids
+
+    Airtable signs attachment (and thumbnail) URLs afresh on every request, so
+    only the attachment ids tell whether a record's files changed.
+    """
+
+    return {
+        name: [item['id'] for item in value]
+        if isinstance(value, list) and value
+        and all(isinstance(item, dict) and 'id' in item and 'url' in item for item in value)
+        else value
+        for name, value in fields.items()
+    }
+
+
+class RecordStore:
+    """SQLite store of raw records and their connection values
+
+    The store does not know Airtable's field names: sync() takes each record
+    with its startup name and (type, value) connections already extracted (see
+    airtable_etl.record_entries). modified_time is when the store first saw the
+    record's current fields, since Airtable does not return modification times.
+    """
+
+    def __init__(self, path=STORE_FILE):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA foreign_keys = ON')
+        self.db.execute('PRAGMA journal_mode = WAL')
+        version = self.db.execute('PRAGMA user_version').fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            raise ValueError(f"{path} has schema version {version}, expected {SCHEMA_VERSION}")
+        with self.db:
+            self.db.executescript(SCHEMA)
+            self.db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def meta(self):
+        """Sync metadata as a dict (base_id, table_id, synced_at)"""
+        return dict(self.db.execute('SELECT key, value FROM meta'))
+
+    def sync(self, entries, synced_at, meta=None):
+        """Make the store hold exactly these records, in this order
+
+        entries yields (record, startup, connections) with connections a list
+        of (type, value). Records whose fields are unchanged (attachments
+        compared by id, see stable_fields) only get their position and fields
+        updated, which keeps attachment URLs fresh; changed ones are rewritten
+        with modified_time set to synced_at, and records not in entries are
+        deleted. Runs as one
+        transaction, so a failed sync leaves the previous contents.
+        Returns (added, changed, deleted).
+        """
+
+        stored = dict(self.db.execute('SELECT id, fields FROM records'))
+        seen = set()
+        added = changed = 0
+        with self.db:
+            for position, (record, startup, connections) in enumerate(entries):
+                record_id = record['id']
+                seen.add(record_id)
+                raw_fields = record.get('fields', {})
+                fields = json.dumps(raw_fields, ensure_ascii=False)
+                previous = stored.get(record_id)
+                if previous == fields:
+                    self.db.execute('UPDATE records SET position = ? WHERE id = ?', (position, record_id))
+                    continue
+                if previous is not None and stable_fields(json.loads(previous)) == stable_fields(raw_fields):
+                    self.db.execute('UPDATE records SET position = ?, fields = ? WHERE id = ?',
+                                    (position, fields, record_id))
+                    continue
+
+                if record_id in stored:
+                    changed += 1
+                    self.db.execute('DELETE FROM records WHERE id = ?', (record_id,))
+                else:
+                    added += 1
+                self.db.execute(
+                    'INSERT INTO records (id, position, startup, created_time, modified_time, fields) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (record_id, position, startup, record.get('createdTime'), synced_at, fields))
+                self.db.executemany(
+                    'INSERT INTO connections (record_id, ordinal, type, value) VALUES (?, ?, ?, ?)',
+                    [(record_id, ordinal, conn_type, value)
+                     for ordinal, (conn_type, value) in enumerate(connections)])
+
+            deleted = [(record_id,) for record_id in stored if record_id not in seen]
+            self.db.executemany('DELETE FROM records WHERE id = ?', deleted)
+            self.db.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                                [('synced_at', synced_at), *(meta or {}).items()])
+        return added, changed, len(deleted)
+
+    def records(self, limit=None):
+        """Yield the stored records in table order, shaped like Airtable's list results"""
+
+        query = 'SELECT id, created_time, fields FROM records ORDER BY position'
+        params = ()
+        if limit is not None:
+            query += ' LIMIT ?'
+            params = (limit,)
+        for record_id, created_time, fields in self.db.execute(query, params):
+            yield {'id': record_id, 'createdTime': created_time, 'fields': json.loads(fields)}
+
+    def count(self):
+        return self.db.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+
+    def connection_index(self):
+        """{(type, value): [startup, ...]} built by the database
+
+        Rows are grouped by (type, value) and ordered by each group's first
+        appearance, then by record and field order, so keys and members come
+        out in the same order as indexing the records one by one.
+        """
+
+        rows = self.db.execute(f"""
+            SELECT c.type, c.value, r.startup,
+                   MIN(r.position * {ORDINAL_SPAN} + c.ordinal) OVER (PARTITION BY c.type, c.value) AS first_seen
+            FROM connections c JOIN records r ON r.id = c.record_id
+            ORDER BY first_seen, r.position, c.ordinal
+        """)
+        connection_index = defaultdict(list)
+        for conn_type, value, startup, _ in rows:
+            connection_index[(conn_type, value)].append(startup)
+        return connection_index
+
+    def shared(self, conn_type, value):
+        """Startups with this connection value, in table order"""
+        rows = self.db.execute("""
+            SELECT DISTINCT r.startup FROM connections c JOIN records r ON r.id = c.record_id
+            WHERE c.type = ? AND c.value = ?
+            ORDER BY r.position
+        """, (conn_type, value))
+        return [startup for startup, in rows]
+
+    def bucket_sizes(self, conn_type=None, limit=None):
+        """(type, value, startups) for each connection value, largest first"""
+
+        query = 'SELECT type, value, COUNT(DISTINCT record_id) AS size FROM connections'
+        params = []
+        if conn_type:
+            query += ' WHERE type = ?'
+            params.append(conn_type)
+        query += ' GROUP BY type, value ORDER BY size DESC, type, value'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return self.db.execute(query, params).fetchall()
+
+    def connections_of(self, startup):
+        """(type, value) connections of the records named startup"""
+        rows = self.db.execute("""
+            SELECT c.type, c.value FROM records r JOIN connections c ON c.record_id = r.id
+            WHERE r.startup = ?
+            ORDER BY r.position, c.ordinal
+        """, (startup,))
+        return rows.fetchall()
+
+    def neighbours(self, startup, limit=None):
+        """(startup, shared values) of every startup sharing a value with this one, most shared first"""
+
+        query = """
+            SELECT r2.startup, COUNT(*) AS shared
+            FROM records r1
+            JOIN connections c1 ON c1.record_id = r1.id
+            JOIN connections c2 ON c2.type = c1.type AND c2.value = c1.value AND c2.record_id != c1.record_id
+            JOIN records r2 ON r2.id = c2.record_id
+            WHERE r1.startup = ? AND r2.startup != r1.startup
+            GROUP BY r2.startup
+            ORDER BY shared DESC, r2.startup
+        """
+        params = [startup]
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return self.db.execute(query, params).fetchall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the local record store")
+    parser.add_argument('--store', default=STORE_FILE, help=f"store file (default: {STORE_FILE})")
+    commands = parser.add_subparsers(dest='command')
+    shares = commands.add_parser('shares', help="startups that have a connection value")
+    shares.add_argument('type')
+    shares.add_argument('value')
+    buckets = commands.add_parser('buckets', help="largest connection values")
+    buckets.add_argument('type', nargs='?')
+    buckets.add_argument('--limit', type=int, default=20)
+    startup = commands.add_parser('startup', help="a startup's connections and closest neighbours")
+    startup.add_argument('name')
+    startup.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    with RecordStore(args.store) as store:
+        if args.command == 'shares':
+            names = store.shared(args.type, args.value)
+            print(f"🔗 {len(names)} startups with {args.type} {args.value!r}")
+            for name in names:
+                print(f"   {name}")
+        elif args.command == 'buckets':
+            for conn_type, value, size in store.bucket_sizes(args.type, args.limit):
+                print(f"   {size:>6}  {conn_type}: {value}")
+        elif args.command == 'startup':
+            connections = store.connections_of(args.name)
+            print(f"🏢 {args.name}: {len(connections)} connections")
+            for conn_type, value in connections:
+                print(f"   {conn_type}: {value}")
+            print("\n🔗 Closest neighbours:")
+            for name, shared in store.neighbours(args.name, args.limit):
+                print(f"   {shared:>3}  {name}")
+        else:
+            meta = store.meta()
+            print(f"📦 {args.store}: {store.count()} records, synced {meta.get('synced_at', 'never')}")
+            if meta.get('base_id'):
+                print(f"   Base {meta['base_id']}, table {meta.get('table_id')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Run Metrics
+Structured per-stage measurements for one ETL run (wall time, peak RSS, HTTP
+pages and latency, bucket sizes, pair counts, output bytes), written as a JSON
+report next to the emoji progress output
+"""
+
+import json
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+METRICS_FILE = 'etl_metrics.json'
+PROFILE_FILE = 'etl_profile.prof'
+REPORT_VERSION = 1
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far, or None where unsupported"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def size_histogram(sizes):
+    """Counts of sizes in power-of-two bins: {'1': n, '2-3': n, '4-7': n, ...}"""
+
+    bins = {}
+    for size in sizes:
+        low = 1 << (max(size, 1).bit_length() - 1)
+        bins[low] = bins.get(low, 0) + 1
+    return {(str(low) if low == 1 else f"{low}-{2 * low - 1}"): bins[low] for low in sorted(bins)}
+
+
+def latency_summary(latencies):
+    """Count, total, mean, median, p95 and max of request latencies in seconds"""
+
+    if not latencies:
+        return {'count': 0}
+    ordered = sorted(latencies)
+
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    return {
+        'count': len(ordered),
+        'total_seconds': round(sum(ordered), 4),
+        'mean_seconds': round(sum(ordered) / len(ordered), 4),
+        'p50_seconds': round(percentile(0.5), 4),
+        'p95_seconds': round(percentile(0.95), 4),
+        'max_seconds': round(ordered[-1], 4),
+    }
+
+
+class RunMetrics:
+    """Collects measurements per stage and writes them as one JSON report
+
+    Stages are timed with `with metrics.stage(name):` and take any further
+    values through record(). Re-entering a stage adds to its time.
+    """
+
+    def __init__(self, options=None):
+        self.started_at = datetime.now(timezone.utc)
+        self.started = time.perf_counter()
+        self.options = options or {}
+        self.stages = {}
+        self.status = 'ok'
+        self.profile_file = None
+
+    def _stage(self, name):
+        return self.stages.setdefault(name, {})
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block as stage name, recording wall seconds and the peak RSS at its end"""
+
+        started = time.perf_counter()
+        try:
+            yield self._stage(name)
+        finally:
+            entry = self._stage(name)
+            entry['seconds'] = round(entry.get('seconds', 0) + time.perf_counter() - started, 4)
+            entry['peak_rss_bytes'] = peak_rss_bytes()
+
+    def record(self, stage, **values):
+        """Store values under a stage"""
+        self._stage(stage).update(values)
+
+    def record_http(self, stage, client):
+        """Store an AirtableClient's page count, retries and latency summary under a stage"""
+
+        with client.stats_lock:
+            latencies = list(client.latencies)
+            pages = client.page_count
+            retries = client.retry_count
+        self.record(stage, http={'pages': pages, 'retries': retries, 'latency': latency_summary(latencies)})
+
+    def report(self):
+        return {
+            'version': REPORT_VERSION,
+            'started_at': self.started_at.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'status': self.status,
+            'total_seconds': round(time.perf_counter() - self.started, 4),
+            'peak_rss_bytes': peak_rss_bytes(),
+            'python': platform.python_version(),
+            'options': self.options,
+            'stages': self.stages,
+            'profile': self.profile_file,
+        }
+
+    def write(self, path=METRICS_FILE):
+        """Write the report atomically"""
+
+        tmp_file = path + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+            f.write('\n')
+        os.replace(tmp_file, path)
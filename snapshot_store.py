@@ -0,0 +1,314 @@
+"""
+Snapshot Store
+Local SQLite history of the exported network: every ETL run is a version, and
+each distinct node and edge state is stored once with the versions it appeared
+and disappeared in, so "the graph as of a date" and "what changed between two
+dates" are indexed range queries instead of diffs of whole JSON files
+
+Run `python snapshot_store.py --help` for the query commands.
+"""
+
+import argparse
+import json
+import re
+import sqlite3
+
+SNAPSHOT_FILE = 'snapshots.db'
+SCHEMA_VERSION = 1
+# Recomputed on every run (layout, analytics, logo atlas) or re-signed on every
+# fetch (logo URLs); storing them would make every node a new state each day
+DERIVED_ATTRIBUTES = ('x', 'y', 'degree', 'weighted_degree', 'component', 'community', 'betweenness',
+                      'logo_sprite', 'logo_url')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS versions (
+    id INTEGER PRIMARY KEY,
+    taken_at TEXT NOT NULL,
+    input_hash TEXT,
+    nodes INTEGER NOT NULL,
+    edges INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS versions_by_time ON versions (taken_at);
+CREATE TABLE IF NOT EXISTS names (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS nodes (
+    name_id INTEGER NOT NULL REFERENCES names (id),
+    attributes TEXT NOT NULL,
+    added INTEGER NOT NULL REFERENCES versions (id),
+    removed INTEGER REFERENCES versions (id)
+);
+CREATE INDEX IF NOT EXISTS nodes_by_added ON nodes (added);
+CREATE INDEX IF NOT EXISTS nodes_by_removed ON nodes (removed);
+CREATE TABLE IF NOT EXISTS edges (
+    source_id INTEGER NOT NULL REFERENCES names (id),
+    target_id INTEGER NOT NULL REFERENCES names (id),
+    weight INTEGER NOT NULL,
+    type_values TEXT NOT NULL,
+    added INTEGER NOT NULL REFERENCES versions (id),
+    removed INTEGER REFERENCES versions (id)
+);
+CREATE INDEX IF NOT EXISTS edges_by_added ON edges (added);
+CREATE INDEX IF NOT EXISTS edges_by_removed ON edges (removed);
+"""
+
+
+def encode(value):
+    """Canonical JSON text, so equal states store and compare as equal strings"""
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+def parse_when(text):
+    """'2026-03-01' (end of that day) or an ISO timestamp as a '%Y-%m-%dT%H:%M:%SZ' string"""
+
+    if re.fullmatch(r'\d{4}-\d{2}-\d{2}', text):
+        return text + 'T23:59:59Z'
+    match = re.fullmatch(r'(\d{4}-\d{2}-\d{2})[T ](\d{2}:\d{2}(?::\d{2})?)(?:\.\d+)?Z?', text)
+    if not match:
+        raise ValueError(f"Expected a date (YYYY-MM-DD) or UTC timestamp (YYYY-MM-DDTHH:MM:SSZ), got {text!r}")
+    clock = match.group(2) if match.group(2).count(':') == 2 else match.group(2) + ':00'
+    return f"{match.group(1)}T{clock}Z"
+
+
+class SnapshotStore:
+    """SQLite history of exported nodes and edges
+
+    Node rows hold a startup's attributes without DERIVED_ATTRIBUTES; edge
+    rows hold [weight, {type: values}] as a weight column and a JSON column.
+    A row is live from the version that added it up to, but not including,
+    the version that removed it; a state that did not change between runs
+    stays one row.
+    """
+
+    def __init__(self, path=SNAPSHOT_FILE):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA foreign_keys = ON')
+        self.db.execute('PRAGMA journal_mode = WAL')
+        version = self.db.execute('PRAGMA user_version').fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            raise ValueError(f"{path} has schema version {version}, expected {SCHEMA_VERSION}")
+        with self.db:
+            self.db.executescript(SCHEMA)
+            self.db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _name_ids(self, names):
+        """{name: id} for names, adding the ones not seen before"""
+
+        self.db.executemany('INSERT OR IGNORE INTO names (name) VALUES (?)', [(name,) for name in names])
+        return dict(self.db.execute('SELECT name, id FROM names'))
+
+    def append(self, taken_at, nodes, edges, input_hash=None):
+        """Store one run's graph as a new version
+
+        nodes maps startup names to attributes, edges maps (source, target) to
+        [weight, {type: values}]. Only states that differ from the latest
+        version are written; rows of nodes and edges that changed or
+        disappeared are closed. taken_at ('%Y-%m-%dT%H:%M:%SZ') may not be
+        earlier than the latest version. Runs as one transaction. Returns
+        (version, {'nodes': {'added', 'removed', 'changed'}, 'edges': {...}}).
+        """
+
+        latest = self.latest()
+        if latest is not None and taken_at < latest[1]:
+            raise ValueError(f"Snapshot taken at {taken_at} is older than the latest version ({latest[1]})")
+
+        with self.db:
+            name_ids = self._name_ids(set(nodes) | {name for pair in edges for name in pair})
+            version = self.db.execute('INSERT INTO versions (taken_at, input_hash, nodes, edges) VALUES (?, ?, ?, ?)',
+                                      (taken_at, input_hash, len(nodes), len(edges))).lastrowid
+
+            live_nodes = {name_id: (rowid, attributes) for rowid, name_id, attributes in self.db.execute(
+                'SELECT rowid, name_id, attributes FROM nodes WHERE removed IS NULL')}
+            node_rows = {name_ids[name]: encode({key: value for key, value in attributes.items()
+                                                 if key not in DERIVED_ATTRIBUTES})
+                         for name, attributes in nodes.items()}
+            node_counts = self._replace(live_nodes, node_rows, version,
+                                        'INSERT INTO nodes (name_id, attributes, added) VALUES (?, ?, ?)',
+                                        lambda name_id, attributes: (name_id, attributes),
+                                        'UPDATE nodes SET removed = ? WHERE rowid = ?')
+
+            live_edges = {(source_id, target_id): (rowid, (weight, type_values))
+                          for rowid, source_id, target_id, weight, type_values in self.db.execute(
+                              'SELECT rowid, source_id, target_id, weight, type_values FROM edges '
+                              'WHERE removed IS NULL')}
+            edge_rows = {(name_ids[source], name_ids[target]): (weight, encode(type_values))
+                         for (source, target), (weight, type_values) in edges.items()}
+            edge_counts = self._replace(live_edges, edge_rows, version,
+                                        'INSERT INTO edges (source_id, target_id, weight, type_values, added) '
+                                        'VALUES (?, ?, ?, ?, ?)',
+                                        lambda pair, state: (*pair, *state),
+                                        'UPDATE edges SET removed = ? WHERE rowid = ?')
+        return version, {'nodes': node_counts, 'edges': edge_counts}
+
+    def _replace(self, live, rows, version, insert, insert_params, close):
+        """Close live rows whose state changed or vanished and insert the new states, counting each kind"""
+
+        added = [key for key in rows if key not in live]
+        removed = [key for key in live if key not in rows]
+        changed = [key for key in rows if key in live and live[key][1] != rows[key]]
+        self.db.executemany(close, [(version, live[key][0]) for key in removed + changed])
+        self.db.executemany(insert, [(*insert_params(key, rows[key]), version) for key in added + changed])
+        return {'added': len(added), 'removed': len(removed), 'changed': len(changed)}
+
+    def versions(self, limit=None):
+        """(version, taken_at, nodes, edges) of every version, newest first"""
+
+        query = 'SELECT id, taken_at, nodes, edges FROM versions ORDER BY id DESC'
+        params = ()
+        if limit is not None:
+            query += ' LIMIT ?'
+            params = (limit,)
+        return self.db.execute(query, params).fetchall()
+
+    def latest(self):
+        """(version, taken_at) of the newest version, or None"""
+        return self.db.execute('SELECT id, taken_at FROM versions ORDER BY id DESC LIMIT 1').fetchone()
+
+    def version_at(self, when):
+        """(version, taken_at) of the last version taken at or before when, or None"""
+        return self.db.execute('SELECT id, taken_at FROM versions WHERE taken_at <= ? ORDER BY id DESC LIMIT 1',
+                               (when,)).fetchone()
+
+    def graph_at(self, version):
+        """({name: attributes}, {(source, target): [weight, {type: values}]}) live in a version"""
+
+        live = 'added <= ? AND (removed IS NULL OR removed > ?)'
+        nodes = {name: json.loads(attributes) for name, attributes in self.db.execute(
+            f'SELECT n.name, s.attributes FROM nodes s JOIN names n ON n.id = s.name_id WHERE {live} '
+            f'ORDER BY n.name', (version, version))}
+        edges = {(source, target): [weight, json.loads(type_values)]
+                 for source, target, weight, type_values in self.db.execute(f"""
+                     SELECT a.name, b.name, e.weight, e.type_values
+                     FROM edges e JOIN names a ON a.id = e.source_id JOIN names b ON b.id = e.target_id
+                     WHERE {live} ORDER BY a.name, b.name
+                 """, (version, version))}
+        return nodes, edges
+
+    def changes(self, from_version, to_version):
+        """What changed from one version to a later one
+
+        Only rows added or removed between the two versions are read. Returns
+        {'nodes': {'added': {name: attributes}, 'removed': {...}, 'changed':
+        {name: (old, new)}}, 'edges': the same keyed by (source, target) with
+        [weight, {type: values}] states}. States that came and went in between
+        do not appear.
+        """
+
+        window = '(added > ? AND added <= ?) OR (removed > ? AND removed <= ?)'
+        params = (from_version, to_version) * 2
+        node_rows = [(name, json.loads(attributes), added, removed) for name, attributes, added, removed in
+                     self.db.execute(f'SELECT n.name, s.attributes, s.added, s.removed '
+                                     f'FROM nodes s JOIN names n ON n.id = s.name_id WHERE {window}', params)]
+        edge_rows = [((source, target), [weight, json.loads(type_values)], added, removed)
+                     for source, target, weight, type_values, added, removed in self.db.execute(f"""
+                         SELECT a.name, b.name, e.weight, e.type_values, e.added, e.removed
+                         FROM edges e JOIN names a ON a.id = e.source_id JOIN names b ON b.id = e.target_id
+                         WHERE {window}
+                     """, params)]
+        return {'nodes': self._classify(node_rows, from_version, to_version),
+                'edges': self._classify(edge_rows, from_version, to_version)}
+
+    @staticmethod
+    def _classify(rows, from_version, to_version):
+        """Sort (key, state, added, removed) rows into added, removed and changed keys"""
+
+        def live(added, removed, version):
+            return added <= version and (removed is None or removed > version)
+
+        before = {key: state for key, state, added, removed in rows if live(added, removed, from_version)}
+        after = {key: state for key, state, added, removed in rows if live(added, removed, to_version)}
+        return {
+            'added': {key: state for key, state in sorted(after.items()) if key not in before},
+            'removed': {key: state for key, state in sorted(before.items()) if key not in after},
+            'changed': {key: (before[key], after[key]) for key in sorted(after) if key in before},
+        }
+
+    def row_counts(self):
+        """Versions, and node and edge states stored across all of them"""
+        return {table: self.db.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                for table in ('versions', 'nodes', 'edges')}
+
+
+def resolve_version(store, when):
+    """(version, taken_at) for a version number or a date/timestamp, exiting if there is none"""
+
+    if when.isdigit():
+        found = store.db.execute('SELECT id, taken_at FROM versions WHERE id = ?', (int(when),)).fetchone()
+    else:
+        found = store.version_at(parse_when(when))
+    if found is None:
+        raise SystemExit(f"❌ No snapshot at or before {when}")
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the network snapshot history")
+    parser.add_argument('--store', default=SNAPSHOT_FILE, help=f"snapshot file (default: {SNAPSHOT_FILE})")
+    commands = parser.add_subparsers(dest='command')
+    versions = commands.add_parser('versions', help="stored versions, newest first")
+    versions.add_argument('--limit', type=int, default=20)
+    as_of = commands.add_parser('as-of', help="the graph as of a date, timestamp or version number")
+    as_of.add_argument('when')
+    as_of.add_argument('--output', metavar='FILE',
+                       help="write it as JSON: nodes with their attributes and edges as "
+                            "[source, target, weight, {type: values}]")
+    changes = commands.add_parser('changes', help="what changed between two dates, timestamps or version numbers")
+    changes.add_argument('since')
+    changes.add_argument('until')
+    changes.add_argument('--limit', type=int, default=20, help="changes listed per kind")
+    args = parser.parse_args(argv)
+
+    with SnapshotStore(args.store) as store:
+        if args.command == 'versions':
+            for version, taken_at, nodes, edges in store.versions(args.limit):
+                print(f"   {version:>5}  {taken_at}  {nodes} nodes, {edges} edges")
+        elif args.command == 'as-of':
+            version, taken_at = resolve_version(store, args.when)
+            nodes, edges = store.graph_at(version)
+            print(f"🕰️  Version {version} ({taken_at}): {len(nodes)} nodes, {len(edges)} edges")
+            if args.output:
+                graph = {
+                    'version': version,
+                    'taken_at': taken_at,
+                    'nodes': [{'id': name, **attributes} for name, attributes in nodes.items()],
+                    'edges': [[*pair, *state] for pair, state in edges.items()],
+                }
+                with open(args.output, 'w', encoding='utf-8') as f:
+                    json.dump(graph, f, ensure_ascii=False, separators=(',', ':'))
+                print(f"   Written to {args.output}")
+        elif args.command == 'changes':
+            since, since_at = resolve_version(store, args.since)
+            until, until_at = resolve_version(store, args.until)
+            if until < since:
+                (since, since_at), (until, until_at) = (until, until_at), (since, since_at)
+            diff = store.changes(since, until)
+            print(f"🔀 Version {since} ({since_at}) → {until} ({until_at})")
+            for part in ('nodes', 'edges'):
+                counts = ", ".join(f"{len(keys)} {kind}" for kind, keys in diff[part].items())
+                print(f"\n{part.capitalize()}: {counts}")
+                for kind, mark in (('added', '+'), ('removed', '-'), ('changed', '~')):
+                    for key in list(diff[part][kind])[:args.limit]:
+                        print(f"   {mark} {key if part == 'nodes' else ' — '.join(key)}")
+        else:
+            latest = store.latest()
+            counts = store.row_counts()
+            if latest is None:
+                print(f"🕰️  {args.store}: no snapshots yet")
+            else:
+                print(f"🕰️  {args.store}: {counts['versions']} versions, latest {latest[1]}; "
+                      f"{counts['nodes']} node and {counts['edges']} edge states stored")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Sparse Edge Engine
+Finds startup pairs that share connection values with sparse incidence-matrix products
+instead of expanding every bucket pair by pair
+"""
+
+import numpy as np
+from scipy import sparse
+
+
+def incidence_matrix(connection_index):
+    """Encode the connection index as a values × startups count matrix
+
+    Returns (B, keys, startups): B[v, s] counts how often startup s appears in
+    bucket keys[v], so BᵀB holds shared-value counts for every startup pair.
+    Startups are sorted by name, which keeps integer pair order equal to name order.
+    """
+
+    startups = sorted({name for members in connection_index.values() for name in members})
+    position = {name: i for i, name in enumerate(startups)}
+
+    keys = []
+    rows = []
+    cols = []
+    for key, members in connection_index.items():
+        # Buckets with fewer than two entries never create an edge
+        if len(members) < 2:
+            continue
+        row = len(keys)
+        keys.append(key)
+        rows.extend([row] * len(members))
+        cols.extend(position[name] for name in members)
+
+    data = np.ones(len(rows), dtype=np.int64)
+    # Duplicate (value, startup) entries are summed into counts on conversion
+    B = sparse.csr_matrix((data, (rows, cols)), shape=(len(keys), len(startups)))
+    return B, keys, startups
+
+
+def _shared_rows(B_t, value_rows, pair_s, pair_t):
+    """Shared value rows for each (s, t) pair of one type's startups × values matrix
+
+    Startups with identical rows share one profile, so intersections are only
+    computed once per distinct profile pair. Self-pairs (s == t) share the
+    values the startup is listed under more than once.
+    """
+
+    profiles = {}
+    profile_of = np.empty(B_t.shape[0], dtype=np.int64)
+    for s in range(B_t.shape[0]):
+        row = slice(B_t.indptr[s], B_t.indptr[s + 1])
+        profile = (
+            tuple(value_rows[B_t.indices[row]].tolist()),
+            tuple(value_rows[B_t.indices[row]][B_t.data[row] > 1].tolist()),
+        )
+        profile_of[s] = profiles.setdefault(profile, len(profiles))
+    profile_list = list(profiles)
+
+    is_self = pair_s == pair_t
+    codes = profile_of[pair_s] * len(profile_list) + profile_of[pair_t]
+    codes[is_self] = -1 - profile_of[pair_s[is_self]]
+    unique_codes, inverse = np.unique(codes, return_inverse=True)
+
+    intersections = []
+    for code in unique_codes.tolist():
+        if code < 0:
+            intersections.append(profile_list[-1 - code][1])
+        else:
+            members_s = profile_list[code // len(profile_list)][0]
+            members_t = set(profile_list[code % len(profile_list)][0])
+            intersections.append(tuple(row for row in members_s if row in members_t))
+    return intersections, inverse
+
+
+def shared_pairs(connection_index):
+    """Sparse equivalent of the pairwise bucket expansion
+
+    Yields (source, target, weight, shared_keys) for every startup pair sharing
+    at least one connection value. Pair weights come from per-type products
+    B_tᵀB_t, and the shared values from intersecting the two startups' rows of
+    B_t. Pairs come out in the order the pairwise engine first meets them (first
+    shared bucket, then name order) and shared_keys in connection index order,
+    so accumulators built from them match combine_edges exactly.
+    """
+
+    B, keys, startups = incidence_matrix(connection_index)
+    key_types = np.array([conn_type for conn_type, _ in keys], dtype=object)
+    n = len(startups)
+
+    pair_codes = []
+    pair_weights = []
+    pair_first = []
+    pair_rows = []
+
+    for conn_type in dict.fromkeys(key_types.tolist()):
+        value_rows = np.flatnonzero(key_types == conn_type)
+
+        # Startups × values of this type, with global value rows as column labels
+        B_t = B[value_rows].T.tocsr()
+        B_t.sort_indices()
+        W_t = sparse.triu(B_t @ B_t.T).tocoo()
+        pair_s = W_t.row.astype(np.int64)
+        pair_t = W_t.col.astype(np.int64)
+        weights = W_t.data.astype(np.int64)
+
+        # A startup listed k times in one bucket pairs with itself k(k-1)/2 times
+        self_pairs = B_t.copy()
+        self_pairs.data = self_pairs.data * (self_pairs.data - 1) // 2
+        self_weights = np.asarray(self_pairs.sum(axis=1)).ravel()
+        is_self = pair_s == pair_t
+        weights[is_self] = self_weights[pair_s[is_self]]
+        keep = weights > 0
+        pair_s, pair_t, weights = pair_s[keep], pair_t[keep], weights[keep]
+
+        intersections, inverse = _shared_rows(B_t, value_rows, pair_s, pair_t)
+        first = np.array([rows[0] for rows in intersections], dtype=np.int64)
+
+        pair_codes.append(pair_s * n + pair_t)
+        pair_weights.append(weights)
+        pair_first.append(first[inverse])
+        pair_rows.extend(intersections[i] for i in inverse.tolist())
+
+    if not pair_codes:
+        return
+
+    # Merge the per-type contributions of each pair
+    codes = np.concatenate(pair_codes)
+    by_code = np.argsort(codes, kind='stable')
+    unique_codes, starts = np.unique(codes[by_code], return_index=True)
+    weights = np.add.reduceat(np.concatenate(pair_weights)[by_code], starts)
+    first = np.minimum.reduceat(np.concatenate(pair_first)[by_code], starts)
+    ends = np.append(starts[1:], len(codes))
+
+    sources = (unique_codes // n).tolist()
+    targets = (unique_codes % n).tolist()
+    weights = weights.tolist()
+    starts = starts.tolist()
+    ends = ends.tolist()
+    by_code = by_code.tolist()
+
+    key_cache = {}
+    for group in np.lexsort((unique_codes, first)).tolist():
+        start, end = starts[group], ends[group]
+        if end - start == 1:
+            rows = pair_rows[by_code[start]]
+        else:
+            rows = tuple(sorted(row for i in by_code[start:end] for row in pair_rows[i]))
+        shared_keys = key_cache.get(rows)
+        if shared_keys is None:
+            shared_keys = key_cache[rows] = [keys[row] for row in rows]
+        yield startups[sources[group]], startups[targets[group]], weights[group], shared_keys
@@ -0,0 +1,125 @@
+"""
+Streaming Writers
+Incremental JSON output and on-the-fly precompression, so large arrays can be
+written item by item instead of being built in memory first
+"""
+
+import gzip
+import json
+
+
+class JSONStreamWriter:
+    """Writes one top-level JSON object member by member
+
+    Plain members are serialized whole; arrays can be opened and filled one
+    item at a time, so only the current item is ever held as text. With an
+    indent the output is byte-identical to json.dump(obj, indent=indent,
+    ensure_ascii=False); without one it matches separators=(',', ':').
+    """
+
+    def __init__(self, f, indent=None):
+        self.f = f
+        self.indent = indent
+        self.key_separator = ': ' if indent is not None else ':'
+        self.members = 0
+        self.items = None
+        self.f.write('{')
+
+    def _newline(self, level):
+        if self.indent is None:
+            return ''
+        return '\n' + ' ' * (self.indent * level)
+
+    def _dumps(self, value, level):
+        separators = (',', self.key_separator)
+        text = json.dumps(value, ensure_ascii=False, indent=self.indent, separators=separators)
+        if self.indent is not None:
+            # Strings never contain raw newlines in JSON, so this only re-indents structure
+            text = text.replace('\n', self._newline(level))
+        return text
+
+    def _key(self, key):
+        separator = ',' if self.members else ''
+        self.members += 1
+        self.f.write(f"{separator}{self._newline(1)}{json.dumps(key, ensure_ascii=False)}{self.key_separator}")
+
+    def member(self, key, value):
+        """Write key: value in one go"""
+        self._key(key)
+        self.f.write(self._dumps(value, 1))
+
+    def begin_array(self, key):
+        """Open key: [ for append()"""
+        self._key(key)
+        self.f.write('[')
+        self.items = 0
+
+    def append(self, item):
+        """Write the next item of the open array"""
+        separator = ',' if self.items else ''
+        self.f.write(separator + self._newline(2) + self._dumps(item, 2))
+        self.items += 1
+
+    def end_array(self):
+        """Close the open array, returning how many items it got"""
+        count = self.items
+        self.f.write((self._newline(1) if count else '') + ']')
+        self.items = None
+        return count
+
+    def array(self, key, items):
+        """Write key: [items...] from any iterable, returning the item count"""
+        self.begin_array(key)
+        for item in items:
+            self.append(item)
+        return self.end_array()
+
+    def close(self):
+        """Close the top-level object"""
+        self.f.write((self._newline(0) if self.members else '') + '}')
+
+
+class PrecompressedWriter:
+    """Text sink writing path plus .gz and, when brotli is installed, .br copies as it goes
+
+    After close(), sizes maps 'json', 'gzip' and 'brotli' to the bytes written.
+    """
+
+    def __init__(self, path):
+        self.raw = open(path, 'wb')
+        self.gz_file = open(path + '.gz', 'wb')
+        self.gz = gzip.GzipFile(filename='', mode='wb', fileobj=self.gz_file, compresslevel=9, mtime=0)
+        try:
+            import brotli
+        except ImportError:
+            self.br_file = self.br = None
+        else:
+            self.br_file = open(path + '.br', 'wb')
+            self.br = brotli.Compressor(quality=11)
+        self.sizes = {'json': 0}
+
+    def write(self, text):
+        payload = text.encode('utf-8') if isinstance(text, str) else text
+        self.raw.write(payload)
+        self.gz.write(payload)
+        if self.br is not None:
+            self.br_file.write(self.br.process(payload))
+        self.sizes['json'] += len(payload)
+
+    def close(self):
+        self.raw.close()
+        self.gz.close()
+        self.sizes['gzip'] = self.gz_file.tell()
+        self.gz_file.close()
+        if self.br is not None:
+            self.br_file.write(self.br.finish())
+            self.sizes['brotli'] = self.br_file.tell()
+            self.br_file.close()
+        return self.sizes
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if not self.raw.closed:
+            self.close()
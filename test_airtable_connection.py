@@ -4,9 +4,13 @@ This script tests the connection to Airtable and displays sample record structur
 """
 
 import os
+import argparse
 import requests
 from dotenv import load_dotenv
 
+from airtable_client import AirtableClient
+from record_store import STORE_FILE, RecordStore
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -16,6 +20,32 @@ AIRTABLE_BASE_ID = os.getenv('AIRTABLE_BASE_ID')
 AIRTABLE_TABLE_NAME = os.getenv('AIRTABLE_TABLE_NAME') or os.getenv('AIRTABLE_TABLE_ID')
 
 
+def show_sample(records):
+    """Print the field names and values of the first sample record"""
+    
+    if records:
+        print("=" * 60)
+        print("SAMPLE RECORD STRUCTURE")
+        print("=" * 60)
+        print(f"\nRecord ID: {records[0]['id']}")
+        print(f"\nAvailable Fields:")
+        for i, field_name in enumerate(records[0]['fields'].keys(), 1):
+            print(f"  {i}. {field_name}")
+        
+        print(f"\n" + "=" * 60)
+        print("FIRST RECORD DATA")
+        print("=" * 60)
+        for key, value in records[0]['fields'].items():
+            # Truncate long values for display
+            if isinstance(value, str) and len(value) > 100:
+                value = value[:100] + "..."
+            print(f"  {key}: {value}")
+        
+        print(f"\n" + "=" * 60)
+    else:
+        print("⚠️ No records found in the table")
+
+
 def test_connection():
     """Test connection to Airtable and fetch sample records"""
     
@@ -28,11 +58,7 @@ def test_connection():
         print("  - AIRTABLE_TABLE_NAME or AIRTABLE_TABLE_ID")
         return False
     
-    url = f"https://api.airtable.com/v0/{AIRTABLE_BASE_ID}/{AIRTABLE_TABLE_NAME}"
-    headers = {
-        "Authorization": f"Bearer {AIRTABLE_TOKEN}",
-        "Content-Type": "application/json"
-    }
+    client = AirtableClient(AIRTABLE_TOKEN, AIRTABLE_BASE_ID, AIRTABLE_TABLE_NAME)
     
     # Fetch first 3 records to test
     params = {"maxRecords": 3}
@@ -42,36 +68,13 @@ def test_connection():
         print(f"   Base ID: {AIRTABLE_BASE_ID}")
         print(f"   Table: {AIRTABLE_TABLE_NAME}\n")
         
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        
-        data = response.json()
+        data = client.get(params)
         records = data.get('records', [])
         
         print(f"✅ Connection successful!")
         print(f"📊 Found {len(records)} sample records\n")
         
-        if records:
-            print("=" * 60)
-            print("SAMPLE RECORD STRUCTURE")
-            print("=" * 60)
-            print(f"\nRecord ID: {records[0]['id']}")
-            print(f"\nAvailable Fields:")
-            for i, field_name in enumerate(records[0]['fields'].keys(), 1):
-                print(f"  {i}. {field_name}")
-            
-            print(f"\n" + "=" * 60)
-            print("FIRST RECORD DATA")
-            print("=" * 60)
-            for key, value in records[0]['fields'].items():
-                # Truncate long values for display
-                if isinstance(value, str) and len(value) > 100:
-                    value = value[:100] + "..."
-                print(f"  {key}: {value}")
-            
-            print(f"\n" + "=" * 60)
-        else:
-            print("⚠️ No records found in the table")
+        show_sample(records)
         
         return True
         
@@ -92,12 +95,38 @@ def test_connection():
         return False
 
 
+def inspect_store(store_file):
+    """Show sample record structure from the local record store, without the API"""
+    
+    if not os.path.exists(store_file):
+        print(f"❌ No record store at {store_file}")
+        print("   Run airtable_etl.py --store once to create it")
+        return False
+    
+    with RecordStore(store_file) as store:
+        meta = store.meta()
+        records = list(store.records(limit=3))
+        print(f"📦 Reading {store_file}...")
+        print(f"   Base ID: {meta.get('base_id')}")
+        print(f"   Table: {meta.get('table_id')}")
+        print(f"   Synced: {meta.get('synced_at', 'never')}\n")
+        print(f"📊 {store.count()} records stored, showing {len(records)}\n")
+    
+    show_sample(records)
+    return True
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test the Airtable connection and show sample record structure")
+    parser.add_argument('--store', nargs='?', const=STORE_FILE, default=None, metavar='FILE',
+                        help=f"read the local record store instead of the API (default file: {STORE_FILE})")
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("AIRTABLE CONNECTION TEST")
     print("=" * 60 + "\n")
     
-    success = test_connection()
+    success = inspect_store(args.store) if args.store else test_connection()
     
     if success:
         print("\n✨ Setup complete! Ready to fetch Airtable data.")
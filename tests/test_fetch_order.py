@@ -0,0 +1,26 @@
+"""Fetched records come back in the same order whatever the number of workers"""
+
+import random
+
+import airtable_etl as etl
+from airtable_client import AirtableClient
+from benchmarks.mock_airtable import MockAirtable
+from benchmarks.synthetic import generate_records
+
+
+def test_serial_and_parallel_fetches_agree():
+    records = generate_records(300, seed=3)
+    # A table order that is neither id nor creation order
+    random.Random(0).shuffle(records)
+    server = MockAirtable(records).start()
+    try:
+        client = AirtableClient('token', 'base', 'table', api_url=server.url)
+        serial = etl.fetch_records(client, quiet=True)
+        parallel = etl.fetch_records(client, workers=4, quiet=True)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert [record['id'] for record in serial] == [record['id'] for record in parallel]
+    args = etl.parse_args([])
+    assert etl.input_hash(serial, args) == etl.input_hash(parallel, args)
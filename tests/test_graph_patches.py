@@ -0,0 +1,61 @@
+"""Patches between consecutive exports stay proportional to the edit, not the graph"""
+
+import copy
+import json
+
+import pytest
+
+import airtable_etl as etl
+from benchmarks.synthetic import generate_records
+from graph_patches import build_patch
+
+
+def export_state(records, previous=None):
+    """graph_state of a full ETL run with analytics and a layout warm-started from previous"""
+
+    previous = previous or {'nodes': {}, 'metadata': {}}
+    nodes, edges = etl.process_records(records)
+    etl.analyze_nodes(nodes, edges, previous_communities=etl.node_communities(previous['nodes']))
+    positions = {node_id: (node['x'], node['y']) for node_id, node in previous['nodes'].items()}
+    digest = etl.layout_nodes(nodes, edges, positions, previous_digest=previous['metadata'].get('layout_digest'))
+    return etl.graph_state(nodes, ((edge['source'], edge['target'], edge['weight'], etl.edge_values(edge))
+                                   for edge in edges), {'layout_digest': digest})
+
+
+def edit_one_startup(records):
+    """Copy of records with one startup's first competency dropped"""
+
+    records = copy.deepcopy(records)
+    for record in records:
+        competencies = record['fields'].get('Core Competencies')
+        if competencies:
+            record['fields']['Core Competencies'] = competencies[1:]
+            return records
+    raise AssertionError("no record with a competency")
+
+
+@pytest.mark.parametrize('count', [300, 1200])
+def test_one_startup_edit_gives_a_small_patch(count):
+    records = generate_records(count, seed=1)
+    old = export_state(records)
+    new = export_state(edit_one_startup(records), old)
+    patch = build_patch(1, 2, old, new)
+
+    rewired = {node_id for rows in patch['edges'].values() for row in rows for node_id in row[:2]}
+    assert rewired
+    assert not patch['nodes']['added'] and not patch['nodes']['removed']
+    # Only the edited startup and the neighbours it gained or lost appear, plus
+    # the odd node the layout moved visibly
+    changed = {change['id'] for change in patch['nodes']['changed']}
+    assert len(changed - rewired) <= 10
+    for change in patch['nodes']['changed']:
+        if change['id'] not in rewired:
+            assert set(change['set']) <= {'x', 'y'}
+    assert len(json.dumps(patch)) < 20_000
+
+
+def test_unchanged_graph_gives_an_empty_patch():
+    records = generate_records(300, seed=2)
+    old = export_state(records)
+    patch = build_patch(1, 2, old, export_state(records, old))
+    assert all(not items for part in ('nodes', 'edges') for items in patch[part].values())
@@ -0,0 +1,18 @@
+"""Logos keep their atlas slots across runs"""
+
+from logo_atlas import assign_slots
+
+
+def test_first_packing_is_sorted():
+    assert assign_slots(['b', 'c', 'a'], {}) == {'a': 0, 'b': 1, 'c': 2}
+
+
+def test_existing_logos_keep_their_slots():
+    previous = assign_slots([f'att{i:03d}' for i in range(10)], {})
+    keys = [key for key in previous if key != 'att003'] + ['att100', 'att101']
+    slots = assign_slots(keys, previous)
+    assert all(slots[key] == previous[key] for key in previous if key != 'att003')
+    # The freed slot is reused first, then the next one after the end
+    assert slots['att100'] == previous['att003']
+    assert slots['att101'] == 10
+    assert len(set(slots.values())) == len(slots)
@@ -0,0 +1,119 @@
+"""Weighted connection preprocessing matches the original row-by-row version
+
+tests/data holds a per-connection CSV and the weighted CSV the original
+iterrows loop wrote for it. The loop is kept below (reference_weighted) so the
+golden file can be checked and regenerated; the one change from the original
+is that each pair's connections keep their row order instead of a set's
+hash-seed dependent order.
+"""
+
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+import pandas as pd
+
+from ConnPreProc_new3_weighted import weight_connections
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+EDGES_FILE = os.path.join(DATA_DIR, 'connections_full.csv')
+GOLDEN_FILE = os.path.join(DATA_DIR, 'connections_weighted.csv')
+
+
+def reference_weighted(edges_df):
+    """The original ConnPreProc_new3_weighted.py loop, with ordered connections"""
+
+    def norm_location(s):
+        return s.replace(' - ', '-').replace(' – ', '-').strip()
+
+    def dedupe_preserve_order(seq):
+        seen = set()
+        out = []
+        for s in seq:
+            key = ' '.join(s.split()).lower()
+            if key and key not in seen:
+                seen.add(key)
+                out.append(s)
+        return out
+
+    combined_edges = defaultdict(lambda: {'weight': 0, 'types': set(), 'connections': {}})
+    for _, row in edges_df.iterrows():
+        node_pair = tuple(sorted([row['Source'], row['Target']]))
+        edge_info = combined_edges[node_pair]
+        edge_info['weight'] += 1
+        edge_info['types'].add(row['Type'])
+        edge_info['connections'][row['Connection_full']] = None
+
+    weighted_edges = []
+    for (source, target), info in combined_edges.items():
+        parsed = {'city': [], 'country': [], 'competency': [], 'impact': [], 'target_market': [], 'other': []}
+        for conn in info['connections']:
+            if isinstance(conn, str) and ': ' in conn:
+                t, v = conn.split(': ', 1)
+                t = t.strip().lower()
+                parsed[t if t in parsed else 'other'].append(v.strip())
+            else:
+                parsed['other'].append(str(conn))
+
+        city = norm_location(parsed['city'][0]) if parsed['city'] else ''
+        country = norm_location(parsed['country'][0]) if parsed['country'] else ''
+        raw_parts = []
+        if source:
+            raw_parts.append(source)
+        if target and target != source:
+            raw_parts.append(target)
+        for values in (parsed['competency'], parsed['impact'], parsed['target_market']):
+            joined = ';'.join(dedupe_preserve_order(values))
+            if joined:
+                raw_parts.append(joined)
+        raw_parts.extend(part for part in (city, country) if part)
+
+        label_detailed = ', '.join(dedupe_preserve_order(raw_parts))
+        if len(label_detailed) > 120:
+            label_detailed = label_detailed[:119].rstrip(', ').rstrip() + '…'
+
+        weighted_edges.append({
+            'Source': source,
+            'Target': target,
+            'Weight': info['weight'],
+            'Types': ';'.join(sorted(info['types'])),
+            'Connections': ';'.join(sorted(info['connections'])),
+            'Label': f"{info['weight']} connections: " + ", ".join(sorted(info['types'])),
+            'LabelDetailed': label_detailed,
+            'is_competency': 1 if 'competency' in info['types'] else 0,
+            'is_impact': 1 if 'impact' in info['types'] else 0,
+            'is_city': 1 if 'city' in info['types'] else 0,
+            'is_country': 1 if 'country' in info['types'] else 0,
+            'is_target_market': 1 if 'target_market' in info['types'] else 0
+        })
+    return pd.DataFrame(weighted_edges)
+
+
+def weighted_csv(weighted):
+    return weighted.to_csv(index=False, lineterminator='\n')
+
+
+def read_golden():
+    with open(GOLDEN_FILE, encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+def test_golden_file_matches_the_original_loop():
+    edges_df = pd.read_csv(EDGES_FILE, encoding='utf-8')
+    assert weighted_csv(reference_weighted(edges_df)) == read_golden()
+
+
+def test_output_matches_the_golden_file():
+    edges_df = pd.read_csv(EDGES_FILE, encoding='utf-8')
+    assert weighted_csv(weight_connections(edges_df)) == read_golden()
+
+
+def test_output_does_not_depend_on_the_hash_seed():
+    script = ("import sys, pandas as pd; from ConnPreProc_new3_weighted import weight_connections; "
+              f"weight_connections(pd.read_csv({EDGES_FILE!r})).to_csv(sys.stdout, index=False, lineterminator='\\n')")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for seed in ('0', '1', '2'):
+        output = subprocess.run([sys.executable, '-c', script], cwd=root, capture_output=True, check=True,
+                                env={**os.environ, 'PYTHONHASHSEED': seed}).stdout
+        assert output.decode('utf-8') == read_golden()